@@ -0,0 +1,23 @@
+"""
+Carga inicial de `resumen_conversaciones` a partir de los mensajes existentes.
+
+Requiere haber aplicado sql/resumen_conversaciones.sql en Supabase. Uso:
+    python -m app.backfill_resumen
+"""
+import asyncio
+
+from .database import get_async_supabase_client
+
+
+async def main() -> None:
+    db = get_async_supabase_client()
+    await db.start()
+    try:
+        total = await db.rpc("reconstruir_resumen_conversaciones")
+        print(f"Resumen reconstruido: {total} conversaciones")
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
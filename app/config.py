@@ -12,9 +12,87 @@ class Settings(BaseSettings):
     SUPABASE_SERVICE_ROLE: str
     # SUPABASE_PASSWORD: str
 
+    # Webhook: si está activo, el router responde 200 al instante y un pool
+    # de workers procesa los eventos desde una cola en memoria.
+    WEBHOOK_QUEUE_ENABLED: bool = True
+    WEBHOOK_WORKERS: int = 4
+    WEBHOOK_QUEUE_MAXSIZE: int = 1000
+    WEBHOOK_DRAIN_TIMEOUT: float = 30.0
+
+    # Reenvíos del webhook: ids de mensajes ya procesados (memoria + SQLite opcional)
+    DEDUP_TTL_SECONDS: float = 24 * 3600
+    DEDUP_MAX_IDS: int = 50_000
+    DEDUP_DB_PATH: str = ""
+
+    # Ráfagas de mensajes del mismo wa_id: se responden en un solo turno del agente
+    COALESCE_WINDOW_SECONDS: float = 1.5  # 0 = un turno por mensaje
+    COALESCE_MAX_WAIT_SECONDS: float = 5.0  # espera máxima desde el primer mensaje de la ráfaga
+
+    # Caché write-through de los últimos mensajes de cada conversación
+    CONVERSATION_CACHE_TURNS: int = 20  # 0 = desactivada
+    CONVERSATION_CACHE_MAX_CONVERSATIONS: int = 10_000
+    CONVERSATION_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CONVERSATION_CACHE_TTL: float = 3600
+
+    # Escritura diferida de `mensajes`: inserts en lote fuera del camino de la respuesta
+    MESSAGE_WRITE_BEHIND: bool = False
+    MESSAGE_BATCH_SIZE: int = 50
+    MESSAGE_FLUSH_INTERVAL: float = 0.25
+    MESSAGE_FLUSH_RETRIES: int = 3
+    MESSAGE_BUFFER_MAX: int = 10_000
+
+    # Caché de respuestas del dashboard (/frontend/leads y /frontend/conversaciones)
+    FRONTEND_CACHE_TTL: float = 5.0  # segundos; 0 = desactivada (el ETag/304 se mantiene)
+
+    # Feed en vivo para el frontend (/frontend/stream, Server-Sent Events)
+    EVENT_BUFFER_SIZE: int = 1000  # eventos que se pueden reenviar al reconectar
+    EVENT_SUBSCRIBER_QUEUE: int = 100  # eventos pendientes por cliente antes de cortarlo
+    EVENT_HEARTBEAT_SECONDS: float = 15.0
+
+    # Graph API de WhatsApp: cliente compartido con rate limiting y reintentos
+    WHATSAPP_API_URL: str = "https://graph.facebook.com"
+    WHATSAPP_RATE_TIER: str = "standard"
+    WHATSAPP_MAX_CONCURRENCY: int = 10
+    WHATSAPP_MAX_RETRIES: int = 3
+    WHATSAPP_RETRY_BACKOFF: float = 0.5
+    WHATSAPP_TIMEOUT: float = 10.0
+
+    # Supabase (PostgREST): pool de conexiones HTTP del cliente asíncrono
+    SUPABASE_MAX_CONNECTIONS: int = 20
+    SUPABASE_TIMEOUT: float = 10.0
+
+    # Caché de embeddings de consultas (memoria LRU + SQLite opcional)
+    EMBEDDING_CACHE_SIZE: int = 2048
+    EMBEDDING_CACHE_TTL: float = 7 * 24 * 3600
+    EMBEDDING_CACHE_PATH: str = ""
+
+    # Búsqueda en FAQs/productos: "hybrid" (BM25 + vectores), "vector" o "lexical"
+    SEARCH_MODE: str = "hybrid"
+    EMBEDDING_TIMEOUT: float = 3.0
+    LEXICAL_MIN_SCORE: float = 4.0  # puntaje BM25 mínimo para saltarse los embeddings
+    LEXICAL_DECISIVE_RATIO: float = 2.0  # y ventaja mínima del primero sobre el segundo
+
+    # Caché semántica de respuestas a preguntas tipo FAQ (se salta el LLM)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_THRESHOLD: float = 0.93  # similitud coseno mínima con una pregunta ya respondida
+    ANSWER_CACHE_TTL: float = 6 * 3600
+    ANSWER_CACHE_SIZE: int = 1000
+    ANSWER_CACHE_MAX_CHARS: int = 200
+
+    # Clasificador de intención de mensajes entrantes (data/models)
+    INTENT_COLUMN: str = ""  # columna de `mensajes` donde guardar la etiqueta (p. ej. label_intencion); vacío = solo log
+
+    # Puntaje de leads en tiempo real (sql/leads_scores.sql)
+    LEAD_SCORING_ENABLED: bool = True
+    LEAD_SYNC_NIVEL_INTERES: bool = True  # copiar la categoría a clientes_potenciales.nivel_interes
+
+    # Recarga en caliente del catálogo y las FAQs
+    CATALOG_WATCH_INTERVAL: float = 0.0  # segundos entre chequeos de los CSV; 0 = desactivado
+    ADMIN_TOKEN: str = ""  # /admin/* exige el header X-Admin-Token; vacío = /admin/* desactivado
+
     model_config = SettingsConfigDict(
             env_file=Path(__file__).parent / ".env",
             extra="ignore"
         )
 
-Config = Settings()
\ No newline at end of file
+Config = Settings()
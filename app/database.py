@@ -1,9 +1,12 @@
+from typing import Any, Dict, List, Optional
+
+import httpx
 from supabase import create_client, Client
 from .config import Config
 
 class SupabaseClient:
     _instance: Client = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = create_client(
@@ -14,3 +17,96 @@ class SupabaseClient:
 
 def get_supabase_client() -> Client:
     return SupabaseClient()
+
+
+class AsyncSupabaseClient:
+    """
+    Acceso asíncrono a la API REST (PostgREST) de Supabase sobre un pool
+    acotado de conexiones httpx con keep-alive, compartido por toda la app.
+
+    Los filtros y el orden usan la sintaxis de PostgREST tal cual, por ejemplo
+    ``filters={"numero_whatsapp": "eq.51999999999"}`` y
+    ``order="fecha_creacion.desc"``.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AsyncSupabaseClient, cls).__new__(cls)
+            cls._instance._client = None
+        return cls._instance
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=Config.SUPABASE_URL.rstrip("/") + "/rest/v1",
+                headers={
+                    "apikey": Config.SUPABASE_SERVICE_ROLE,
+                    "Authorization": f"Bearer {Config.SUPABASE_SERVICE_ROLE}",
+                },
+                timeout=Config.SUPABASE_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=Config.SUPABASE_MAX_CONNECTIONS,
+                    max_keepalive_connections=Config.SUPABASE_MAX_CONNECTIONS,
+                ),
+            )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, path: str, **kwargs) -> Any:
+        if self._client is None:
+            await self.start()
+        response = await self._client.request(method, path, **kwargs)
+        response.raise_for_status()
+        if not response.content:
+            return None
+        return response.json()
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        *,
+        filters: Optional[Dict[str, str]] = None,
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        params: Dict[str, Any] = {"select": columns, **(filters or {})}
+        if order:
+            params["order"] = order
+        if limit is not None:
+            params["limit"] = limit
+        return await self._request("GET", f"/{table}", params=params) or []
+
+    async def insert(self, table: str, rows, returning: bool = True,
+                     columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        # Con returning=False PostgREST no devuelve las filas (útil en inserts masivos).
+        # `columns` permite un lote con claves distintas: las que falten toman su default
+        params = {"columns": ",".join(columns)} if columns else None
+        return await self._request(
+            "POST", f"/{table}", json=rows, params=params,
+            headers={"Prefer": "return=representation" if returning else "return=minimal"},
+        ) or []
+
+    async def upsert(self, table: str, rows, on_conflict: Optional[str] = None) -> List[Dict[str, Any]]:
+        params = {"on_conflict": on_conflict} if on_conflict else None
+        return await self._request(
+            "POST", f"/{table}", json=rows, params=params,
+            headers={"Prefer": "return=representation,resolution=merge-duplicates"},
+        ) or []
+
+    async def update(self, table: str, values: Dict[str, Any], filters: Dict[str, str]) -> List[Dict[str, Any]]:
+        return await self._request(
+            "PATCH", f"/{table}", json=values, params=filters,
+            headers={"Prefer": "return=representation"},
+        ) or []
+
+    async def rpc(self, function: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        return await self._request("POST", f"/rpc/{function}", json=params or {})
+
+def get_async_supabase_client() -> AsyncSupabaseClient:
+    return AsyncSupabaseClient()
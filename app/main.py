@@ -1,14 +1,49 @@
 import uvicorn
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import Config
-from .routers.whatsapp_webhook import router as whatsapp_router
+from .database import get_async_supabase_client
+from .ml.intent_classifier import intent_classifier
+from .routers.whatsapp_webhook import router as whatsapp_router, webhook_queue, message_handler
 from .routers.conversations import router as conversation_router
 from .routers.frontend_data import router as frontend_router  # 👈 NUEVO
+from .routers.admin import router as admin_router, catalog_reloader
+from .services.answer_cache import answer_cache
+from .services.conversation_cache import conversation_cache
+from .services.event_hub import event_hub
+from .services.lead_scorer import lead_scorer
+from .services.message_writer import message_writer
+from .services.response_cache import response_cache
+from .services.whatsapp_service import WhatsAppService
+from .tools.embeddings import embedding_cache
+from .tools.hybrid_search import search_stats
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await get_async_supabase_client().start()
+    if Config.MESSAGE_WRITE_BEHIND:
+        await message_writer.start()
+    await WhatsAppService().start()
+    if Config.WEBHOOK_QUEUE_ENABLED:
+        await webhook_queue.start()
+    await catalog_reloader.start()
+    yield
+    event_hub.close()
+    await catalog_reloader.stop()
+    # Drenar la cola antes de apagar para no perder mensajes ya aceptados
+    await webhook_queue.stop(timeout=Config.WEBHOOK_DRAIN_TIMEOUT)
+    await message_handler.stop(timeout=Config.WEBHOOK_DRAIN_TIMEOUT)
+    if Config.MESSAGE_WRITE_BEHIND:
+        # Los mensajes en el buffer deben llegar a Supabase antes de cerrar el cliente
+        await message_writer.stop(timeout=Config.WEBHOOK_DRAIN_TIMEOUT)
+    await WhatsAppService().close()
+    await get_async_supabase_client().close()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # 👇 CORS: permite llamadas desde tu frontend en Render y desde localhost
 origins = [
@@ -23,12 +58,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "ETag"],  # paginación de /frontend
 )
 
 @app.get("/")
 async def root():
     return {"message": "Servidor de WhatsApp funcionando correctamente."}
 
+@app.get("/stats")
+async def stats():
+    return {
+        "webhook_queue": webhook_queue.stats(),
+        "coalescer": message_handler.coalescer.stats(),
+        "dedup": message_handler.dedup.stats(),
+        "whatsapp": WhatsAppService().stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "conversation_cache": conversation_cache.stats(),
+        "message_writer": message_writer.stats(),
+        "frontend_cache": response_cache.stats(),
+        "event_hub": event_hub.stats(),
+        "intent_classifier": intent_classifier.stats() if intent_classifier else None,
+        "lead_scorer": lead_scorer.stats(),
+        "search_paths": dict(search_stats),
+        "catalog": catalog_reloader.stats(),
+    }
+
 # Rutas existentes (no se tocan)
 app.include_router(whatsapp_router, prefix="/webhook")
 app.include_router(conversation_router, prefix="/conversations")
@@ -36,5 +91,7 @@ app.include_router(conversation_router, prefix="/conversations")
 # 👇 NUEVO: endpoints para que el frontend consuma la data de Supabase
 app.include_router(frontend_router, prefix="/frontend")
 
+app.include_router(admin_router, prefix="/admin")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
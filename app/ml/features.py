@@ -0,0 +1,278 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Features numéricas del modelo de intención, en el orden de data/models/model_info.json
+FEATURES = ["num_palabras", "num_preguntas", "longitud", "sentimiento_num", "num_keywords"]
+
+SENT_MAP = {"positivo": 1, "neutro": 0, "negativo": -1}
+
+# Columnas de `featurizar` / claves de `preprocesar_mensaje`
+COLUMNAS = FEATURES + ["sentimiento", "palabras_clave"]
+
+PALABRAS_POSITIVAS = [
+    "confirmar", "confirmen", "listo", "completado", "realizado", "realicé",
+    "deseo", "quiero", "interesado", "participar", "ofertar", "he completado",
+    "he realizado", "ya pagué", "ya hice", "ya envié", "ya completé",
+    "estoy listo", "necesito confirmar", "deseo participar",
+]
+
+PALABRAS_NEGATIVAS = [
+    "aún no", "todavía no", "no estoy", "no tengo", "no puedo",
+    "no quiero", "no me interesa", "cancelar", "desistir", "no estoy seguro",
+    "no he decidido", "no tengo claro", "tal vez", "solo estoy", "solo quería",
+]
+
+PALABRAS_CLAVE = [
+    "pago", "garantía", "voucher", "transferencia", "depósito", "confirmar",
+    "subasta", "lote", "ofertar", "participar", "registro", "financiamiento",
+    "plataforma", "asesor", "precio", "resultado", "comprobante", "visita",
+]
+
+
+# Desempates de calcular_sentimiento cuando no hay mayoría clara
+PALABRAS_DUDA = ["solo", "tal vez", "aún", "todavía"]
+PALABRAS_CONFIRMACION = ["confirmar", "listo", "completado", "participar"]
+
+# Todas las frases se buscan a la vez con un trie compilado a una tabla de
+# transiciones. `_analizar` une los mensajes de un lote en un solo arreglo de
+# códigos y avanza en paralelo, con NumPy, un recorrido del trie desde cada
+# posición: un nivel del trie por iteración. Cada frase que termina en el
+# recorrido prende su bit en la máscara del mensaje, así el conjunto de frases
+# presentes es exactamente el de `frase in texto.lower()` para cada una.
+_FRASES = list(dict.fromkeys(
+    PALABRAS_POSITIVAS + PALABRAS_NEGATIVAS + PALABRAS_CLAVE + PALABRAS_DUDA + PALABRAS_CONFIRMACION
+))
+assert len(_FRASES) <= 64, "las máscaras de frases usan uint64"
+assert min(map(len, _FRASES)) >= 3, "el recorrido arranca con ternas de caracteres"
+_BIT = {f: 1 << i for i, f in enumerate(_FRASES)}
+_LOTE = 50_000  # mensajes por pasada, acota la memoria de los arreglos intermedios
+_UNICODE = 0x110000
+
+
+def _compilar_trie(frases: List[str]):
+    """
+    Tablas del trie: código Unicode -> carácter del alfabeto (0 = cualquier otro),
+    (nodo, carácter) -> nodo siguiente (0 = sin frase posible) y, para arrancar,
+    los tres primeros caracteres -> nodo. La raíz es el nodo 1.
+    """
+    caracteres = sorted({c for f in frases for c in f})
+    ancho = len(caracteres) + 1
+    alfabeto = np.zeros(_UNICODE, dtype=np.int16)
+    for i, c in enumerate(caracteres, start=1):
+        alfabeto[ord(c)] = i
+    hijos: List[Dict[str, int]] = [{}, {}]
+    finales = [0, 0]
+    for f in frases:
+        nodo = 1
+        for c in f:
+            if c not in hijos[nodo]:
+                hijos[nodo][c] = len(hijos)
+                hijos.append({})
+                finales.append(0)
+            nodo = hijos[nodo][c]
+        finales[nodo] |= _BIT[f]
+    transiciones = np.zeros(len(hijos) * ancho, dtype=np.int32)
+    for nodo, h in enumerate(hijos):
+        for c, siguiente in h.items():
+            transiciones[nodo * ancho + alfabeto[ord(c)]] = siguiente
+    ternas = np.zeros(ancho ** 3, dtype=np.int32)
+    for c1, n1 in hijos[1].items():
+        for c2, n2 in hijos[n1].items():
+            for c3, n3 in hijos[n2].items():
+                ternas[(alfabeto[ord(c1)] * ancho + alfabeto[ord(c2)]) * ancho + alfabeto[ord(c3)]] = n3
+    return ancho, alfabeto, transiciones, ternas, np.array(finales, dtype=np.uint64)
+
+
+_ANCHO, _ALFABETO, _TRANSICIONES, _TERNAS, _FINALES = _compilar_trie(_FRASES)
+# Separadores de str.split() sin argumentos (el último es U+3000)
+_ESPACIO = np.zeros(_UNICODE, dtype=bool)
+_ESPACIO[[c for c in range(0x3001) if chr(c).isspace()]] = True
+
+
+def _analizar(minusculas: List[str]):
+    """
+    Para cada texto (ya en minúsculas): máscara de bits de las frases que
+    contiene, cantidad de palabras (como len(texto.split())) y de "?".
+    """
+    n = len(minusculas)
+    mascaras = np.zeros(n, dtype=np.uint64)
+    palabras = np.zeros(n, dtype=np.int64)
+    preguntas = np.zeros(n, dtype=np.int64)
+    for desde in range(0, n, _LOTE):
+        lote = minusculas[desde:desde + _LOTE]
+        # Cada texto termina en \x00: separa los mensajes y corta todo recorrido
+        codigos = np.frombuffer(
+            ("\x00".join(lote) + "\x00").encode("utf-32-le", "surrogatepass"), dtype=np.uint32
+        )
+        largos = np.fromiter(map(len, lote), dtype=np.int64, count=len(lote))
+        comienzos = np.cumsum(largos + 1) - (largos + 1)
+
+        limites = np.append(comienzos, len(codigos))
+        espacio = _ESPACIO[codigos]
+        espacio[comienzos + largos] = True
+        inicio_palabra = ~espacio
+        inicio_palabra[1:] &= espacio[:-1]
+        palabras[desde:desde + len(lote)] = np.diff(np.searchsorted(np.flatnonzero(inicio_palabra), limites))
+        preguntas[desde:desde + len(lote)] = np.diff(np.searchsorted(np.flatnonzero(codigos == ord("?")), limites))
+
+        ids = _ALFABETO[codigos]
+        nodos = _TERNAS[(ids[:-2] * _ANCHO + ids[1:-1]) * _ANCHO + ids[2:]]
+        inicios = np.flatnonzero(nodos)
+        nodos = nodos[inicios]
+        posiciones, bits = [], []
+        paso = 3
+        while inicios.size:
+            finales = _FINALES[nodos]
+            termina = finales != 0
+            posiciones.append(inicios[termina])
+            bits.append(finales[termina])
+            nodos = _TRANSICIONES[nodos * _ANCHO + ids[inicios + paso]]
+            vivos = nodos != 0
+            inicios, nodos = inicios[vivos], nodos[vivos]
+            paso += 1
+        if posiciones:
+            mensaje = desde + np.searchsorted(comienzos, np.concatenate(posiciones), side="right") - 1
+            np.bitwise_or.at(mascaras, mensaje, np.concatenate(bits))
+    return mascaras, palabras, preguntas
+
+
+def _mascara_de(frases) -> int:
+    return sum(_BIT[f] for f in frases)
+
+
+_M_POSITIVAS = _mascara_de(PALABRAS_POSITIVAS)
+_M_NEGATIVAS = _mascara_de(PALABRAS_NEGATIVAS)
+_M_CLAVE = _mascara_de(PALABRAS_CLAVE)
+_M_DUDA = _mascara_de(PALABRAS_DUDA)
+_M_CONFIRMACION = _mascara_de(PALABRAS_CONFIRMACION)
+
+
+def frases_presentes(texto: str) -> int:
+    """
+    Máscara de bits de las frases (de todas las listas) contenidas en el texto.
+    Para un solo mensaje es más rápido buscar cada frase que armar los arreglos
+    de `_analizar`; el resultado es el mismo.
+    """
+    texto_lower = texto.lower()
+    return sum(bit for frase, bit in _BIT.items() if frase in texto_lower)
+
+
+def _sentimiento(mascara: int, pregunta: bool) -> str:
+    count_pos = (mascara & _M_POSITIVAS).bit_count()
+    count_neg = (mascara & _M_NEGATIVAS).bit_count()
+
+    if count_pos > count_neg and count_pos > 0:
+        return "positivo"
+    elif count_neg > count_pos and count_neg > 0:
+        return "negativo"
+    elif pregunta:
+        return "neutro"
+    elif mascara & _M_DUDA:
+        return "negativo"
+    elif mascara & _M_CONFIRMACION:
+        return "positivo"
+    else:
+        return "neutro"
+
+
+def _palabras_clave(mascara: int) -> List[str]:
+    return [p for p in PALABRAS_CLAVE if mascara & _BIT[p]]
+
+
+def calcular_sentimiento(texto: str) -> str:
+    return _sentimiento(frases_presentes(texto), "?" in texto)
+
+
+def extraer_palabras_clave(texto: str) -> List[str]:
+    """Extrae palabras clave del texto"""
+    return _palabras_clave(frases_presentes(texto))
+
+
+def preprocesar_mensaje(mensaje: str) -> Dict:
+    """Features de un mensaje, con el mismo formato que data/test_message.py"""
+    mascara = frases_presentes(mensaje)
+    sentimiento = _sentimiento(mascara, "?" in mensaje)
+    palabras_clave = _palabras_clave(mascara)
+    return {
+        "num_palabras": len(mensaje.split()),
+        "num_preguntas": mensaje.count("?"),
+        "longitud": len(mensaje),
+        "sentimiento_num": SENT_MAP.get(sentimiento, 0),
+        "num_keywords": len(palabras_clave),
+        "sentimiento": sentimiento,
+        "palabras_clave": palabras_clave,
+    }
+
+
+def _popcount(mascaras: np.ndarray, filtro: int) -> np.ndarray:
+    return np.bitwise_count(mascaras & np.uint64(filtro)).astype(np.int64)
+
+
+def featurizar(textos, listas: bool = True) -> pd.DataFrame:
+    """
+    Features de un lote de mensajes (lista o columna de pandas), iguales
+    fila a fila a `preprocesar_mensaje`. Con listas=False se omiten las
+    columnas `sentimiento` y `palabras_clave` (objetos de Python por fila).
+    """
+    indice = textos.index if isinstance(textos, pd.Series) else None
+    textos = textos.tolist() if isinstance(textos, pd.Series) else list(textos)
+    mascaras, num_palabras, num_preguntas = _analizar([t.lower() for t in textos])
+    # Las mismas reglas que `_sentimiento`, evaluadas por columnas
+    count_pos = _popcount(mascaras, _M_POSITIVAS)
+    count_neg = _popcount(mascaras, _M_NEGATIVAS)
+    sentimiento_num = np.select(
+        [
+            (count_pos > count_neg) & (count_pos > 0),
+            (count_neg > count_pos) & (count_neg > 0),
+            num_preguntas > 0,
+            (mascaras & np.uint64(_M_DUDA)) != 0,
+            (mascaras & np.uint64(_M_CONFIRMACION)) != 0,
+        ],
+        [1, -1, 0, -1, 1],
+        default=0,
+    )
+
+    df = pd.DataFrame({
+        "num_palabras": num_palabras,
+        "num_preguntas": num_preguntas,
+        "longitud": np.fromiter(map(len, textos), dtype=np.int64, count=len(textos)),
+        "sentimiento_num": sentimiento_num.astype(np.int64),
+        "num_keywords": _popcount(mascaras, _M_CLAVE),
+    })
+    if listas:
+        df["sentimiento"] = pd.Series(sentimiento_num).map({v: k for k, v in SENT_MAP.items()})
+        # Pocas combinaciones distintas de palabras clave: una lista por
+        # combinación, compartida por las filas que la tienen
+        clave = mascaras & np.uint64(_M_CLAVE)
+        unicas, inversa = np.unique(clave, return_inverse=True)
+        combinaciones = np.empty(len(unicas), dtype=object)
+        combinaciones[:] = [_palabras_clave(int(m)) for m in unicas]
+        df["palabras_clave"] = combinaciones[inversa]
+    if indice is not None:
+        df.index = indice
+    return df
+
+
+def features_numericas(textos: Sequence[str]) -> np.ndarray:
+    """Matriz (n, 5) de features del modelo para un lote de mensajes."""
+    if len(textos) < 16:
+        # Lotes chicos (un mensaje del webhook): sin el costo fijo de pandas
+        filas = [preprocesar_mensaje(t) for t in textos]
+        return np.array([[f[c] for c in FEATURES] for f in filas], dtype=np.float64).reshape(len(filas), len(FEATURES))
+    return featurizar(textos, listas=False)[FEATURES].to_numpy(dtype=np.float64)
+
+
+def completar_features(df: pd.DataFrame, columna: str = "mensaje") -> pd.DataFrame:
+    """
+    Agrega a `df` las features que no traiga (p. ej. mensajes leídos de
+    Supabase), calculadas en bloque a partir de la columna de texto. Las que
+    ya vienen anotadas en el dataset se respetan.
+    """
+    faltantes = [c for c in COLUMNAS if c not in df.columns]
+    if faltantes:
+        calculadas = featurizar(df[columna].fillna(""), listas="sentimiento" in faltantes or "palabras_clave" in faltantes)
+        for c in faltantes:
+            df[c] = calculadas[c]
+    return df
@@ -0,0 +1,103 @@
+import json
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .features import FEATURES, features_numericas
+from .tree_ensemble import ARCHIVO, MODELS_DIR, TreeEnsemble
+
+
+class IntentClassifier:
+    """
+    Clasificador de intención de mensajes (alta / media / baja).
+
+    Carga una sola vez el modelo, el scaler y el label encoder entrenados por
+    data/train_message.py y clasifica lotes completos: featurización,
+    escalado y predicción en una sola pasada vectorizada. Si existe la
+    exportación a NumPy (modelo_mensajes.npz) se usa esa, sin importar
+    xgboost ni joblib; si no, el modelo de joblib.
+    """
+
+    def __init__(self, model_dir: Path = MODELS_DIR):
+        if (model_dir / ARCHIVO).exists():
+            self.model = TreeEnsemble.load(model_dir / ARCHIVO)
+            self.backend = "numpy"
+            features = self.model.features
+            self._media, self._escala = self.model.media, self.model.escala
+            self.classes: List[str] = self.model.clases
+        else:
+            import joblib  # dependencias del modelo, solo al cargarlo
+
+            info_path = model_dir / "model_info.json"
+            features = json.loads(info_path.read_text(encoding="utf-8")).get("features") if info_path.exists() else None
+            self.model = joblib.load(model_dir / "modelo_mensajes.joblib")
+            self.backend = "xgboost"
+            scaler = joblib.load(model_dir / "scaler_msg.joblib")
+            label_encoder = joblib.load(model_dir / "label_encoder_msg.joblib")
+            # StandardScaler.transform aplicado a mano: mismo resultado, sin la
+            # validación de sklearn en cada llamada
+            self._media = np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else 0.0
+            self._escala = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else 1.0
+            self.classes = [str(c) for c in label_encoder.classes_]
+        if features and features != FEATURES:
+            raise ValueError(f"El modelo espera las features {features}, no {FEATURES}")
+        self.etiquetas: Counter = Counter()
+        self.lotes = 0
+        self.segundos = 0.0
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Probabilidades (n, clases), columnas en el orden de `self.classes`."""
+        if not texts:
+            return np.empty((0, len(self.classes)))
+        inicio = time.perf_counter()
+        X = (features_numericas(texts) - self._media) / self._escala
+        proba = self.model.predict_proba(X)
+        self.lotes += 1
+        self.segundos += time.perf_counter() - inicio
+        return proba
+
+    def predict(self, texts: Sequence[str]) -> List[str]:
+        proba = self.predict_proba(texts)
+        etiquetas = [self.classes[i] for i in proba.argmax(axis=1)]
+        self.etiquetas.update(etiquetas)
+        return etiquetas
+
+    def classify(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        """Intención, confianza y probabilidades por mensaje."""
+        proba = self.predict_proba(texts)
+        resultados = []
+        for fila in proba:
+            i = int(fila.argmax())
+            resultados.append({
+                "intencion": self.classes[i],
+                "confianza": round(float(fila[i]), 4),
+                "probabilidades": {c: round(float(p), 4) for c, p in zip(self.classes, fila)},
+            })
+        self.etiquetas.update(r["intencion"] for r in resultados)
+        return resultados
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "classes": self.classes,
+            "labels": dict(self.etiquetas),
+            "batches": self.lotes,
+            "avg_batch_ms": round(1000 * self.segundos / self.lotes, 3) if self.lotes else 0.0,
+        }
+
+
+def cargar_clasificador(model_dir: Path = MODELS_DIR) -> Optional[IntentClassifier]:
+    """El clasificador es opcional: si faltan el modelo o sus dependencias, la app sigue sin etiquetar."""
+    try:
+        clasificador = IntentClassifier(model_dir)
+    except (ImportError, OSError, ValueError) as e:
+        print(f"Clasificador de intención no disponible: {e}")
+        return None
+    print(f"Clasificador de intención cargado ({', '.join(clasificador.classes)}; {clasificador.backend})")
+    return clasificador
+
+
+intent_classifier = cargar_clasificador()
@@ -0,0 +1,187 @@
+"""
+Puntaje de leads en lote, por partes: los mensajes se leen por páginas
+(keyset sobre el id), cada bloque de páginas se reduce a sumas por lead y
+las sumas se combinan; en memoria solo quedan un bloque de mensajes y una
+fila por lead. Los resultados se escriben con upserts masivos.
+
+Cada mensaje se cuenta igual que en `LeadScorer.registrar`: solo los del
+cliente (tipo_emisor = user), agrupados por numero_whatsapp (el lead_id de
+leads_scores) y con la intención del clasificador, no la de las columnas de
+la tabla; así las sumas escritas son las que el scorer sigue acumulando.
+
+La fuente de datos es cualquier objeto con los métodos de `TablaLocal`
+(la implementación en memoria de `mensajes` / `leads_scores` que usan los
+benchmarks y el modo --local de data/train_lead_score.py).
+"""
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from .features import completar_features
+from .intent_classifier import intent_classifier
+from .lead_scoring import (
+    AgregadosLead,
+    agregados_parciales,
+    combinar_agregados,
+    finalizar_agregados,
+    puntuar_leads,
+)
+
+COL_ID = "id"
+COL_LEAD = "numero_whatsapp"  # wa_id: la misma clave que usa el scorer en tiempo real
+COL_TEXTO = "contenido"
+COL_EMISOR = "tipo_emisor"
+COL_FECHA = "fecha_creacion"
+EMISOR_LEAD = "user"
+COLUMNAS_MENSAJE = (COL_LEAD, COL_TEXTO, COL_FECHA)
+PAGINA = 1000  # filas por página (límite por defecto de PostgREST)
+BLOQUE = 20_000  # mensajes que se featurizan y suman juntos (varias páginas)
+LOTE_UPSERT = 500
+LEADS_POR_FILTRO = 200  # lead_ids por filtro in.(...) en el modo incremental
+
+
+class TablaLocal:
+    """Tablas `mensajes` y `leads_scores` en memoria, con la misma interfaz que la fuente de Supabase."""
+
+    def __init__(self, mensajes: Sequence[Dict[str, Any]], col_id: str = COL_ID):
+        self.col_id = col_id
+        self.mensajes = sorted(mensajes, key=lambda r: r[col_id])
+        self._ids = [r[col_id] for r in self.mensajes]
+        self.leads_scores: Dict[str, Dict[str, Any]] = {}
+        self.paginas_leidas = 0
+        self.upserts = 0
+
+    def pagina_mensajes(self, despues_de: Optional[Any], limite: int, desde: Optional[str] = None,
+                        leads: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Mensajes del cliente con id > despues_de (y fecha > desde, lead en leads), ordenados por id."""
+        self.paginas_leidas += 1
+        elegidos = set(leads) if leads is not None else None
+        inicio = bisect_right(self._ids, despues_de) if despues_de is not None else 0
+        pagina = []
+        for i in range(inicio, len(self.mensajes)):
+            r = self.mensajes[i]
+            if r.get(COL_EMISOR) != EMISOR_LEAD:
+                continue
+            if desde is not None and not (r.get(COL_FECHA) and r[COL_FECHA] > desde):
+                continue
+            if elegidos is not None and r[COL_LEAD] not in elegidos:
+                continue
+            pagina.append(dict(r))
+            if len(pagina) == limite:
+                break
+        return pagina
+
+    def upsert_scores(self, filas: List[Dict[str, Any]]) -> None:
+        self.upserts += 1
+        for fila in filas:
+            self.leads_scores.setdefault(fila["lead_id"], {}).update(fila)
+
+
+def paginas_mensajes(fuente, pagina: int = PAGINA, desde: Optional[str] = None,
+                     leads: Optional[Sequence[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """Recorre los mensajes por keyset sobre el id: cada página sigue al último id de la anterior."""
+    ultimo = None
+    while True:
+        filas = fuente.pagina_mensajes(ultimo, pagina, desde=desde, leads=leads)
+        if filas:
+            yield filas
+        if len(filas) < pagina:
+            return
+        ultimo = filas[-1][fuente.col_id]
+
+
+def preparar_mensajes(filas: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Página de mensajes -> DataFrame por mensaje (lead_id, mensaje, features e
+    intención). Todo sale del texto, como en el scorer: las features o
+    etiquetas guardadas en la tabla se ignoran.
+    """
+    df = pd.DataFrame({
+        "lead_id": [r[COL_LEAD] for r in filas],
+        "mensaje": [r.get(COL_TEXTO) or "" for r in filas],
+    })
+    df = completar_features(df)
+    if intent_classifier is not None:
+        etiquetas = intent_classifier.classify(df["mensaje"].tolist())
+        df["label_intencion"] = [e["intencion"] for e in etiquetas]
+        df["score_msg"] = [e["confianza"] for e in etiquetas]
+    return df
+
+
+def sumar_paginas(paginas, bloque: int = BLOQUE,
+                  preparar: Callable[[List[Dict[str, Any]]], pd.DataFrame] = preparar_mensajes) -> Optional[pd.DataFrame]:
+    """Sumas por lead de todas las páginas, reduciendo cada `bloque` mensajes."""
+    acumulado = None
+    pendientes: List[Dict[str, Any]] = []
+    for filas in paginas:
+        pendientes.extend(filas)
+        if len(pendientes) >= bloque:
+            acumulado = sumar_bloque(acumulado, pendientes, preparar)
+            pendientes = []
+    if pendientes:
+        acumulado = sumar_bloque(acumulado, pendientes, preparar)
+    return acumulado
+
+
+def sumar_bloque(acumulado: Optional[pd.DataFrame], filas: List[Dict[str, Any]],
+                 preparar: Callable[[List[Dict[str, Any]]], pd.DataFrame] = preparar_mensajes) -> Optional[pd.DataFrame]:
+    """Agrega un bloque de mensajes a las sumas por lead (un paso de `sumar_paginas`)."""
+    return _sumar(acumulado, agregados_parciales(preparar(filas)))
+
+
+def puntuar_sumas(sumas: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Puntaje (score_total, label_pred) y agregados de cada lead a partir de sus sumas."""
+    return pd.DataFrame() if sumas is None else puntuar_leads(finalizar_agregados(sumas))
+
+
+def _sumar(acumulado: Optional[pd.DataFrame], parcial: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    if acumulado is None or parcial is None:
+        return parcial if acumulado is None else acumulado
+    return combinar_agregados(acumulado, parcial)
+
+
+def leads_con_mensajes_desde(fuente, desde: str, pagina: int = PAGINA) -> List[str]:
+    leads = set()
+    for filas in paginas_mensajes(fuente, pagina, desde=desde):
+        leads.update(r[COL_LEAD] for r in filas)
+    return sorted(leads)
+
+
+def filas_scores(df_leads: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Filas de leads_scores: puntaje, promedios y las sumas con que sigue el scorer en tiempo real."""
+    ahora = datetime.now(timezone.utc).isoformat()
+    filas = []
+    for r in df_leads.to_dict("records"):
+        filas.append({
+            "lead_id": r["lead_id"],
+            "score_total": float(r["score_total"]),
+            "categoria": r["label_pred"],
+            "score_promedio_msg": float(r["score_promedio_msg"]),
+            "sentimiento_promedio": float(r["sentimiento_promedio"]),
+            **{c: (float(r[c]) if c.startswith("suma_") else int(r[c])) for c in AgregadosLead.COLUMNAS},
+            "fecha_actualizacion": ahora,
+        })
+    return filas
+
+
+def pipeline_scoring(fuente, desde: Optional[str] = None, pagina: int = PAGINA, bloque: int = BLOQUE,
+                     lote_upsert: int = LOTE_UPSERT) -> pd.DataFrame:
+    """
+    Recalcula y guarda el puntaje de los leads. Con `desde` (ISO 8601) solo
+    los leads que tienen mensajes posteriores, recalculados con todo su historial.
+    """
+    if desde is None:
+        sumas = sumar_paginas(paginas_mensajes(fuente, pagina), bloque)
+    else:
+        leads = leads_con_mensajes_desde(fuente, desde, pagina)
+        sumas = None
+        for i in range(0, len(leads), LEADS_POR_FILTRO):
+            paginas = paginas_mensajes(fuente, pagina, leads=leads[i:i + LEADS_POR_FILTRO])
+            sumas = _sumar(sumas, sumar_paginas(paginas, bloque))
+    df_leads = puntuar_sumas(sumas)
+    filas = filas_scores(df_leads)
+    for i in range(0, len(filas), lote_upsert):
+        fuente.upsert_scores(filas[i:i + lote_upsert])
+    return df_leads
@@ -0,0 +1,176 @@
+"""
+Puntaje de leads a partir de sus mensajes: pesos, fórmula y categorías que
+usan tanto el script de data/train_lead_score.py (en lote) como el scorer en
+tiempo real de la API (un mensaje a la vez).
+"""
+import re
+from typing import Any, Dict, Mapping, Optional
+
+import pandas as pd
+
+W_SCORE_PROMEDIO = 0.50
+W_PREGUNTAS = 0.20
+W_PRESUPUESTO = 0.10
+W_SENTIMIENTO = 0.10
+W_NUM_MENSAJES = 0.10
+
+PESOS_INTENCION = {"alta": 1.0, "media": 0.5, "baja": 0.1}
+PESO_INTENCION_DEFECTO = 0.1
+
+# Mención de presupuesto (sin distinguir mayúsculas), como str.contains(..., case=False)
+PATRON_PRESUPUESTO = "presupuesto|precio|pagar"
+_PRESUPUESTO = re.compile(PATRON_PRESUPUESTO, re.IGNORECASE)
+
+# Nivel de interés que muestra el dashboard (clientes_potenciales.nivel_interes)
+NIVEL_INTERES = {"caliente": "Alto", "tibio": "Medio", "frio": "Bajo"}
+
+
+def calcular_score_msg(row) -> float:
+    # valores de intención
+    peso = PESOS_INTENCION.get(row.get("label_intencion"), PESO_INTENCION_DEFECTO)
+    return row.get("score_msg", 0) * peso
+
+
+def calcular_score_total(row) -> float:
+    norm = lambda x: min(x / 10, 1)  # noqa: E731
+    norm_sent = (row["sentimiento_promedio"] + 1) / 2
+    return round(min(
+        W_SCORE_PROMEDIO * row["score_promedio_msg"] +
+        W_PREGUNTAS * norm(row["num_preguntas_total"]) +
+        W_PRESUPUESTO * row["mencion_presupuesto"] +
+        W_SENTIMIENTO * norm_sent +
+        W_NUM_MENSAJES * norm(row["num_mensajes_total"]),
+        1
+    ), 3)
+
+
+def clasificar_lead(score: float) -> str:
+    if score >= 0.7:
+        return "caliente"
+    elif score >= 0.45:
+        return "tibio"
+    else:
+        return "frio"
+
+
+def menciona_presupuesto(mensaje: str) -> bool:
+    return _PRESUPUESTO.search(mensaje) is not None
+
+
+# Promedios por lead: columna por mensaje -> (suma, cantidad de valores no nulos)
+_PROMEDIOS = {
+    "num_palabras": ("suma_palabras", "n_palabras"),
+    "num_preguntas": ("num_preguntas_total", "n_preguntas"),
+    "longitud": ("suma_longitud", "n_longitud"),
+    "score_ponderado": ("suma_score_ponderado", "n_score_ponderado"),
+    "sentimiento_num": ("suma_sentimiento", "n_sentimiento"),
+}
+
+
+def agregados_parciales(df_msgs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sumas por lead_id de un grupo de mensajes. Espera las columnas lead_id,
+    mensaje, num_palabras, num_preguntas, longitud y sentimiento_num (y
+    opcionalmente label_intencion / score_msg). Las sumas de dos grupos se
+    juntan con `combinar_agregados`, así un lote se puede procesar por partes.
+    """
+    score_msg = df_msgs["score_msg"] if "score_msg" in df_msgs.columns else 0
+    label = df_msgs["label_intencion"] if "label_intencion" in df_msgs.columns else pd.Series(index=df_msgs.index, dtype=object)
+    df = df_msgs.assign(
+        score_ponderado=score_msg * label.map(PESOS_INTENCION).fillna(PESO_INTENCION_DEFECTO),
+        presupuesto=df_msgs["mensaje"].str.contains(PATRON_PRESUPUESTO, case=False, na=False),
+    )
+    g = df.groupby("lead_id")
+    parciales = {"num_mensajes_total": g.size()}
+    for columna, (suma, cantidad) in _PROMEDIOS.items():
+        parciales[suma] = g[columna].sum()
+        parciales[cantidad] = g[columna].count()
+    parciales["mencion_presupuesto"] = g["presupuesto"].any().astype(int)
+    return pd.DataFrame(parciales)
+
+
+def combinar_agregados(a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+    combinados = a.add(b, fill_value=0)
+    combinados["mencion_presupuesto"] = combinados["mencion_presupuesto"].clip(upper=1)
+    return combinados
+
+
+def finalizar_agregados(sumas: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por lead_id con los promedios y totales que usa calcular_score_total."""
+    promedio = lambda columna: sumas[_PROMEDIOS[columna][0]] / sumas[_PROMEDIOS[columna][1]].replace(0, float("nan"))  # noqa: E731
+    return pd.DataFrame({
+        "num_palabras": promedio("num_palabras"),
+        "num_preguntas": promedio("num_preguntas"),
+        "longitud": promedio("longitud"),
+        "score_promedio_msg": promedio("score_ponderado"),
+        "num_mensajes_total": sumas["num_mensajes_total"].astype(int),
+        "num_preguntas_total": sumas["num_preguntas_total"].astype(int),
+        "mencion_presupuesto": sumas["mencion_presupuesto"].astype(int),
+        "sentimiento_promedio": promedio("sentimiento_num"),
+        # Sumas con las que el scorer en tiempo real sigue acumulando
+        "suma_score_ponderado": sumas["suma_score_ponderado"].astype(float),
+        "suma_sentimiento": sumas["suma_sentimiento"].astype(float),
+    }, index=sumas.index).rename_axis("lead_id").reset_index()
+
+
+def construir_dataset_leads(df_msgs: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por lead_id con los agregados de todos sus mensajes (ver `agregados_parciales`)."""
+    return finalizar_agregados(agregados_parciales(df_msgs))
+
+
+def puntuar_leads(df_leads: pd.DataFrame) -> pd.DataFrame:
+    df_leads["score_total"] = df_leads.apply(calcular_score_total, axis=1)
+    df_leads["label_pred"] = df_leads["score_total"].apply(clasificar_lead)
+    return df_leads
+
+
+class AgregadosLead:
+    """
+    Sumas corrientes de los mensajes de un lead. Cada mensaje nuevo las
+    actualiza en O(1) y de ellas salen los mismos promedios y totales que
+    `construir_dataset_leads` calcula con groupby.
+    """
+
+    COLUMNAS = ("num_mensajes_total", "num_preguntas_total", "suma_score_ponderado",
+                "suma_sentimiento", "mencion_presupuesto")
+
+    __slots__ = COLUMNAS
+
+    def __init__(self, num_mensajes_total: int = 0, num_preguntas_total: int = 0,
+                 suma_score_ponderado: float = 0.0, suma_sentimiento: float = 0.0,
+                 mencion_presupuesto: int = 0):
+        self.num_mensajes_total = num_mensajes_total
+        self.num_preguntas_total = num_preguntas_total
+        self.suma_score_ponderado = suma_score_ponderado
+        self.suma_sentimiento = suma_sentimiento
+        self.mencion_presupuesto = mencion_presupuesto
+
+    @classmethod
+    def desde_fila(cls, fila: Mapping[str, Any]) -> Optional["AgregadosLead"]:
+        """Agregados guardados en leads_scores; None si la fila no los tiene (p. ej. la escribió el script en lote)."""
+        if any(fila.get(c) is None for c in cls.COLUMNAS):
+            return None
+        return cls(**{c: fila[c] for c in cls.COLUMNAS})
+
+    def agregar(self, num_preguntas: int, sentimiento_num: int, score_ponderado: float, presupuesto: bool) -> None:
+        self.num_mensajes_total += 1
+        self.num_preguntas_total += num_preguntas
+        self.suma_score_ponderado += score_ponderado
+        self.suma_sentimiento += sentimiento_num
+        self.mencion_presupuesto = int(self.mencion_presupuesto or presupuesto)
+
+    def resultado(self) -> Dict[str, Any]:
+        """Promedios, score_total y categoría, con las claves de leads_scores."""
+        n = self.num_mensajes_total or 1
+        fila = {
+            "score_promedio_msg": self.suma_score_ponderado / n,
+            "num_mensajes_total": self.num_mensajes_total,
+            "num_preguntas_total": self.num_preguntas_total,
+            "mencion_presupuesto": self.mencion_presupuesto,
+            "sentimiento_promedio": self.suma_sentimiento / n,
+        }
+        fila["score_total"] = calcular_score_total(fila)
+        fila["categoria"] = clasificar_lead(fila["score_total"])
+        fila["suma_score_ponderado"] = self.suma_score_ponderado
+        fila["suma_sentimiento"] = self.suma_sentimiento
+        return fila
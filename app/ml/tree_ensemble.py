@@ -0,0 +1,235 @@
+"""
+Modelo de intención sin xgboost: los árboles del booster entrenado se
+exportan a arreglos de NumPy (.npz) junto con el scaler y el label encoder,
+y se evalúan por lotes con la misma regla de decisión que xgboost
+(float32, `x < umbral` va a la izquierda, los valores faltantes siguen la
+rama por defecto), suma de hojas por clase y softmax.
+
+Evaluación tipo QuickScorer: las hojas de cada árbol se numeran de
+izquierda a derecha y cada nodo interno guarda la máscara de bits que
+apaga las hojas de su subárbol izquierdo. Si `x >= umbral` la fila va a la
+derecha y se aplica la máscara; la hoja de salida es el bit encendido más
+bajo del AND de todas las máscaras aplicadas. Como los nodos de una
+feature que aplican su máscara son los de umbral <= x, al cargar se
+precalcula por feature una tabla (tramo de x entre umbrales, árbol) con el
+AND acumulado: una fila se evalúa con una búsqueda por feature y un AND de
+filas de tabla, sin recorrer los árboles.
+
+Exportar los modelos ya entrenados:
+    python -m app.ml.tree_ensemble [directorio_de_modelos]
+"""
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+
+MODELS_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "models"
+ARCHIVO = "modelo_mensajes.npz"
+MAX_HOJAS = 64  # hojas por árbol: una máscara uint64
+TOLERANCIA_MARGEN = 1e-4
+FILAS_POR_BLOQUE = 128  # filas evaluadas juntas: los arreglos (filas x árboles) intermedios caben en caché
+
+
+class TreeEnsemble:
+    """Ensamble de árboles de xgboost (multi:softprob) evaluado con NumPy."""
+
+    def __init__(self, arbol: np.ndarray, variable: np.ndarray, umbral: np.ndarray, por_defecto_izq: np.ndarray,
+                 mascara: np.ndarray, hojas: np.ndarray, clase_arbol: np.ndarray, margen_base: np.ndarray,
+                 media: np.ndarray, escala: np.ndarray, clases: List[str], features: List[str]):
+        # Nodos internos: árbol, feature, umbral, rama por defecto y máscara de su subárbol izquierdo
+        self.arbol = np.asarray(arbol, dtype=np.int32)
+        self.variable = np.asarray(variable, dtype=np.int32)
+        self.umbral = np.asarray(umbral, dtype=np.float32)
+        self.por_defecto_izq = np.asarray(por_defecto_izq, dtype=bool)
+        self.mascara = np.asarray(mascara, dtype=np.uint64)
+        # Por árbol: valores de las hojas de izquierda a derecha (rellenado con 0) y clase
+        self.hojas = np.asarray(hojas, dtype=np.float32)
+        self.clase_arbol = np.asarray(clase_arbol, dtype=np.int32)
+        self.margen_base = np.asarray(margen_base, dtype=np.float64)
+        self.media = np.asarray(media, dtype=np.float64)
+        self.escala = np.asarray(escala, dtype=np.float64)
+        self.clases = list(clases)
+        self.features = list(features)
+        self.n_arboles = len(self.hojas)
+
+        # Máscaras de 32 bits si alcanzan: la mitad de memoria que recorrer por fila
+        self._tipo = np.uint32 if self.hojas.shape[1] <= 32 else np.uint64
+        self._tablas = [self._tabla(f) for f in range(len(self.features))]
+        self._hojas = self.hojas.astype(np.float64).ravel()
+        self._inicio_hojas = np.arange(self.n_arboles, dtype=np.intp) * self.hojas.shape[1]
+        self._clase = np.zeros((self.n_arboles, len(self.clases)))
+        self._clase[np.arange(self.n_arboles), self.clase_arbol] = 1.0
+
+    def _tabla(self, f: int):
+        """
+        (umbrales ordenados, tabla) de la feature f: la fila b de la tabla es,
+        por árbol, el AND de las máscaras de los nodos con los b umbrales más
+        bajos (x en el tramo b); la última fila es la de x faltante.
+        """
+        nodos = np.flatnonzero(self.variable == f)
+        if not len(nodos):
+            return None
+        umbrales = np.unique(self.umbral[nodos])
+        tabla = np.full((len(umbrales) + 2, self.n_arboles), np.iinfo(np.uint64).max, dtype=np.uint64)
+        tramo = np.searchsorted(umbrales, self.umbral[nodos]) + 1
+        np.bitwise_and.at(tabla, (tramo, self.arbol[nodos]), self.mascara[nodos])
+        np.bitwise_and.accumulate(tabla[:-1], axis=0, out=tabla[:-1])
+        derecha = nodos[~self.por_defecto_izq[nodos]]
+        np.bitwise_and.at(tabla[-1], self.arbol[derecha], self.mascara[derecha])
+        return umbrales, tabla.astype(self._tipo)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "TreeEnsemble":
+        with np.load(path, allow_pickle=False) as datos:
+            return cls(
+                datos["arbol"], datos["variable"], datos["umbral"], datos["por_defecto_izq"], datos["mascara"],
+                datos["hojas"], datos["clase_arbol"], datos["margen_base"], datos["media"], datos["escala"],
+                [str(c) for c in datos["clases"]], [str(f) for f in datos["features"]],
+            )
+
+    def save(self, path: Union[str, Path]) -> None:
+        np.savez_compressed(
+            path,
+            arbol=self.arbol.astype(np.int16 if self.n_arboles < 2 ** 15 else np.int32),
+            variable=self.variable.astype(np.uint8 if len(self.features) <= 256 else np.int32),
+            umbral=self.umbral,
+            por_defecto_izq=self.por_defecto_izq,
+            mascara=self.mascara,
+            hojas=self.hojas,
+            clase_arbol=self.clase_arbol.astype(np.int16),
+            margen_base=self.margen_base,
+            media=self.media,
+            escala=self.escala,
+            clases=np.array(self.clases),
+            features=np.array(self.features),
+        )
+
+    def margin(self, X: np.ndarray) -> np.ndarray:
+        """Margen por clase (n, clases) de filas ya escaladas, como output_margin=True de xgboost."""
+        X = np.asarray(X, dtype=np.float32)
+        margenes = np.empty((len(X), len(self.clases)))
+        for i in range(0, len(X), FILAS_POR_BLOQUE):
+            margenes[i:i + FILAS_POR_BLOQUE] = self._valores_hoja(X[i:i + FILAS_POR_BLOQUE]) @ self._clase
+        return margenes + self.margen_base
+
+    def _valores_hoja(self, X: np.ndarray) -> np.ndarray:
+        vivas = None
+        for f, tabla in enumerate(self._tablas):
+            if tabla is None:
+                continue
+            umbrales, filas = tabla
+            x = X[:, f]
+            tramo = np.searchsorted(umbrales, x, side="right")
+            tramo[np.isnan(x)] = len(filas) - 1
+            if vivas is None:
+                vivas = filas[tramo]
+            else:
+                vivas &= filas[tramo]
+        if vivas is None:  # ningún árbol tiene splits: todos son una sola hoja
+            return np.broadcast_to(self.hojas[:, 0].astype(np.float64), (len(X), self.n_arboles))
+        # Bit encendido más bajo -> número de hoja: el exponente de la potencia de dos en float32
+        primera = vivas & (~vivas + self._tipo(1))
+        hoja = (primera.astype(np.float32).view(np.int32) >> 23) - 127
+        hoja += self._inicio_hojas
+        return self._hojas[hoja]
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Probabilidades (n, clases) de filas ya escaladas."""
+        margenes = self.margin(X)
+        margenes -= margenes.max(axis=1, keepdims=True)
+        proba = np.exp(margenes)
+        proba /= proba.sum(axis=1, keepdims=True)
+        return proba
+
+
+def _modelo_xgboost(booster, n_clases: int) -> Tuple[List[Dict[str, Any]], List[int], np.ndarray]:
+    """Árboles, clase de cada árbol y base_score del modelo JSON de xgboost (hasta best_iteration, si hubo early stopping)."""
+    aprendiz = json.loads(booster.save_raw("json"))["learner"]
+    modelo = aprendiz["gradient_booster"]["model"]
+    arboles, clases = modelo["trees"], modelo["tree_info"]
+    mejor = booster.attr("best_iteration")
+    if mejor is not None:
+        fin = modelo["iteration_indptr"][int(mejor) + 1]
+        arboles, clases = arboles[:fin], clases[:fin]
+    # Escalar ("5E-1") hasta xgboost 2.x, un valor por clase ("[3.3333334E-1,...]") desde 3.x
+    base = [float(v) for v in aprendiz["learner_model_param"]["base_score"].strip("[]").split(",")]
+    return arboles, clases, np.broadcast_to(np.asarray(base, dtype=np.float32), (n_clases,)).astype(np.float64)
+
+
+def _recorrer(arbol: Dict[str, Any], t: int, nodos: List[tuple], hojas: List[float], nodo: int = 0) -> Tuple[int, int]:
+    """Numera las hojas de izquierda a derecha; devuelve el rango [desde, hasta) de hojas bajo `nodo`."""
+    izq = arbol["left_children"][nodo]
+    if izq == -1:
+        hojas.append(arbol["split_conditions"][nodo])  # el valor de la hoja ya incluye el learning rate
+        return len(hojas) - 1, len(hojas)
+    if arbol.get("split_type", [0])[nodo] != 0:
+        raise ValueError("Los splits categóricos no están soportados")
+    desde, medio = _recorrer(arbol, t, nodos, hojas, izq)
+    _, hasta = _recorrer(arbol, t, nodos, hojas, arbol["right_children"][nodo])
+    mascara = ~(((1 << (medio - desde)) - 1) << desde) & (2 ** 64 - 1)
+    nodos.append((t, arbol["split_indices"][nodo], arbol["split_conditions"][nodo],
+                  bool(arbol["default_left"][nodo]), mascara))
+    return desde, hasta
+
+
+def exportar_xgboost(model, scaler, label_encoder, features: List[str]) -> TreeEnsemble:
+    """Convierte un XGBClassifier multiclase (más scaler y label encoder) en un TreeEnsemble."""
+    import xgboost as xgb
+
+    booster = model.get_booster()
+    clases = [str(c) for c in label_encoder.classes_]
+    arboles, clase_arbol, margen_base = _modelo_xgboost(booster, len(clases))
+    nodos: List[tuple] = []
+    hojas_por_arbol = []
+    for t, arbol in enumerate(arboles):
+        hojas: List[float] = []
+        _recorrer(arbol, t, nodos, hojas)
+        if len(hojas) > MAX_HOJAS:
+            raise ValueError(f"El árbol {t} tiene {len(hojas)} hojas (máximo {MAX_HOJAS})")
+        hojas_por_arbol.append(hojas)
+    hojas = np.zeros((len(arboles), max(map(len, hojas_por_arbol))), dtype=np.float32)
+    for t, valores in enumerate(hojas_por_arbol):
+        hojas[t, :len(valores)] = valores
+
+    arbol, variable, umbral, por_defecto_izq, mascara = zip(*nodos) if nodos else ([],) * 5
+    media = np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else np.zeros(len(features))
+    escala = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else np.ones(len(features))
+    ensamble = TreeEnsemble(arbol, variable, umbral, por_defecto_izq, np.array(mascara, dtype=np.uint64),
+                            hojas, clase_arbol, margen_base, media, escala, clases, features)
+
+    # Mismo resultado que el booster (salvo el redondeo de sumar en float32)
+    prueba = np.random.default_rng(0).normal(size=(256, len(features))).astype(np.float32)
+    prueba[::7, 0] = np.nan
+    esperado = booster.predict(xgb.DMatrix(prueba), output_margin=True).reshape(len(prueba), -1)
+    diferencia = np.abs(esperado - ensamble.margin(prueba)).max()
+    if diferencia > TOLERANCIA_MARGEN:
+        raise ValueError(f"El modelo exportado difiere de xgboost (margen {diferencia:.2e})")
+    return ensamble
+
+
+def exportar_modelos(model_dir: Path) -> Path:
+    """Exporta modelo_mensajes.joblib + scaler + label encoder de `model_dir` a modelo_mensajes.npz."""
+    import joblib
+
+    from .features import FEATURES
+
+    info_path = model_dir / "model_info.json"
+    features = FEATURES
+    if info_path.exists():
+        features = json.loads(info_path.read_text(encoding="utf-8")).get("features") or FEATURES
+    ensamble = exportar_xgboost(
+        joblib.load(model_dir / "modelo_mensajes.joblib"),
+        joblib.load(model_dir / "scaler_msg.joblib"),
+        joblib.load(model_dir / "label_encoder_msg.joblib"),
+        features,
+    )
+    destino = model_dir / ARCHIVO
+    ensamble.save(destino)
+    print(f"✓ {ensamble.n_arboles} árboles ({len(ensamble.umbral)} nodos internos) exportados a {destino}")
+    return destino
+
+
+if __name__ == "__main__":
+    exportar_modelos(Path(sys.argv[1]) if len(sys.argv) > 1 else MODELS_DIR)
@@ -0,0 +1,27 @@
+"""
+Reconciliación del puntaje de leads: recalcula en lote, desde `mensajes`,
+lo que el scorer en tiempo real acumula en `leads_scores` y muestra las
+diferencias. Con --aplicar reescribe las filas que difieren (sirve también
+como carga inicial tras aplicar sql/leads_scores.sql). Uso:
+    python -m app.reconciliar_leads [--aplicar]
+"""
+import asyncio
+import json
+import sys
+
+from .database import get_async_supabase_client
+from .services.lead_scorer import lead_scorer
+
+
+async def main(aplicar: bool) -> None:
+    db = get_async_supabase_client()
+    await db.start()
+    try:
+        reporte = await lead_scorer.reconciliar(aplicar=aplicar)
+        print(json.dumps(reporte, ensure_ascii=False, indent=2, default=str))
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main("--aplicar" in sys.argv[1:]))
@@ -0,0 +1,34 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+
+from ..config import Config
+from ..services.catalog_reloader import STORES, CatalogReloader
+from ..services.lead_scorer import lead_scorer
+
+router = APIRouter(tags=["Admin"])
+catalog_reloader = CatalogReloader(watch_interval=Config.CATALOG_WATCH_INTERVAL)
+
+def _verificar_token(token: Optional[str]) -> None:
+    # Sin ADMIN_TOKEN los endpoints quedan cerrados: recargar o reconciliar cuesta llamadas a OpenAI y escribe en Supabase
+    if not Config.ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Endpoints de administración desactivados (ADMIN_TOKEN no definido)")
+    if token is None or not hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Token de administración inválido")
+
+@router.post("/reload")
+async def recargar_catalogo(store: str = "all", x_admin_token: Optional[str] = Header(None)):
+    """Recarga FAQs y/o productos sin reiniciar el servidor (store = faq | product | all)."""
+    _verificar_token(x_admin_token)
+    if store == "all":
+        return await catalog_reloader.reload_all()
+    if store not in STORES:
+        raise HTTPException(status_code=400, detail=f"Store desconocido: {store}")
+    return await catalog_reloader.reload(store)
+
+@router.post("/leads/reconciliar")
+async def reconciliar_leads(aplicar: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """Compara el puntaje acumulado de cada lead con el recalculado en lote (aplicar=true lo corrige)."""
+    _verificar_token(x_admin_token)
+    return await lead_scorer.reconciliar(aplicar=aplicar)
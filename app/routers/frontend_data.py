@@ -1,20 +1,114 @@
-from fastapi import APIRouter
+import asyncio
+from typing import Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.config import Config
 from app.services.data_al_frontend import (
     obtener_leads_frontend,
     obtener_conversaciones_por_numero,
     obtener_historial_por_numero,
+    marcar_conversacion_leida,
 )
+from app.services.event_hub import event_hub, formato_sse
+from app.services.paginacion import CursorInvalido
+from app.services.response_cache import response_cache
 
 router = APIRouter(tags=["Frontend"])
 
+# Las listas siguen siendo arrays; los cursores de la página viajan en headers
+# (X-Next-Cursor: más antiguos, X-Prev-Cursor: más recientes) y se pasan en ?cursor=
+def _con_cursores(response: Response, cursores: Dict[str, Optional[str]]) -> None:
+    if cursores.get("next"):
+        response.headers["X-Next-Cursor"] = cursores["next"]
+    if cursores.get("prev"):
+        response.headers["X-Prev-Cursor"] = cursores["prev"]
+
+async def _pagina(response: Response, consulta):
+    try:
+        items, cursores = await consulta
+    except CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _con_cursores(response, cursores)
+    return items
+
+def _etag_coincide(request: Request, etag: str) -> bool:
+    enviados = request.headers.get("if-none-match", "")
+    return any(e.strip().removeprefix("W/") == etag for e in enviados.split(",")) or enviados.strip() == "*"
+
+async def _pagina_cacheada(request: Request, consulta):
+    """
+    Respuestas de polling del dashboard: salen de response_cache mientras no
+    haya mensajes nuevos (y dentro del TTL) y responden 304 si el ETag coincide.
+    """
+    clave = request.url.path + "?" + "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    entrada = response_cache.get(clave)
+    if entrada is None:
+        version = response_cache.version
+        tmp = Response()
+        items = await _pagina(tmp, consulta())
+        headers = {k: v for k, v in tmp.headers.items() if k.startswith("x-")}
+        entrada = response_cache.put(clave, JSONResponse(items).body, headers, version)
+
+    headers = {**entrada.headers, "ETag": entrada.etag, "Cache-Control": "private, no-cache"}
+    if _etag_coincide(request, entrada.etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(entrada.body, media_type="application/json", headers=headers)
+
 @router.get("/leads")
-def listar_leads(limit: int = 100):
-    return obtener_leads_frontend(limit)
+async def listar_leads(request: Request, limit: int = 100, cursor: Optional[str] = None):
+    return await _pagina_cacheada(request, lambda: obtener_leads_frontend(limit, cursor))
 
 @router.get("/conversaciones")
-def listar_conversaciones(limit: int = 50):
-    return obtener_conversaciones_por_numero(limit)
+async def listar_conversaciones(request: Request, limit: int = 50, cursor: Optional[str] = None):
+    return await _pagina_cacheada(request, lambda: obtener_conversaciones_por_numero(limit, cursor))
 
 @router.get("/conversaciones/{wa_id}/mensajes")
-def historial_conversacion(wa_id: str, limit: int = 200):
-    return obtener_historial_por_numero(wa_id, limit)
+async def historial_conversacion(response: Response, wa_id: str, limit: int = 200, cursor: Optional[str] = None):
+    return await _pagina(response, obtener_historial_por_numero(wa_id, limit, cursor))
+
+@router.post("/conversaciones/{wa_id}/leida")
+async def marcar_leida(wa_id: str):
+    await marcar_conversacion_leida(wa_id)
+    response_cache.invalidate()
+    return {"status": "ok"}
+
+@router.get("/stream")
+async def stream_eventos(request: Request, wa_id: Optional[str] = None, last_event_id: Optional[int] = None):
+    """
+    Feed en vivo (Server-Sent Events) de mensajes nuevos y cambios de
+    conversaciones; con `wa_id` solo los de esa conversación. Al reconectar,
+    EventSource envía Last-Event-ID y se reenvían los eventos perdidos; un
+    evento `reset` indica que hay que recargar por REST.
+    """
+    header = request.headers.get("last-event-id")
+    if header and header.isdigit():
+        last_event_id = int(header)
+    sub = event_hub.subscribe(wa_id, last_event_id)
+
+    async def eventos():
+        try:
+            yield "retry: 3000\n\n"
+            for evento in sub.replay:
+                yield formato_sse(evento)
+            while True:
+                try:
+                    evento = await asyncio.wait_for(sub.queue.get(), timeout=Config.EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if evento is None:
+                    # Cliente lento o servidor apagándose: EventSource reconecta solo
+                    break
+                yield formato_sse(evento)
+        finally:
+            event_hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
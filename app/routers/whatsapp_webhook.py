@@ -1,12 +1,29 @@
 import json
 
 from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
 
 from ..config import Config
 from ..services.message_handler import MessageHandler
+from ..services.webhook_queue import WebhookQueue
+from ..services.whatsapp_service import WhatsAppService
 
 router = APIRouter()
 message_handler = MessageHandler()
+webhook_queue = WebhookQueue(
+    message_handler.process_webhook_event,
+    workers=Config.WEBHOOK_WORKERS,
+    maxsize=Config.WEBHOOK_QUEUE_MAXSIZE,
+)
+
+def _payload_valido(data) -> bool:
+    if not isinstance(data, dict):
+        return False
+    entry = data.get("entry")
+    if not isinstance(entry, list) or not entry:
+        return False
+    changes = entry[0].get("changes") if isinstance(entry[0], dict) else None
+    return isinstance(changes, list) and bool(changes)
 
 @router.get("/")
 async def verify_token(request: Request):
@@ -17,6 +34,28 @@ async def verify_token(request: Request):
 
 @router.post("/")
 async def receive_message(request: Request):
-    data = await request.json()
+    try:
+        data = await request.json()
+    except json.JSONDecodeError:
+        return JSONResponse({"status": "error", "detail": "JSON inválido"}, status_code=400)
+
+    if not _payload_valido(data):
+        return JSONResponse({"status": "error", "detail": "Payload no reconocido"}, status_code=400)
+
+    if Config.WEBHOOK_QUEUE_ENABLED and webhook_queue.running:
+        if not webhook_queue.enqueue(data):
+            # Meta reintenta el webhook si no recibe 200
+            return JSONResponse({"status": "busy"}, status_code=503)
+        return {"status": "queued"}
+
     await message_handler.process_webhook_event(data)
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@router.get("/stats")
+async def webhook_stats():
+    return {
+        "queue": webhook_queue.stats(),
+        "coalescer": message_handler.coalescer.stats(),
+        "dedup": message_handler.dedup.stats(),
+        "whatsapp": WhatsAppService().stats(),
+    }
@@ -0,0 +1,126 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import Config
+from ..tools import faq_tool
+
+MIN_PALABRAS = 3
+
+
+class SemanticAnswerCache:
+    """
+    Respuestas del agente a preguntas tipo FAQ, indexadas por el embedding de
+    la pregunta. Una pregunta casi igual a una ya respondida ("¿cuánto es la
+    garantía?" / "cuanto pago de garantia") recibe la misma respuesta sin
+    pasar por el LLM.
+
+    Solo se guardan turnos que se respondieron únicamente con search_faq.
+    Las entradas vencen por TTL y se descartan todas cuando cambia la versión
+    del FAQStore (recarga en caliente).
+    """
+
+    def __init__(self, threshold: float = 0.93, ttl: float = 6 * 3600, max_items: int = 1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_items = max_items
+        self._matriz: Optional[np.ndarray] = None  # filas normalizadas, buffer circular
+        self._respuestas: List[Optional[Tuple[str, str]]] = [None] * max_items  # (pregunta, respuesta)
+        self._creado = np.zeros(max_items, dtype=np.float64)
+        self._ocupadas = np.zeros(max_items, dtype=bool)
+        self._siguiente = 0
+        self._version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def _vigente(self) -> None:
+        """Vacía la caché si las FAQs se recargaron con otro contenido."""
+        version = faq_tool.faq_store.version
+        if version != self._version:
+            self._ocupadas[:] = False
+            self._respuestas = [None] * self.max_items
+            self._version = version
+
+    def _mejor(self, q: np.ndarray) -> Tuple[int, float]:
+        if self._matriz is None or not self._ocupadas.any():
+            return -1, 0.0
+        sims = self._matriz @ q
+        vivas = self._ocupadas & (time.time() - self._creado <= self.ttl)
+        sims = np.where(vivas, sims, -np.inf)
+        i = int(np.argmax(sims))
+        return i, float(sims[i])
+
+    @staticmethod
+    def _normalizar(embedding) -> np.ndarray:
+        q = np.asarray(embedding, dtype=np.float32)
+        norma = np.linalg.norm(q)
+        return q / norma if norma else q
+
+    def lookup(self, pregunta: str, embedding) -> Optional[str]:
+        self._vigente()
+        i, sim = self._mejor(self._normalizar(embedding))
+        if i >= 0 and sim >= self.threshold:
+            self.hits += 1
+            print(f"Caché de respuestas: HIT ({sim:.3f}) '{pregunta}' ~ '{self._respuestas[i][0]}'")
+            return self._respuestas[i][1]
+        self.misses += 1
+        print(f"Caché de respuestas: MISS ({sim:.3f}) '{pregunta}'")
+        return None
+
+    def store(self, pregunta: str, embedding, respuesta: str) -> None:
+        self._vigente()
+        q = self._normalizar(embedding)
+        if self._matriz is None:
+            self._matriz = np.zeros((self.max_items, q.shape[0]), dtype=np.float32)
+        if self._mejor(q)[1] >= self.threshold:
+            return
+        i = self._siguiente
+        self._matriz[i] = q
+        self._respuestas[i] = (pregunta, respuesta)
+        self._creado[i] = time.time()
+        self._ocupadas[i] = True
+        self._siguiente = (i + 1) % self.max_items
+        self.stores += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": int(self._ocupadas.sum()),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def es_cacheable(burst: List[Dict[str, str]], texto: str) -> bool:
+    """
+    Preguntas que se pueden responder sin contexto: un solo mensaje, de
+    largo acotado y con al menos unas palabras ("y eso?" depende de la conversación).
+    """
+    return (
+        Config.ANSWER_CACHE_ENABLED
+        and len(burst) == 1
+        and len(texto) <= Config.ANSWER_CACHE_MAX_CHARS
+        and len(texto.split()) >= MIN_PALABRAS
+    )
+
+
+def solo_faq(mensajes_nuevos) -> bool:
+    """True si el turno del agente llamó herramientas y todas fueron search_faq."""
+    herramientas = [
+        llamada["name"]
+        for m in mensajes_nuevos
+        for llamada in (getattr(m, "tool_calls", None) or [])
+    ]
+    return bool(herramientas) and all(h == "search_faq" for h in herramientas)
+
+
+answer_cache = SemanticAnswerCache(
+    threshold=Config.ANSWER_CACHE_THRESHOLD,
+    ttl=Config.ANSWER_CACHE_TTL,
+    max_items=Config.ANSWER_CACHE_SIZE,
+)
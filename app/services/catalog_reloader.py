@@ -0,0 +1,97 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from ..tools import faq_tool, product_tool
+
+# nombre -> (archivo fuente, función de recarga, acceso al snapshot vigente)
+STORES = {
+    "faq": (faq_tool.FAQ_FILE, faq_tool.reload_faq_store, lambda: faq_tool.faq_store),
+    "product": (product_tool.PRODUCT_FILE, product_tool.reload_product_store, lambda: product_tool.product_store),
+}
+
+
+class CatalogReloader:
+    """
+    Recarga en caliente de FAQStore y ProductStore.
+
+    Cada recarga construye el store nuevo en un hilo aparte (leer el CSV,
+    re-embeber solo las filas cambiadas) y luego lo publica con una simple
+    asignación, así que las búsquedas en curso terminan con su snapshot
+    anterior. Opcionalmente vigila la fecha de modificación de los CSV.
+    """
+
+    def __init__(self, watch_interval: float = 0.0):
+        self.watch_interval = watch_interval
+        self._lock = asyncio.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+        self._mtimes = {nombre: self._mtime(nombre) for nombre in STORES}
+        self.last_reload: Dict[str, float] = {}
+        self.reloads = 0
+        self.errors = 0
+
+    @staticmethod
+    def _mtime(nombre: str) -> float:
+        try:
+            return STORES[nombre][0].stat().st_mtime
+        except OSError:
+            return 0.0
+
+    async def reload(self, nombre: str) -> Dict[str, Any]:
+        archivo, recargar, actual = STORES[nombre]
+        async with self._lock:
+            version_anterior = actual().version
+            mtime = self._mtime(nombre)
+            inicio = time.perf_counter()
+            nuevo = await asyncio.to_thread(recargar)
+            self._mtimes[nombre] = mtime
+            self.last_reload[nombre] = time.time()
+            self.reloads += 1
+            duracion = time.perf_counter() - inicio
+        print(f"Store '{nombre}' recargado en {duracion:.2f}s (versión {version_anterior} -> {nuevo.version})")
+        return {
+            "store": nombre,
+            "previous_version": version_anterior,
+            "version": nuevo.version,
+            "changed": nuevo.version != version_anterior,
+            "seconds": round(duracion, 3),
+        }
+
+    async def reload_all(self) -> Dict[str, Any]:
+        return {nombre: await self.reload(nombre) for nombre in STORES}
+
+    async def start(self) -> None:
+        if self.watch_interval > 0 and self._watcher is None:
+            self._watcher = asyncio.create_task(self._vigilar(), name="catalog-watcher")
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+    async def _vigilar(self) -> None:
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            for nombre in STORES:
+                mtime = self._mtime(nombre)
+                if mtime == self._mtimes[nombre]:
+                    continue
+                try:
+                    await self.reload(nombre)
+                except Exception as e:
+                    # Un CSV a medio escribir no debe tumbar el store vigente;
+                    # se reintenta cuando el archivo vuelva a cambiar
+                    self._mtimes[nombre] = mtime
+                    self.errors += 1
+                    print(f"Error al recargar el store '{nombre}': {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "versions": {nombre: actual().version for nombre, (_, _, actual) in STORES.items()},
+            "rows": {nombre: len(actual().vectors) for nombre, (_, _, actual) in STORES.items()},
+            "last_reload": self.last_reload,
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "watching": self._watcher is not None,
+        }
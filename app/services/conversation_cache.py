@@ -0,0 +1,158 @@
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from ..config import Config
+
+# Costo aproximado de una fila además de su contenido (dict, claves, fecha, id)
+_BYTES_POR_FILA = 200
+
+
+def _tamano(fila: Dict[str, Any]) -> int:
+    return _BYTES_POR_FILA + len(str(fila.get("contenido") or "").encode("utf-8"))
+
+
+class _Ventana:
+    __slots__ = ("filas", "completa", "bytes", "usado")
+
+    def __init__(self, max_turns: int):
+        self.filas: Deque[Dict[str, Any]] = deque(maxlen=max_turns)  # de la más antigua a la más reciente
+        self.completa = False  # True si la conversación entera cabe en la ventana
+        self.bytes = 0
+        self.usado = time.monotonic()
+
+
+class ConversationCache:
+    """
+    Últimos `max_turns` mensajes de cada wa_id en memoria, en el mismo formato
+    que devuelve Supabase (fila completa de `mensajes`).
+
+    Es write-through: ConversationService agrega aquí cada fila que inserta,
+    así el historial que se acaba de escribir no se vuelve a leer de la base.
+    Las conversaciones inactivas salen por LRU al superar `max_conversations`
+    o `max_bytes`, o al pasar `ttl` segundos sin uso.
+    """
+
+    def __init__(self, max_turns: int = 20, max_conversations: int = 10_000,
+                 max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600):
+        self.max_turns = max_turns
+        self.max_conversations = max_conversations
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._ventanas: "OrderedDict[str, _Ventana]" = OrderedDict()
+        # Última escritura por wa_id, para no cachear una lectura que empezó antes
+        self._seq = 0
+        self._escrituras: "OrderedDict[str, int]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_turns > 0
+
+    def get(self, wa_id: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Los `limit` mensajes más recientes (del más nuevo al más viejo), o None si hay que ir a la base."""
+        ventana = self._vigente(wa_id)
+        if ventana is None or limit > self.max_turns or (len(ventana.filas) < limit and not ventana.completa):
+            self.misses += 1
+            return None
+        self._ventanas.move_to_end(wa_id)
+        ventana.usado = time.monotonic()
+        self.hits += 1
+        filas = list(ventana.filas)
+        filas.reverse()
+        return filas[:limit]
+
+    def begin_read(self) -> int:
+        """Secuencia actual de escrituras; se pasa a `fill` junto con el resultado de la consulta."""
+        return self._seq
+
+    def fill(self, wa_id: str, filas: List[Dict[str, Any]], limit: int, desde: int) -> None:
+        """Carga la ventana con el resultado de una consulta (del más nuevo al más viejo)."""
+        if not self.enabled or self._escrituras.get(wa_id, 0) > desde:
+            # Hubo un insert mientras se leía: el resultado puede no incluirlo
+            return
+        self._descartar(wa_id)
+        ventana = _Ventana(self.max_turns)
+        for fila in reversed(filas[:self.max_turns]):
+            ventana.filas.append(fila)
+        # Si la base devolvió menos filas de las pedidas, no hay más mensajes
+        ventana.completa = len(filas) < limit and len(filas) <= self.max_turns
+        ventana.bytes = sum(_tamano(f) for f in ventana.filas)
+        self._ventanas[wa_id] = ventana
+        self.bytes += ventana.bytes
+        self._podar()
+
+    def append(self, wa_id: str, filas: Optional[List[Dict[str, Any]]]) -> None:
+        """Agrega filas recién insertadas a la ventana (si la conversación está en caché)."""
+        self._seq += 1
+        self._escrituras[wa_id] = self._seq
+        self._escrituras.move_to_end(wa_id)
+        while len(self._escrituras) > self.max_conversations:
+            self._escrituras.popitem(last=False)
+        ventana = self._vigente(wa_id)
+        if ventana is None:
+            return
+        if not filas:
+            # Sin la fila devuelta por la base no se puede mantener la ventana al día
+            self._descartar(wa_id)
+            return
+        antes = ventana.bytes
+        # Un select que terminó después del insert ya pudo traer la fila
+        ids = {f.get("id") for f in ventana.filas}
+        for fila in filas:
+            if fila.get("id") is not None and fila.get("id") in ids:
+                continue
+            if len(ventana.filas) == ventana.filas.maxlen:
+                ventana.bytes -= _tamano(ventana.filas[0])
+                ventana.completa = False
+            ventana.filas.append(fila)
+            ventana.bytes += _tamano(fila)
+        self.bytes += ventana.bytes - antes
+        self._ventanas.move_to_end(wa_id)
+        ventana.usado = time.monotonic()
+        self._podar()
+
+    def invalidate(self, wa_id: str) -> None:
+        self._descartar(wa_id)
+
+    def _vigente(self, wa_id: str) -> Optional[_Ventana]:
+        ventana = self._ventanas.get(wa_id)
+        if ventana is not None and time.monotonic() - ventana.usado > self.ttl:
+            self._descartar(wa_id)
+            return None
+        return ventana
+
+    def _descartar(self, wa_id: str) -> None:
+        ventana = self._ventanas.pop(wa_id, None)
+        if ventana is not None:
+            self.bytes -= ventana.bytes
+
+    def _podar(self) -> None:
+        while self._ventanas and (len(self._ventanas) > self.max_conversations or self.bytes > self.max_bytes):
+            _, ventana = self._ventanas.popitem(last=False)
+            self.bytes -= ventana.bytes
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "conversations": len(self._ventanas),
+            "max_turns": self.max_turns,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+conversation_cache = ConversationCache(
+    max_turns=Config.CONVERSATION_CACHE_TURNS,
+    max_conversations=Config.CONVERSATION_CACHE_MAX_CONVERSATIONS,
+    max_bytes=Config.CONVERSATION_CACHE_MAX_BYTES,
+    ttl=Config.CONVERSATION_CACHE_TTL,
+)
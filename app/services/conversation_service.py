@@ -1,27 +1,81 @@
-from ..database import get_supabase_client
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from ..config import Config
+from ..database import get_async_supabase_client
+from .conversation_cache import conversation_cache
+from .message_writer import message_writer
+from .event_hub import event_hub
+from .response_cache import response_cache
 
 class ConversationService:
     def __init__(self):
-        self.supabase = get_supabase_client()
+        self.db = get_async_supabase_client()
+        self.cache = conversation_cache
+        self.writer = message_writer if Config.MESSAGE_WRITE_BEHIND else None
 
-    def save_message(self, wa_id: str, role: str, content: str):
+    async def save_message(self, wa_id: str, role: str, content: str, extra: Optional[Dict[str, Any]] = None):
         data = {
             "numero_whatsapp": wa_id,
             "tipo_emisor": role,
-            "contenido": content
+            "contenido": content,
+            **(extra or {}),
         }
-        response = self.supabase.table("mensajes").insert(data).execute()
-        return response
+        if self.writer is not None:
+            # La fecha se fija aquí para que el orden no dependa de cuándo se vacía el lote
+            data["fecha_creacion"] = datetime.now(timezone.utc).isoformat()
+            self.writer.enqueue(data)
+            rows = [data]
+        else:
+            rows = await self.db.insert("mensajes", data)
+        self.cache.append(wa_id, rows)
+        # Con escritura diferida se invalida de nuevo cuando el lote llega a Supabase
+        response_cache.invalidate()
+        for row in rows:
+            event_hub.publish("message", wa_id, {
+                "wa_id": wa_id,
+                "id": row.get("id"),
+                "from": row.get("tipo_emisor", role),
+                "text": row.get("contenido", content),
+                "fecha_creacion": row.get("fecha_creacion"),
+            })
+        return rows
     
-    def get_conversation_history(self, wa_id: str, limit: int = 10):
-        response = (
-            self.supabase
-            .table("mensajes")
-            .select("*")
-            .eq("numero_whatsapp", wa_id)
-            .order("fecha_creacion", desc=True)
-            .limit(limit)
-            .execute()
+    async def get_conversation_history(self, wa_id: str, limit: int = 10):
+        # Las últimas N filas salen de memoria; solo un miss (o limit > N) va a Supabase
+        cached = self.cache.get(wa_id, limit)
+        if cached is not None:
+            return cached
+        desde = self.cache.begin_read()
+        rows = await self.db.select(
+            "mensajes",
+            filters={"numero_whatsapp": f"eq.{wa_id}"},
+            order="fecha_creacion.desc",
+            limit=limit,
         )
-        return response.data
+        if self.writer is not None:
+            rows = self._con_pendientes(wa_id, rows, limit)
+        if limit <= self.cache.max_turns:
+            self.cache.fill(wa_id, rows, limit, desde)
+        return rows
+
+    def _con_pendientes(self, wa_id: str, rows, limit: int):
+        """Agrega al resultado de la base los mensajes que siguen en el buffer de escritura."""
+        pendientes = self.writer.pending(wa_id)
+        if not pendientes:
+            return rows
+        # Un lote que se insertó mientras se leía puede venir en ambos lados
+        en_base = {(r.get("tipo_emisor"), r.get("contenido"), _fecha(r)) for r in rows}
+        nuevos = [r for r in pendientes if (r["tipo_emisor"], r["contenido"], _fecha(r)) not in en_base]
+        rows = list(reversed(nuevos)) + rows
+        rows.sort(key=_fecha, reverse=True)
+        return rows[:limit]
+
 
+def _fecha(row) -> datetime:
+    try:
+        fecha = datetime.fromisoformat(row["fecha_creacion"])
+    except (KeyError, TypeError, ValueError):
+        return datetime.min.replace(tzinfo=timezone.utc)
+    # `timestamp` sin zona se interpreta como UTC para poder compararla
+    return fecha if fecha.tzinfo else fecha.replace(tzinfo=timezone.utc)
@@ -1,10 +1,13 @@
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
-from .conversation_service import ConversationService
-from ..database import get_supabase_client  # o como lo tengas
+import httpx
 
-supabase = get_supabase_client()
+from .event_hub import event_hub
+from .paginacion import armar_pagina, parametros_keyset
+from ..database import get_async_supabase_client
+
+db = get_async_supabase_client()
 
 
 # Helpers de tiempo ---------------------------------------
@@ -33,22 +36,29 @@ def _texto_hace(dt: datetime | None) -> str:
 
 # -------- LEADS (para la vista Leads + Dashboard) -----------------
 
-def obtener_leads_frontend(limit: int = 100) -> List[Dict[str, Any]]:
-    res = (
-        supabase.table("clientes_potenciales")
-        .select(
-            "id, nombre_completo, telefono, correo, canal_origen, "
-            "nivel_interes, puntaje_interes, "
-            "fecha_creacion, fecha_ultimo_mensaje, resumen_ultimo_mensaje"
-        )
-        .order("fecha_ultimo_mensaje", desc=True)
-        .limit(limit)
-        .execute()
+Pagina = Tuple[List[Dict[str, Any]], Dict[str, Optional[str]]]
+
+
+async def _select_pagina(table: str, columns: str, col_fecha: str, col_id: str, limit: int,
+                         cursor: Optional[str], filters: Optional[Dict[str, str]] = None) -> Pagina:
+    """Una página por keyset (fecha desc, id desc): se pide una fila extra para saber si hay más."""
+    keyset, order, direccion = parametros_keyset(col_fecha, col_id, cursor)
+    rows = await db.select(table, columns, filters={**(filters or {}), **keyset}, order=order, limit=limit + 1)
+    return armar_pagina(rows, limit, col_fecha, col_id, cursor, direccion)
+
+
+async def obtener_leads_frontend(limit: int = 100, cursor: Optional[str] = None) -> Pagina:
+    rows, cursores = await _select_pagina(
+        "clientes_potenciales",
+        "id, nombre_completo, telefono, correo, canal_origen, "
+        "nivel_interes, puntaje_interes, "
+        "fecha_creacion, fecha_ultimo_mensaje, resumen_ultimo_mensaje",
+        "fecha_ultimo_mensaje", "id", limit, cursor,
     )
 
     leads: List[Dict[str, Any]] = []
 
-    for row in res.data or []:
+    for row in rows:
         fecha_ultimo = (
             datetime.fromisoformat(row["fecha_ultimo_mensaje"])
             if row.get("fecha_ultimo_mensaje")
@@ -70,27 +80,77 @@ def obtener_leads_frontend(limit: int = 100) -> List[Dict[str, Any]]:
             }
         )
 
-    return leads
+    return leads, cursores
 
 
 # -------- CONVERSACIONES (lista izquierda) -----------------------
 
-def obtener_conversaciones_por_numero(limit: int = 50) -> List[Dict[str, Any]]:
+async def obtener_conversaciones_por_numero(limit: int = 50, cursor: Optional[str] = None) -> Pagina:
     """
-    Lista de conversaciones agrupadas por número de WhatsApp,
-    usando directamente la tabla mensajes (más simple para ahora).
+    Lista de conversaciones, una por número de WhatsApp, leída de la tabla
+    resumen_conversaciones (la mantienen los triggers de sql/resumen_conversaciones.sql).
     """
-    res = (
-        supabase.table("mensajes")
-        .select("numero_whatsapp, contenido, fecha_creacion")
-        .order("fecha_creacion", desc=True)
-        .limit(limit)
-        .execute()
+    try:
+        rows, cursores = await _select_pagina(
+            "resumen_conversaciones",
+            "numero_whatsapp, ultimo_mensaje, fecha_ultimo_mensaje, "
+            "no_leidos, nombre_lead, nivel_interes",
+            "fecha_ultimo_mensaje", "numero_whatsapp", limit, cursor,
+        )
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 404:
+            raise
+        # La migración aún no se aplicó: se agrupan los últimos mensajes como antes
+        print("Tabla resumen_conversaciones no encontrada, agrupando desde mensajes")
+        return await _conversaciones_desde_mensajes(limit), {"next": None, "prev": None}
+
+    conversaciones: List[Dict[str, Any]] = []
+    for row in rows:
+        wa_id = row["numero_whatsapp"]
+        fecha = (
+            datetime.fromisoformat(row["fecha_ultimo_mensaje"])
+            if row.get("fecha_ultimo_mensaje")
+            else None
+        )
+        conversaciones.append(
+            {
+                "id": wa_id,  # usamos el número como id de conversación
+                "leadId": wa_id,
+                "leadName": row.get("nombre_lead") or wa_id,
+                "phone": wa_id,
+                "interest": row.get("nivel_interes") or "Medio",
+                "lastMessageTime": _texto_hace(fecha),
+                "lastMessagePreview": row.get("ultimo_mensaje") or "",
+                "status": "Abierta",
+                "unread": row.get("no_leidos") or 0,
+                "channel": "WhatsApp",
+            }
+        )
+
+    return conversaciones, cursores
+
+
+async def marcar_conversacion_leida(wa_id: str) -> None:
+    """Pone en cero los no leídos de una conversación (el operador la abrió)."""
+    await db.update(
+        "resumen_conversaciones",
+        {"no_leidos": 0, "fecha_ultima_lectura": _ahora_utc().isoformat()},
+        filters={"numero_whatsapp": f"eq.{wa_id}"},
+    )
+    event_hub.publish("conversation", wa_id, {"wa_id": wa_id, "unread": 0})
+
+
+async def _conversaciones_desde_mensajes(limit: int) -> List[Dict[str, Any]]:
+    rows = await db.select(
+        "mensajes",
+        "numero_whatsapp, contenido, fecha_creacion",
+        order="fecha_creacion.desc",
+        limit=limit,
     )
 
     conversaciones: Dict[str, Dict[str, Any]] = {}
 
-    for row in res.data or []:
+    for row in rows:
         wa_id = row["numero_whatsapp"]
         fecha = (
             datetime.fromisoformat(row["fecha_creacion"])
@@ -117,13 +177,15 @@ def obtener_conversaciones_por_numero(limit: int = 50) -> List[Dict[str, Any]]:
 
 # -------- HISTORIAL DE UNA CONVERSACIÓN -------------------------
 
-def obtener_historial_por_numero(wa_id: str, limit: int = 200) -> List[Dict[str, Any]]:
+async def obtener_historial_por_numero(wa_id: str, limit: int = 200, cursor: Optional[str] = None) -> Pagina:
     """
-    Reusa tu ConversationService para obtener el historial y
-    lo formatea para el frontend.
+    Historial de una conversación (del más reciente al más antiguo),
+    paginado por (fecha_creacion, id) y formateado para el frontend.
     """
-    service = ConversationService()
-    rows = service.get_conversation_history(wa_id=wa_id, limit=limit)
+    rows, cursores = await _select_pagina(
+        "mensajes", "*", "fecha_creacion", "id", limit, cursor,
+        filters={"numero_whatsapp": f"eq.{wa_id}"},
+    )
 
     mensajes: List[Dict[str, Any]] = []
     for m in rows:
@@ -141,4 +203,4 @@ def obtener_historial_por_numero(wa_id: str, limit: int = 200) -> List[Dict[str,
             }
         )
 
-    return mensajes
+    return mensajes, cursores
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from ..config import Config
+
+
+class Suscripcion:
+    """Un cliente conectado al feed: eventos a reenviar al reconectar + cola acotada de eventos nuevos."""
+
+    def __init__(self, topic: Optional[str], maxsize: int):
+        self.topic = topic
+        self.replay: List[Dict[str, Any]] = []
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def acepta(self, evento: Dict[str, Any]) -> bool:
+        return self.topic is None or evento["topic"] == self.topic
+
+
+class EventHub:
+    """
+    Fan-out en memoria de eventos para el frontend (mensajes nuevos, cambios
+    de conversaciones y leads).
+
+    - Cada evento tiene un id creciente y se guarda en un buffer circular,
+      así un cliente que reconecta con Last-Event-ID recibe lo que se perdió.
+    - Topics: un suscriptor recibe todo o solo los eventos de un wa_id.
+    - Backpressure: `publish` nunca bloquea; si la cola de un cliente lento
+      se llena, se lo desconecta y él mismo retoma desde su último id.
+
+    El hub vive en el proceso: con varios workers de uvicorn cada uno
+    publica solo los mensajes que procesa.
+    """
+
+    def __init__(self, buffer_size: int = 1000, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._subs: Set[Suscripcion] = set()
+        # Ids a partir del reloj: tras un reinicio siguen creciendo y un
+        # Last-Event-ID viejo se detecta como fuera del buffer
+        self._siguiente_id = time.time_ns() // 1000
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def publish(self, tipo: str, topic: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        self._siguiente_id += 1
+        evento = {"id": self._siguiente_id, "event": tipo, "topic": topic, "data": data}
+        self._buffer.append(evento)
+        self.published += 1
+        for sub in list(self._subs):
+            if not sub.acepta(evento):
+                continue
+            try:
+                sub.queue.put_nowait(evento)
+            except asyncio.QueueFull:
+                self._cortar(sub)
+        return evento
+
+    def subscribe(self, topic: Optional[str] = None, last_event_id: Optional[int] = None) -> Suscripcion:
+        sub = Suscripcion(topic, self.queue_size)
+        if last_event_id is not None and last_event_id < self._siguiente_id:
+            if not self._buffer or last_event_id < self._buffer[0]["id"] - 1:
+                # Se perdieron eventos que ya no están en el buffer: el cliente debe recargar por REST
+                sub.replay.append({"id": self._siguiente_id, "event": "reset", "topic": topic, "data": {}})
+            sub.replay.extend(e for e in self._buffer if e["id"] > last_event_id and sub.acepta(e))
+        self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Suscripcion) -> None:
+        self._subs.discard(sub)
+
+    def _cortar(self, sub: Suscripcion) -> None:
+        """Desconecta a un cliente que no da abasto; al reconectar retoma con Last-Event-ID."""
+        self._subs.discard(sub)
+        self.dropped_subscribers += 1
+        self._cerrar_cola(sub)
+
+    @staticmethod
+    def _cerrar_cola(sub: Suscripcion) -> None:
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+
+    def close(self) -> None:
+        """Termina todos los streams abiertos (al apagar el servidor)."""
+        for sub in list(self._subs):
+            self._cerrar_cola(sub)
+        self._subs.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subs),
+            "published": self.published,
+            "buffered": len(self._buffer),
+            "last_event_id": self._siguiente_id,
+            "dropped_subscribers": self.dropped_subscribers,
+        }
+
+
+def formato_sse(evento: Dict[str, Any]) -> str:
+    datos = json.dumps(evento["data"], ensure_ascii=False, default=str)
+    return f"id: {evento['id']}\nevent: {evento['event']}\ndata: {datos}\n\n"
+
+
+event_hub = EventHub(buffer_size=Config.EVENT_BUFFER_SIZE, queue_size=Config.EVENT_SUBSCRIBER_QUEUE)
@@ -0,0 +1,199 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import pandas as pd
+
+from ..config import Config
+from ..database import get_async_supabase_client
+from ..ml.features import preprocesar_mensaje
+from ..ml.lead_pipeline import (
+    BLOQUE,
+    COL_EMISOR,
+    COL_ID,
+    COL_LEAD,
+    COL_TEXTO,
+    EMISOR_LEAD,
+    filas_scores,
+    puntuar_sumas,
+    sumar_bloque,
+)
+from ..ml.lead_scoring import NIVEL_INTERES, AgregadosLead, calcular_score_msg, menciona_presupuesto
+from .event_hub import event_hub
+from .response_cache import response_cache
+
+TABLA = "leads_scores"
+FUNCION_SUMAR = "sumar_mensaje_lead"  # sql/leads_scores.sql
+PUNTAJE = ("score_total", "categoria", "score_promedio_msg", "sentimiento_promedio")
+PAGINA = 1000
+TOLERANCIA = 0.001  # diferencia de score_total que la reconciliación acepta (redondeo a 3 decimales)
+
+
+class LeadScorer:
+    """
+    Puntaje de cada lead actualizado con cada mensaje entrante.
+
+    Por lead se guardan sumas corrientes (mensajes, preguntas, score de
+    intención ponderado, sentimiento, mención de presupuesto) en
+    `leads_scores`; un mensaje nuevo las incrementa en la base, de forma
+    atómica (función sumar_mensaje_lead de sql/leads_scores.sql), y con las
+    sumas que devuelve se recalcula score_total / categoría con la misma
+    fórmula que el script en lote. No hay copia en memoria: varios workers
+    pueden puntuar al mismo lead y el script en lote o `reconciliar` pueden
+    reescribir la fila sin que nadie la pise con sumas viejas. Los cambios
+    de categoría se reflejan en clientes_potenciales.nivel_interes.
+
+    `reconciliar` recalcula todo en lote desde `mensajes`, con el mismo
+    cálculo que `pipeline_scoring`, y lo compara con lo acumulado (y
+    opcionalmente lo reemplaza).
+    """
+
+    def __init__(self, sync_interes: bool = True):
+        self.sync_interes = sync_interes
+        self.db = get_async_supabase_client()
+        self.updates = 0
+        self.stale = 0
+        self.category_changes = 0
+        self.failed = 0
+
+    async def registrar(self, wa_id: str, texto: str, etiqueta: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Suma un mensaje del lead y guarda su nuevo puntaje. Devuelve la fila de leads_scores."""
+        features = preprocesar_mensaje(texto)
+        score_ponderado = calcular_score_msg({
+            "label_intencion": etiqueta["intencion"] if etiqueta else None,
+            "score_msg": etiqueta["confianza"] if etiqueta else 0,
+        })
+        try:
+            sumas = (await self.db.rpc(FUNCION_SUMAR, {
+                "p_lead_id": wa_id,
+                "p_num_preguntas": features["num_preguntas"],
+                "p_score_ponderado": score_ponderado,
+                "p_sentimiento": features["sentimiento_num"],
+                "p_presupuesto": int(menciona_presupuesto(texto)),
+            }))[0]
+            fila = {"lead_id": wa_id, **AgregadosLead.desde_fila(sumas).resultado(),
+                    "fecha_actualizacion": sumas["fecha_actualizacion"]}
+            # El puntaje se guarda solo si ningún otro mensaje se sumó entre medio:
+            # en ese caso lo guarda quien sumó el último
+            guardada = await self.db.update(
+                TABLA, {c: fila[c] for c in PUNTAJE},
+                filters={"lead_id": f"eq.{wa_id}", "num_mensajes_total": f"eq.{fila['num_mensajes_total']}"},
+            )
+            if not guardada:
+                self.stale += 1
+                return fila
+            self.updates += 1
+            # La fila que devuelve la función conserva la categoría anterior al mensaje
+            if fila["categoria"] != sumas.get("categoria"):
+                self.category_changes += 1
+                await self._sincronizar_interes(wa_id, fila["categoria"])
+            event_hub.publish("lead", wa_id, {
+                "wa_id": wa_id,
+                "score_total": fila["score_total"],
+                "categoria": fila["categoria"],
+            })
+            return fila
+        except Exception as e:
+            self.failed += 1
+            print(f"Error al actualizar el puntaje del lead {wa_id}: {e}")
+            return None
+
+    async def _sincronizar_interes(self, wa_id: str, categoria: str) -> None:
+        """Nivel de interés del lead en el dashboard (el trigger lo copia a resumen_conversaciones)."""
+        if not self.sync_interes:
+            return
+        # El teléfono puede estar guardado con o sin "+", igual que en sql/resumen_conversaciones.sql
+        await self.db.update("clientes_potenciales", {"nivel_interes": NIVEL_INTERES[categoria]},
+                             filters={"telefono": f"in.({wa_id},+{wa_id})"})
+        response_cache.invalidate()
+
+    async def _paginas(self, table: str, columns: str, col_id: str,
+                       filters: Optional[Dict[str, str]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        ultimo = None
+        while True:
+            keyset = {col_id: f"gt.{ultimo}"} if ultimo is not None else {}
+            pagina = await self.db.select(table, columns, filters={**(filters or {}), **keyset},
+                                          order=f"{col_id}.asc", limit=PAGINA)
+            if pagina:
+                yield pagina
+            if len(pagina) < PAGINA:
+                return
+            ultimo = pagina[-1][col_id]
+
+    async def reconciliar(self, aplicar: bool = False, ejemplos: int = 10) -> Dict[str, Any]:
+        """
+        Recalcula el puntaje de todos los leads en lote desde `mensajes` y lo
+        compara con lo acumulado en leads_scores. Con aplicar=True reemplaza
+        las filas que difieren (y sus agregados) por el resultado en lote.
+
+        Los mensajes se reducen a sumas por lead cada `BLOQUE` filas, como en
+        `pipeline_scoring`; pandas y el clasificador corren en un hilo para no
+        frenar el event loop (y los webhooks) durante la reconciliación.
+        """
+        sumas, pendientes, n_mensajes = None, [], 0
+        async for pagina in self._paginas("mensajes", ",".join((COL_ID, COL_LEAD, COL_TEXTO)), COL_ID,
+                                          filters={COL_EMISOR: f"eq.{EMISOR_LEAD}"}):
+            n_mensajes += len(pagina)
+            pendientes.extend(pagina)
+            if len(pendientes) >= BLOQUE:
+                sumas = await asyncio.to_thread(sumar_bloque, sumas, pendientes)
+                pendientes = []
+        if pendientes:
+            sumas = await asyncio.to_thread(sumar_bloque, sumas, pendientes)
+        guardado = [r async for pagina in self._paginas(TABLA, "lead_id, score_total, categoria, num_mensajes_total", "lead_id")
+                    for r in pagina]
+        cruce = await asyncio.to_thread(_cruzar, sumas, guardado)
+
+        ambos = cruce["_merge"] == "both"
+        difiere = ambos & (
+            (cruce["categoria"] != cruce["categoria_tabla"])
+            | ((cruce["score_total"] - pd.to_numeric(cruce["score_total_tabla"])).abs() > TOLERANCIA)
+            | (cruce["num_mensajes_total"] != pd.to_numeric(cruce["num_mensajes_total_tabla"]))
+        )
+        solo_lote = cruce["_merge"] == "left_only"
+        reporte = {
+            "mensajes": n_mensajes,
+            "leads": int((cruce["_merge"] != "right_only").sum()),
+            "coinciden": int((ambos & ~difiere).sum()),
+            "difieren": int(difiere.sum()),
+            "solo_en_lote": int(solo_lote.sum()),
+            "solo_en_tabla": int((cruce["_merge"] == "right_only").sum()),
+            "ejemplos": cruce.loc[difiere, ["lead_id", "score_total", "score_total_tabla", "categoria", "categoria_tabla"]]
+                             .head(ejemplos).to_dict("records"),
+            "aplicado": False,
+        }
+        print(f"Reconciliación de leads: {reporte['coinciden']} coinciden, {reporte['difieren']} difieren, "
+              f"{reporte['solo_en_lote']} sin puntaje guardado, {reporte['solo_en_tabla']} sin mensajes")
+
+        if aplicar:
+            corregir = cruce.loc[difiere | solo_lote]
+            filas = filas_scores(corregir.rename(columns={"categoria": "label_pred"}))
+            for i in range(0, len(filas), PAGINA):
+                await self.db.upsert(TABLA, filas[i:i + PAGINA], on_conflict="lead_id")
+            for r in corregir.to_dict("records"):
+                if r["categoria"] != r.get("categoria_tabla"):
+                    await self._sincronizar_interes(r["lead_id"], r["categoria"])
+            reporte["aplicado"] = True
+        return reporte
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "updates": self.updates,
+            "stale": self.stale,
+            "category_changes": self.category_changes,
+            "failed": self.failed,
+        }
+
+
+def _cruzar(sumas: Optional[pd.DataFrame], guardado: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Puntaje en lote de cada lead junto al guardado en leads_scores (columnas *_tabla)."""
+    columnas = ["lead_id", "score_total", "categoria", "num_mensajes_total"]
+    lote = puntuar_sumas(sumas).rename(columns={"label_pred": "categoria"})
+    if lote.empty:
+        lote = pd.DataFrame(columns=columnas)
+    tabla = pd.DataFrame(guardado) if guardado else pd.DataFrame(columns=columnas)
+    return lote.merge(tabla, on="lead_id", how="outer", suffixes=("", "_tabla"), indicator=True)
+
+
+lead_scorer = LeadScorer(
+    sync_interes=Config.LEAD_SYNC_NIVEL_INTERES,
+)
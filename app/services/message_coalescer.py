@@ -0,0 +1,110 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+
+class MessageCoalescer:
+    """
+    Agrupa las ráfagas de mensajes de un mismo wa_id en un solo turno del agente.
+
+    Cada mensaje nuevo reinicia una ventana de espera (`window`); cuando pasa
+    la ventana sin mensajes nuevos (o se alcanza `max_wait` desde el primero)
+    se llama al handler una vez con toda la ráfaga. Los turnos de un mismo
+    wa_id se ejecutan en serie, así las respuestas salen en orden.
+    Con `window` = 0 cada mensaje es su propio turno (solo se conserva el orden).
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, List[Dict[str, Any]]], Awaitable[None]],
+        window: float = 1.5,
+        max_wait: float = 5.0,
+    ):
+        self.handler = handler
+        self.window = window
+        self.max_wait = max(max_wait, window)
+        self._pendientes: Dict[str, List[Dict[str, Any]]] = {}
+        self._primero: Dict[str, float] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._usos: Dict[str, int] = {}
+        self._tareas: Set[asyncio.Task] = set()
+        self.messages = 0
+        self.turns = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    async def submit(self, key: str, item: Dict[str, Any]) -> None:
+        """Agrega un mensaje a la ráfaga de `key` (o lo procesa directo si no hay ventana)."""
+        self.messages += 1
+        if self.window <= 0:
+            await self._turno(key, [item])
+            return
+
+        ahora = time.monotonic()
+        self._pendientes.setdefault(key, []).append(item)
+        primero = self._primero.setdefault(key, ahora)
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        espera = max(0.0, min(self.window, primero + self.max_wait - ahora))
+        self._timers[key] = self._lanzar(self._esperar_y_despachar(key, espera), f"coalescer-{key}")
+
+    def _lanzar(self, coro, nombre: str) -> asyncio.Task:
+        tarea = asyncio.create_task(coro, name=nombre)
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+        return tarea
+
+    async def _esperar_y_despachar(self, key: str, espera: float) -> None:
+        await asyncio.sleep(espera)
+        # A partir de aquí la ráfaga queda cerrada: los mensajes que lleguen
+        # mientras corre el turno abren una ráfaga nueva
+        self._timers.pop(key, None)
+        await self._despachar(key)
+
+    async def _despachar(self, key: str) -> None:
+        self._primero.pop(key, None)
+        items = self._pendientes.pop(key, [])
+        if items:
+            await self._turno(key, items)
+
+    async def _turno(self, key: str, items: List[Dict[str, Any]]) -> None:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._usos[key] = self._usos.get(key, 0) + 1
+        try:
+            async with lock:
+                self.turns += 1
+                self.coalesced += len(items) - 1
+                await self.handler(key, items)
+        except Exception as e:
+            self.failed += 1
+            print(f"Error al procesar la ráfaga de {key}: {e}")
+        finally:
+            self._usos[key] -= 1
+            if not self._usos[key]:
+                del self._usos[key]
+                del self._locks[key]
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Despacha de inmediato las ráfagas pendientes y espera a que terminen los turnos."""
+        for key in list(self._timers):
+            self._timers.pop(key).cancel()
+            self._lanzar(self._despachar(key), f"coalescer-flush-{key}")
+        if not self._tareas:
+            return
+        _, pendientes = await asyncio.wait(set(self._tareas), timeout=timeout)
+        if pendientes:
+            print(f"MessageCoalescer: timeout al apagar, quedan {len(pendientes)} turnos en curso")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window,
+            "pending_conversations": len(self._pendientes),
+            "pending_messages": sum(len(v) for v in self._pendientes.values()),
+            "active_turns": sum(1 for lock in self._locks.values() if lock.locked()),
+            "messages": self.messages,
+            "turns": self.turns,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+        }
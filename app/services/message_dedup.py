@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class MessageDeduplicator:
+    """
+    Registro de ids de mensajes de WhatsApp ya procesados, para descartar los
+    reenvíos del webhook (Meta reintenta si no recibe un 200 a tiempo).
+
+    - memoria: conjunto con TTL acotado por número de ids (se descartan los más antiguos).
+    - disco (opcional): SQLite, sobrevive a reinicios y se comparte entre workers.
+    """
+
+    def __init__(self, ttl: float = 24 * 3600, max_items: int = 50_000, path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._vistos: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._escrituras_disco = 0
+        self.checked = 0
+        self.suppressed = 0
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS mensajes_procesados ("
+                "id TEXT PRIMARY KEY, visto REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def is_duplicate(self, message_id: str) -> bool:
+        """
+        Marca el id como visto y devuelve True si ya se había visto dentro del TTL.
+        La comprobación y la marca son atómicas, así dos workers con el mismo
+        reenvío no lo procesan ambos.
+        """
+        ahora = time.time()
+        with self._lock:
+            self.checked += 1
+            visto = self._vistos.get(message_id)
+            if visto is not None and ahora - visto <= self.ttl:
+                self.suppressed += 1
+                return True
+
+            if self._db is not None and not self._marcar_en_disco(message_id, ahora):
+                self._guardar_en_memoria(message_id, ahora)
+                self.suppressed += 1
+                return True
+
+            self._guardar_en_memoria(message_id, ahora)
+            return False
+
+    def forget(self, message_id: str) -> None:
+        """Quita un id (p. ej. si falló al guardarse) para que un reenvío se procese."""
+        with self._lock:
+            self._vistos.pop(message_id, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM mensajes_procesados WHERE id = ?", (message_id,))
+                self._db.commit()
+
+    def _marcar_en_disco(self, message_id: str, ahora: float) -> bool:
+        """Inserta el id en SQLite; False si ya existía con una marca vigente."""
+        cursor = self._db.execute(
+            "INSERT INTO mensajes_procesados (id, visto) VALUES (?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET visto = excluded.visto WHERE visto < ?",
+            (message_id, ahora, ahora - self.ttl),
+        )
+        self._escrituras_disco += 1
+        if self._escrituras_disco % 1000 == 0:
+            self._db.execute("DELETE FROM mensajes_procesados WHERE visto < ?", (ahora - self.ttl,))
+        self._db.commit()
+        return cursor.rowcount > 0
+
+    def _guardar_en_memoria(self, message_id: str, visto: float) -> None:
+        self._vistos[message_id] = visto
+        self._vistos.move_to_end(message_id)
+        while len(self._vistos) > self.max_items:
+            self._vistos.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._vistos),
+            "max_items": self.max_items,
+            "persistent": self._db is not None,
+            "checked": self.checked,
+            "suppressed": self.suppressed,
+        }
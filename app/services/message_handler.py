@@ -1,24 +1,59 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from .whatsapp_service import WhatsAppService
 from .conversation_service import ConversationService
+from .message_coalescer import MessageCoalescer
+from .message_dedup import MessageDeduplicator
+from .answer_cache import answer_cache, es_cacheable, solo_faq
+from .lead_scorer import lead_scorer
 from ..agents.assistant_agent import agent
+from ..config import Config
+from ..ml.intent_classifier import intent_classifier
+from ..tools.embeddings import EMBEDDING_ERRORS, aembed_query
 
 class MessageHandler:
     def __init__(self):
         self.whatsapp_service = WhatsAppService()
         self.conversation_service = ConversationService()
+        # Reenvíos del webhook: se descartan antes de tocar Supabase u OpenAI
+        self.dedup = MessageDeduplicator(
+            ttl=Config.DEDUP_TTL_SECONDS,
+            max_items=Config.DEDUP_MAX_IDS,
+            path=Config.DEDUP_DB_PATH or None,
+        )
+        # Ráfagas del mismo wa_id ("hola" / "vi un furgón" / "precio?") -> un solo turno
+        self.coalescer = MessageCoalescer(
+            self._handle_incoming_message,
+            window=Config.COALESCE_WINDOW_SECONDS,
+            max_wait=Config.COALESCE_MAX_WAIT_SECONDS,
+        )
 
     async def process_webhook_event(self, data: Dict[str, Any]) -> None:
         try:
             change = data["entry"][0]["changes"][0]["value"]
             
             if "messages" in change and "contacts" in change:
-                self.conversation_service.save_message(
-                    change["contacts"][0]["wa_id"],
-                    "user",
-                    change["messages"][0]["text"]["body"]
-                )
-                await self._handle_incoming_message(change)
+                message_id = change["messages"][0].get("id")
+                if message_id and self.dedup.is_duplicate(message_id):
+                    print(f"Mensaje duplicado ignorado: {message_id}")
+                    return
+                sender = change["contacts"][0]["wa_id"]
+                text = change["messages"][0]["text"]["body"]
+                etiqueta = self._etiquetar(text)
+                intencion = etiqueta["intencion"] if etiqueta else None
+                extra = {Config.INTENT_COLUMN: intencion} if Config.INTENT_COLUMN and intencion else None
+                # Cada mensaje se guarda al llegar, aunque se responda en grupo
+                try:
+                    await self.conversation_service.save_message(sender, "user", text, extra=extra)
+                except Exception:
+                    # Si no quedó guardado, un reenvío de Meta debe poder procesarse
+                    if message_id:
+                        self.dedup.forget(message_id)
+                    raise
+                name = change["contacts"][0]["profile"]["name"]
+                print(f"Mensaje recibido de {name} ({sender}) [intención: {intencion or '-'}]: {text}")
+                await self.coalescer.submit(sender, {"name": name, "text": text, "intencion": intencion})
+                if Config.LEAD_SCORING_ENABLED:
+                    await lead_scorer.registrar(sender, text, etiqueta)
             else:
                 print("Evento no manejado")
                 
@@ -26,27 +61,60 @@ class MessageHandler:
             print(f"Error al procesar el webhook: {e}")
             print(f"Datos recibidos: {data}")
 
-    async def _handle_incoming_message(self, change: Dict[str, Any]) -> None:
+    @staticmethod
+    def _etiquetar(text: str) -> Optional[Dict[str, Any]]:
+        """Intención del mensaje (alta / media / baja) y su confianza, con el modelo ya cargado en memoria."""
+        if intent_classifier is None:
+            return None
         try:
-            sender = change["contacts"][0]["wa_id"]
-            name = change["contacts"][0]["profile"]["name"]
-            text = change["messages"][0]["text"]["body"]
-            
-            print(f"Mensaje recibido de {name} ({sender}): {text}")
+            return intent_classifier.classify([text])[0]
+        except Exception as e:
+            print(f"Error al clasificar la intención: {e}")
+            return None
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Responde las ráfagas que aún esperan su ventana antes de apagar."""
+        await self.coalescer.stop(timeout=timeout)
+
+    async def _handle_incoming_message(self, sender: str, burst: List[Dict[str, str]]) -> None:
+        try:
+            name = burst[-1]["name"]
+            text = "\n".join(m["text"] for m in burst)
+            if len(burst) > 1:
+                print(f"Ráfaga de {len(burst)} mensajes de {name} ({sender}) agrupada en un turno")
 
-            # Generar respuesta con GPT
-            context_history = self.conversation_service.get_conversation_history(sender)
+            context_history = await self.conversation_service.get_conversation_history(sender)
+            # Los mensajes de la ráfaga ya están en el historial: van una sola vez, unidos al final
+            historial = _sin_rafaga(list(reversed(context_history)), burst)
 
-            messages = [{"role": msg['tipo_emisor'], "content": msg['contenido']} for msg in reversed(context_history)]
-            messages.append({"role": "user", "content": text})
+            # Preguntas tipo FAQ ya respondidas: se reutiliza la respuesta sin llamar al LLM.
+            # Solo sin conversación previa: la respuesta guardada no conoce ese contexto
+            q_emb = None
+            response_text = None
+            if not historial and es_cacheable(burst, text):
+                try:
+                    q_emb = await aembed_query(text)
+                    response_text = answer_cache.lookup(text, q_emb)
+                except EMBEDDING_ERRORS as e:
+                    print(f"Caché de respuestas no disponible: {e!r}")
 
-            # El agente de LangGraph retorna un diccionario con 'messages'
-            response = agent.invoke({"messages": messages})
-            # Extraer el contenido del último mensaje del agente
-            response_text = response["messages"][-1].content
-            print(f"Respuesta generada: {response_text}")
+            if response_text is None:
+                # Generar respuesta con GPT
+                messages = [{"role": msg['tipo_emisor'], "content": msg['contenido']} for msg in historial]
+                messages.append({"role": "user", "content": text})
 
-            self.conversation_service.save_message(
+                # El agente de LangGraph retorna un diccionario con 'messages'.
+                # ainvoke libera el event loop mientras el LLM y las tools esperan I/O.
+                response = await agent.ainvoke({"messages": messages})
+                # Extraer el contenido del último mensaje del agente
+                response_text = response["messages"][-1].content
+                print(f"Respuesta generada: {response_text}")
+
+                # q_emb solo existe en turnos sin historial: la respuesta no depende de este cliente
+                if q_emb is not None and solo_faq(response["messages"][len(messages):]):
+                    answer_cache.store(text, q_emb, response_text)
+
+            await self.conversation_service.save_message(
                 sender,
                 "assistant",
                 response_text
@@ -62,3 +130,14 @@ class MessageHandler:
             print(f"Error al procesar mensaje: {e}")
         except Exception as e:
             print(f"Error inesperado al manejar mensaje: {e}")
+
+
+def _sin_rafaga(historial: List[Dict[str, Any]], burst: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """Quita del historial (en orden cronológico) la última fila de usuario de cada mensaje de la ráfaga."""
+    historial = list(historial)
+    for mensaje in reversed(burst):
+        for i in range(len(historial) - 1, -1, -1):
+            if historial[i].get("tipo_emisor") == "user" and historial[i].get("contenido") == mensaje["text"]:
+                del historial[i]
+                break
+    return historial
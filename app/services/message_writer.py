@@ -0,0 +1,177 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from ..config import Config
+from ..database import get_async_supabase_client
+from .response_cache import response_cache
+
+
+class MessageWriter:
+    """
+    Escritura diferida (write-behind) de la tabla `mensajes`.
+
+    `enqueue` solo agrega la fila a un buffer en memoria; una tarea de fondo
+    la inserta en lote cuando se juntan `batch_size` filas o cada
+    `flush_interval` segundos. Los errores transitorios se reintentan
+    `max_retries` veces y el lote vuelve al buffer para el siguiente ciclo;
+    al apagar se vacía el buffer antes de cerrar la conexión con Supabase.
+    """
+
+    def __init__(self, table: str = "mensajes", batch_size: int = 50, flush_interval: float = 0.25,
+                 max_retries: int = 3, retry_backoff: float = 0.2, max_buffer: int = 10_000):
+        self.table = table
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_buffer = max_buffer
+        self.db = get_async_supabase_client()
+        self._buffer: List[Dict[str, Any]] = []
+        self._en_vuelo: List[Dict[str, Any]] = []
+        self._lleno = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._tarea: Optional[asyncio.Task] = None
+        self._detenido = False
+        self.flushed = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_batches = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._tarea is not None
+
+    async def start(self) -> None:
+        if self._tarea is None:
+            self._detenido = False
+            self._tarea = asyncio.create_task(self._vaciar_periodicamente(), name="message-writer")
+            print(f"MessageWriter iniciado (lotes de {self.batch_size}, cada {self.flush_interval}s)")
+
+    def enqueue(self, row: Dict[str, Any]) -> None:
+        self._buffer.append(row)
+        if len(self._buffer) > self.max_buffer:
+            # Supabase lleva demasiado tiempo caído: se descartan las filas más antiguas
+            exceso = len(self._buffer) - self.max_buffer
+            del self._buffer[:exceso]
+            self.dropped += exceso
+            print(f"MessageWriter: buffer lleno, se descartaron {exceso} mensajes")
+        if len(self._buffer) >= self.batch_size:
+            self._lleno.set()
+
+    def pending(self, wa_id: str) -> List[Dict[str, Any]]:
+        """Filas de `wa_id` aún no confirmadas por Supabase (de la más antigua a la más reciente)."""
+        return [r for r in self._en_vuelo + self._buffer if r.get("numero_whatsapp") == wa_id]
+
+    async def _vaciar_periodicamente(self) -> None:
+        while not self._detenido:
+            try:
+                await asyncio.wait_for(self._lleno.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._lleno.clear()
+            await self._vaciar()
+
+    async def _vaciar(self) -> bool:
+        """`flush` que no propaga errores inesperados, para la tarea de fondo y el apagado."""
+        try:
+            return await self.flush()
+        except Exception as e:
+            # P. ej. una fila que no se puede serializar: el lote volvió al buffer y se
+            # reintenta en el siguiente ciclo en vez de terminar la tarea en silencio
+            self.failed_batches += 1
+            print(f"MessageWriter: error inesperado al vaciar el buffer: {e!r}")
+            return False
+
+    async def flush(self) -> bool:
+        """Inserta todo el buffer en lotes. Devuelve False si un lote no pudo escribirse."""
+        async with self._lock:
+            while self._buffer:
+                self._en_vuelo = self._buffer[:self.batch_size]
+                del self._buffer[:len(self._en_vuelo)]
+                try:
+                    ok = await self._insertar(self._en_vuelo)
+                except BaseException:
+                    # Cancelado o con un error inesperado a mitad del insert: el lote vuelve
+                    # al buffer (puede repetirse, no perderse)
+                    self._buffer[:0] = self._en_vuelo
+                    self._en_vuelo = []
+                    raise
+                if not ok:
+                    # Vuelve al principio del buffer para conservar el orden
+                    self._buffer[:0] = self._en_vuelo
+                    self._en_vuelo = []
+                    return False
+                self._en_vuelo = []
+        return True
+
+    async def _insertar(self, lote: List[Dict[str, Any]]) -> bool:
+        for intento in range(self.max_retries + 1):
+            try:
+                columnas = {frozenset(r) for r in lote}
+                await self.db.insert(
+                    self.table, lote, returning=False,
+                    columns=sorted(set().union(*columnas)) if len(columnas) > 1 else None,
+                )
+                response_cache.invalidate()
+                self.batches += 1
+                self.flushed += len(lote)
+                return True
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status < 500 and status != 429:
+                    # Error de datos: reintentar no sirve, se descarta el lote
+                    self.dropped += len(lote)
+                    print(f"MessageWriter: Supabase rechazó un lote de {len(lote)} mensajes ({status}): {e.response.text}")
+                    return True
+                error = e
+            except httpx.TransportError as e:
+                error = e
+            if intento < self.max_retries:
+                self.retries += 1
+                await asyncio.sleep(self.retry_backoff * (2 ** intento))
+        self.failed_batches += 1
+        print(f"MessageWriter: no se pudo insertar un lote de {len(lote)} mensajes: {error!r}")
+        return False
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Detiene la tarea de fondo y vacía el buffer, reintentando hasta `timeout`."""
+        limite = time.monotonic() + timeout
+        if self._tarea is not None:
+            # Se espera a que termine el lote en vuelo; solo se cancela si se agota el plazo
+            self._detenido = True
+            self._lleno.set()
+            terminada, _ = await asyncio.wait({self._tarea}, timeout=timeout)
+            if not terminada:
+                self._tarea.cancel()
+            await asyncio.gather(self._tarea, return_exceptions=True)
+            self._tarea = None
+        while self._buffer and not await self._vaciar():
+            if time.monotonic() >= limite:
+                print(f"MessageWriter: timeout al apagar, se pierden {len(self._buffer)} mensajes")
+                break
+            await asyncio.sleep(self.retry_backoff)
+        print("MessageWriter detenido")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "buffered": len(self._buffer) + len(self._en_vuelo),
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "avg_batch": round(self.flushed / self.batches, 2) if self.batches else 0.0,
+            "retries": self.retries,
+            "failed_batches": self.failed_batches,
+            "dropped": self.dropped,
+        }
+
+
+message_writer = MessageWriter(
+    batch_size=Config.MESSAGE_BATCH_SIZE,
+    flush_interval=Config.MESSAGE_FLUSH_INTERVAL,
+    max_retries=Config.MESSAGE_FLUSH_RETRIES,
+    max_buffer=Config.MESSAGE_BUFFER_MAX,
+)
@@ -0,0 +1,94 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Paginación por keyset (fecha, id) sobre PostgREST con cursores opacos.
+#
+# El orden de las listas es siempre `fecha desc nullslast, id desc`. Un cursor
+# "next" apunta a la última fila de la página y pide las siguientes (más
+# antiguas); un cursor "prev" apunta a la primera y pide las anteriores (más
+# recientes). Cada página cuesta lo mismo sin importar cuán atrás esté.
+
+class CursorInvalido(ValueError):
+    pass
+
+
+NEXT = "next"
+PREV = "prev"
+
+
+def codificar_cursor(fila: Dict[str, Any], col_fecha: str, col_id: str, direccion: str) -> str:
+    datos = json.dumps({"k": [fila.get(col_fecha), fila.get(col_id)], "d": direccion}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(datos.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[Any, Any, str]:
+    """(fecha, id, dirección) de un cursor; CursorInvalido si no se puede decodificar."""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        fecha, id_ = datos["k"]
+        direccion = datos["d"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise CursorInvalido("Cursor inválido") from e
+    if direccion not in (NEXT, PREV) or id_ is None:
+        raise CursorInvalido("Cursor inválido")
+    return fecha, id_, direccion
+
+
+def _valor(v: Any) -> str:
+    # Entre comillas para que ":" "+" "," de las fechas no rompan el filtro or=()
+    return '"' + str(v).replace('"', '\\"') + '"'
+
+
+def parametros_keyset(col_fecha: str, col_id: str, cursor: Optional[str]
+                      ) -> Tuple[Dict[str, str], str, str]:
+    """(filtros PostgREST, order, dirección) para pedir la página que indica el cursor."""
+    orden_desc = f"{col_fecha}.desc.nullslast,{col_id}.desc"
+    if not cursor:
+        return {}, orden_desc, NEXT
+
+    fecha, id_, direccion = decodificar_cursor(cursor)
+    if direccion == NEXT:
+        if fecha is None:
+            condicion = f"and({col_fecha}.is.null,{col_id}.lt.{_valor(id_)})"
+        else:
+            condicion = (
+                f"{col_fecha}.lt.{_valor(fecha)},"
+                f"and({col_fecha}.eq.{_valor(fecha)},{col_id}.lt.{_valor(id_)}),"
+                f"{col_fecha}.is.null"
+            )
+        return {"or": f"({condicion})"}, orden_desc, NEXT
+
+    # PREV: las filas anteriores en orden inverso; se dan vuelta al armar la página
+    if fecha is None:
+        condicion = f"{col_fecha}.not.is.null,and({col_fecha}.is.null,{col_id}.gt.{_valor(id_)})"
+    else:
+        condicion = (
+            f"{col_fecha}.gt.{_valor(fecha)},"
+            f"and({col_fecha}.eq.{_valor(fecha)},{col_id}.gt.{_valor(id_)})"
+        )
+    return {"or": f"({condicion})"}, f"{col_fecha}.asc.nullsfirst,{col_id}.asc", PREV
+
+
+def armar_pagina(filas: List[Dict[str, Any]], limit: int, col_fecha: str, col_id: str,
+                 cursor: Optional[str], direccion: str
+                 ) -> Tuple[List[Dict[str, Any]], Dict[str, Optional[str]]]:
+    """
+    Recorta las `limit + 1` filas pedidas a una página (siempre en orden
+    descendente) y calcula los cursores hacia páginas más antiguas y más recientes.
+    """
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+    if direccion == PREV:
+        filas.reverse()
+        hay_antes, hay_despues = hay_mas, True
+    else:
+        hay_antes, hay_despues = bool(cursor), hay_mas
+
+    cursores: Dict[str, Optional[str]] = {"next": None, "prev": None}
+    if filas and hay_despues:
+        cursores["next"] = codificar_cursor(filas[-1], col_fecha, col_id, NEXT)
+    if filas and hay_antes:
+        cursores["prev"] = codificar_cursor(filas[0], col_fecha, col_id, PREV)
+    return filas, cursores
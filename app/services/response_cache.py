@@ -0,0 +1,83 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+from ..config import Config
+
+
+class Entrada(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+    creado: float
+
+
+class ResponseCache:
+    """
+    Caché de respuestas ya serializadas de los endpoints que el dashboard
+    consulta por polling (/frontend/leads, /frontend/conversaciones).
+
+    Cada entrada vive `ttl` segundos (los textos "hace 5 m" envejecen aunque
+    no haya escrituras) y todas se invalidan cuando se guarda un mensaje.
+    El ETag es un hash del cuerpo, así un poll sin cambios recibe 304.
+    """
+
+    def __init__(self, ttl: float = 5.0, max_items: int = 256):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._entradas: "OrderedDict[str, Entrada]" = OrderedDict()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, clave: str) -> Optional[Entrada]:
+        entrada = self._entradas.get(clave)
+        if entrada is not None and time.monotonic() - entrada.creado <= self.ttl:
+            self._entradas.move_to_end(clave)
+            self.hits += 1
+            return entrada
+        if entrada is not None:
+            del self._entradas[clave]
+        self.misses += 1
+        return None
+
+    def put(self, clave: str, body: bytes, headers: Dict[str, str], version: int) -> Entrada:
+        """Guarda la respuesta salvo que haya habido una escritura desde `version` (se devuelve igual)."""
+        entrada = Entrada(body, etag_de(body), headers, time.monotonic())
+        if self.enabled and version == self.version:
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_items:
+                self._entradas.popitem(last=False)
+        return entrada
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self.invalidations += 1
+        self._entradas.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entradas),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def etag_de(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+response_cache = ResponseCache(ttl=Config.FRONTEND_CACHE_TTL)
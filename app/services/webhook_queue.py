@@ -0,0 +1,105 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class WebhookQueue:
+    """
+    Cola en memoria con un pool de workers asíncronos para procesar los
+    eventos del webhook fuera del ciclo request/response.
+
+    El router solo valida y encola; los workers ejecutan el handler
+    (Supabase + agente + envío por WhatsApp) en segundo plano.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        workers: int = 4,
+        maxsize: int = 1000,
+    ):
+        self.handler = handler
+        self.num_workers = max(1, workers)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._workers: List[asyncio.Task] = []
+        self._busy = 0
+        self._busy_time = 0.0
+        self._started_at: Optional[float] = None
+        self._accepting = False
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._accepting = True
+        self._started_at = time.monotonic()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"webhook-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        print(f"WebhookQueue iniciada con {self.num_workers} workers")
+
+    def enqueue(self, data: Dict[str, Any]) -> bool:
+        """Encola un evento sin bloquear. Devuelve False si la cola está llena o cerrada."""
+        if not self._accepting:
+            self.rejected += 1
+            return False
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            data = await self.queue.get()
+            self._busy += 1
+            inicio = time.monotonic()
+            try:
+                await self.handler(data)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Error en webhook-worker-{worker_id}: {e}")
+            finally:
+                self._busy -= 1
+                self._busy_time += time.monotonic() - inicio
+                self.queue.task_done()
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Deja de aceptar eventos, espera a que la cola se vacíe y apaga los workers."""
+        self._accepting = False
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"WebhookQueue: timeout al drenar, quedan {self.queue.qsize()} eventos sin procesar")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        print("WebhookQueue detenida")
+
+    def stats(self) -> Dict[str, Any]:
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        capacidad = uptime * self.num_workers
+        return {
+            "running": self.running,
+            "queue_depth": self.queue.qsize(),
+            "queue_maxsize": self.queue.maxsize,
+            "workers": self.num_workers,
+            "busy_workers": self._busy,
+            "utilization": round(self._busy / self.num_workers, 3),
+            "avg_utilization": round(self._busy_time / capacidad, 3) if capacidad else 0.0,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
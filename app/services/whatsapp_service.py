@@ -1,14 +1,95 @@
-import requests
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import httpx
 
 from ..config import Config
 
+# Throughput de la WhatsApp Cloud API por número de teléfono (mensajes/seg).
+# "standard" es el límite por defecto; "high" aplica a números con el
+# throughput ampliado por Meta.
+RATE_TIERS = {
+    "standard": 80,
+    "high": 1000,
+}
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Errores en los que el POST no llegó a enviarse: reintentar no duplica el
+# mensaje. Un ReadTimeout o una conexión cortada a mitad de respuesta pueden
+# llegar después de que Graph aceptó el envío, así que esos no se reintentan.
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class TokenBucket:
+    """Token bucket asíncrono: `rate` tokens por segundo con ráfagas de hasta `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        ahora = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (ahora - self._updated) * self.rate)
+        self._updated = ahora
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
 class WhatsAppService:
+    """
+    Cliente de la Graph API compartido por toda la app: una sola sesión
+    httpx con keep-alive, concurrencia acotada, rate limiting por token
+    bucket y reintentos con backoff ante 429/5xx y errores de conexión.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(WhatsAppService, cls).__new__(cls)
+            cls._instance._init_state()
+        return cls._instance
+
+    def _init_state(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(Config.WHATSAPP_MAX_CONCURRENCY)
+        self._bucket = TokenBucket(RATE_TIERS.get(Config.WHATSAPP_RATE_TIER, RATE_TIERS["standard"]))
+        self._latencies = deque(maxlen=1000)
+        self.sent = 0
+        self.retries = 0
+        self.errors = 0
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=Config.WHATSAPP_API_URL,
+                headers={"Authorization": f"Bearer {Config.ACCESS_TOKEN}"},
+                timeout=Config.WHATSAPP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=Config.WHATSAPP_MAX_CONCURRENCY,
+                    max_keepalive_connections=Config.WHATSAPP_MAX_CONCURRENCY,
+                ),
+            )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     async def send_message(self, to, message):
-        url = f"https://graph.facebook.com/{Config.VERSION}/{Config.PHONE_NUMBER_ID}/messages"
-        headers = {
-            "Authorization": f"Bearer {Config.ACCESS_TOKEN}",
-            "Content-Type": "application/json"
-        }
+        url = f"/{Config.VERSION}/{Config.PHONE_NUMBER_ID}/messages"
         data = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
@@ -19,5 +100,66 @@ class WhatsAppService:
                 "body": message
             }
         }
-        response = requests.post(url, headers=headers, json=data)
-        return response
\ No newline at end of file
+        if self._client is None:
+            await self.start()
+
+        inicio = time.perf_counter()
+        try:
+            async with self._semaphore:
+                response = await self._post_con_reintentos(url, data)
+        finally:
+            self._latencies.append(time.perf_counter() - inicio)
+        self.sent += 1
+        return response
+
+    async def _post_con_reintentos(self, url: str, data: Dict[str, Any]) -> httpx.Response:
+        intento = 0
+        while True:
+            await self._bucket.acquire()
+            try:
+                response = await self._client.post(url, json=data)
+            except httpx.TransportError as e:
+                if not isinstance(e, RETRY_ERRORS) or intento >= Config.WHATSAPP_MAX_RETRIES:
+                    self.errors += 1
+                    raise
+                print(f"Error de red con la Graph API ({e}), reintentando...")
+                espera = self._backoff(intento)
+            else:
+                if response.status_code not in RETRY_STATUS or intento >= Config.WHATSAPP_MAX_RETRIES:
+                    if response.is_error:
+                        self.errors += 1
+                    return response
+                espera = self._backoff(intento, response.headers.get("Retry-After"))
+                print(f"Graph API respondió {response.status_code}, reintentando en {espera:.2f}s")
+            intento += 1
+            self.retries += 1
+            await asyncio.sleep(espera)
+
+    @staticmethod
+    def _backoff(intento: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), 30.0)
+            except ValueError:
+                pass
+        base = Config.WHATSAPP_RETRY_BACKOFF * (2 ** intento)
+        return base + random.uniform(0, base)
+
+    def stats(self) -> Dict[str, Any]:
+        latencias = sorted(self._latencies)
+
+        def percentil(p: float) -> float:
+            if not latencias:
+                return 0.0
+            return round(latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000, 1)
+
+        return {
+            "sent": self.sent,
+            "retries": self.retries,
+            "errors": self.errors,
+            "latency_ms": {
+                "p50": percentil(0.50),
+                "p95": percentil(0.95),
+                "max": round(latencias[-1] * 1000, 1) if latencias else 0.0,
+            },
+        }
@@ -0,0 +1,82 @@
+import re
+import unicodedata
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def normalizar_valor(valor) -> str:
+    """Minúsculas, sin tildes y sin espacios sobrantes, para comparar valores de catálogo."""
+    texto = unicodedata.normalize("NFKD", str(valor))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.casefold().split())
+
+
+def _palabras(texto: str) -> str:
+    return " " + " ".join(re.findall(r"[0-9a-z]+", texto)) + " "
+
+
+class ColumnarIndex:
+    """
+    Índices por columna para filtrar filas antes de la búsqueda vectorial.
+
+    - Columnas categóricas: valor normalizado -> array de filas. Un filtro
+      coincide con los valores que lo contienen como palabras completas
+      ("lima" encuentra "Lima" y "COCHERA GALICIA - LIMA", pero no "Limatambo").
+    - Columnas numéricas: valores ordenados + permutación, así un rango se
+      resuelve con dos búsquedas binarias.
+    """
+
+    def __init__(self, df: pd.DataFrame, categoricas: Iterable[str], numericas: Iterable[str]):
+        self.num_rows = len(df)
+        self.categoricas: Dict[str, Dict[str, np.ndarray]] = {}
+        for col in categoricas:
+            claves = df[col].map(lambda v: _palabras(normalizar_valor(v)) if pd.notna(v) else "")
+            grupos = pd.Series(np.arange(self.num_rows)).groupby(claves.to_numpy()).indices
+            self.categoricas[col] = {
+                k: np.asarray(v, dtype=np.intp) for k, v in grupos.items() if k.strip()
+            }
+
+        self.numericas: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for col in numericas:
+            valores = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+            validas = np.flatnonzero(~np.isnan(valores))
+            orden = validas[np.argsort(valores[validas], kind="stable")]
+            self.numericas[col] = (valores[orden], orden)
+
+    def filtrar_categoria(self, col: str, valor: str) -> np.ndarray:
+        clave = _palabras(normalizar_valor(valor))
+        if not clave.strip():
+            return np.empty(0, dtype=np.intp)
+        coincidencias = [filas for k, filas in self.categoricas[col].items() if clave in k]
+        if not coincidencias:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate(coincidencias))
+
+    def filtrar_rango(self, col: str, minimo: Optional[float] = None,
+                      maximo: Optional[float] = None) -> np.ndarray:
+        valores, orden = self.numericas[col]
+        lo = 0 if minimo is None else np.searchsorted(valores, minimo, side="left")
+        hi = len(valores) if maximo is None else np.searchsorted(valores, maximo, side="right")
+        return np.sort(orden[lo:hi])
+
+    def candidatos(self, categorias: Optional[Dict[str, str]] = None,
+                   rangos: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None
+                   ) -> Optional[np.ndarray]:
+        """
+        Intersección de todos los filtros activos, como array ordenado de filas.
+        Devuelve None si no hay ningún filtro (= todas las filas).
+        """
+        resultado: Optional[np.ndarray] = None
+        for col, valor in (categorias or {}).items():
+            if valor is None or str(valor).strip() == "":
+                continue
+            filas = self.filtrar_categoria(col, valor)
+            resultado = filas if resultado is None else np.intersect1d(resultado, filas, assume_unique=True)
+        for col, (minimo, maximo) in (rangos or {}).items():
+            if minimo is None and maximo is None:
+                continue
+            filas = self.filtrar_rango(col, minimo, maximo)
+            resultado = filas if resultado is None else np.intersect1d(resultado, filas, assume_unique=True)
+        return resultado
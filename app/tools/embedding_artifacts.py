@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from .vector_store import normalizar_filas
+
+FORMATO = 1
+
+
+def hash_texto(texto: str) -> str:
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def _version(model: str, hashes: List[str]) -> str:
+    h = hashlib.sha1(model.encode("utf-8"))
+    for fila in hashes:
+        h.update(fila.encode("ascii"))
+    return h.hexdigest()[:16]
+
+
+def _escribir_atomico(path: Path, escribir: Callable) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        escribir(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def cargar_o_construir(
+    directorio: Path,
+    nombre: str,
+    texts: List[str],
+    model: str,
+    embed_fn: Callable[[List[str]], List[List[float]]],
+) -> Tuple[np.ndarray, str]:
+    """
+    Carga (vía mmap) la matriz de embeddings normalizada de `texts`, re-embebiendo
+    solo las filas nuevas o modificadas.
+
+    En disco hay dos archivos:
+    - ``{nombre}_embeddings.json``: manifiesto con el modelo, el hash de
+      contenido de cada fila y el nombre de la matriz vigente.
+    - ``{nombre}_embeddings.{version}.npy``: matriz float32 ya normalizada.
+
+    El manifiesto se reemplaza de forma atómica después de escribir la matriz,
+    así un lector nunca ve una matriz que no corresponde a su manifiesto. Varios
+    workers que abren el mismo .npy comparten las páginas en la caché del SO.
+
+    Devuelve ``(matriz, version)``; la versión cambia cuando cambia el contenido.
+    """
+    directorio = Path(directorio)
+    manifest_path = directorio / f"{nombre}_embeddings.json"
+    hashes = [hash_texto(t) for t in texts]
+    version = _version(model, hashes)
+
+    anterior = None
+    if manifest_path.exists():
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                anterior = json.load(f)
+            matriz_anterior = np.load(directorio / anterior["archivo"], mmap_mode="r")
+            if anterior.get("formato") != FORMATO or anterior.get("model") != model \
+                    or matriz_anterior.shape[0] != len(anterior["hashes"]):
+                anterior = None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Manifiesto de embeddings '{nombre}' inválido ({e}), se regenera")
+            anterior = None
+
+    if anterior is not None and anterior["hashes"] == hashes:
+        return matriz_anterior, version
+
+    filas_previas = {}
+    if anterior is not None:
+        filas_previas = {h: i for i, h in enumerate(anterior["hashes"])}
+        print(f"Embeddings '{nombre}' desactualizados respecto a los datos, actualizando...")
+
+    faltantes = [i for i, h in enumerate(hashes) if h not in filas_previas]
+    nuevos = None
+    if faltantes:
+        print(f"Generando embeddings '{nombre}': {len(faltantes)} de {len(texts)} filas")
+        nuevos = normalizar_filas(embed_fn([texts[i] for i in faltantes]))
+
+    if nuevos is not None:
+        dim = nuevos.shape[1]
+    else:
+        dim = matriz_anterior.shape[1] if anterior is not None else 0
+    matriz = np.empty((len(texts), dim), dtype=np.float32)
+    if nuevos is not None:
+        matriz[faltantes] = nuevos
+    reutilizadas = [i for i, h in enumerate(hashes) if h in filas_previas]
+    if reutilizadas:
+        matriz[reutilizadas] = matriz_anterior[[filas_previas[hashes[i]] for i in reutilizadas]]
+
+    archivo = f"{nombre}_embeddings.{version}.npy"
+    _escribir_atomico(directorio / archivo, lambda f: np.save(f, matriz))
+    manifest = {
+        "formato": FORMATO,
+        "model": model,
+        "version": version,
+        "archivo": archivo,
+        "dim": dim,
+        "hashes": hashes,
+    }
+    _escribir_atomico(
+        manifest_path,
+        lambda f: f.write(json.dumps(manifest).encode("utf-8")),
+    )
+
+    # Las matrices viejas se pueden borrar: los procesos que aún las tengan
+    # mapeadas conservan su copia hasta cerrarlas.
+    for viejo in directorio.glob(f"{nombre}_embeddings.*.npy"):
+        if viejo.name != archivo:
+            try:
+                viejo.unlink()
+            except OSError:
+                pass
+
+    return np.load(directorio / archivo, mmap_mode="r"), version
@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from openai import AsyncOpenAI, OpenAI, OpenAIError
+
+from ..config import Config
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+client = OpenAI(api_key=Config.OPENAI_API_KEY)
+async_client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
+
+# Errores ante los que las búsquedas caen a la ruta léxica
+EMBEDDING_ERRORS = (OpenAIError, asyncio.TimeoutError)
+# Las consultas no se reintentan: el SDK reintenta 2 veces los timeouts y la
+# caída a la ruta léxica tardaría 3 veces EMBEDDING_TIMEOUT
+_SIN_REINTENTOS = {"max_retries": 0}
+
+
+def normalizar_consulta(texto: str) -> str:
+    """Normaliza una consulta para usarla como clave de caché (unicode, mayúsculas y espacios)."""
+    texto = unicodedata.normalize("NFKC", texto).casefold()
+    return " ".join(texto.split())
+
+
+class EmbeddingCache:
+    """
+    Caché de embeddings de consultas en dos niveles:
+
+    - memoria: LRU acotado por número de entradas, con TTL.
+    - disco (opcional): SQLite, sobrevive a reinicios y se comparte entre workers.
+
+    Las claves son el texto normalizado más el modelo, así que una consulta
+    embebida para las FAQs se reutiliza en la búsqueda de productos.
+    """
+
+    def __init__(self, max_items: int = 2048, ttl: float = 7 * 24 * 3600,
+                 path: Optional[str] = None, max_disk_items: int = 100_000):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_disk_items = max_disk_items
+        self._memoria: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._escrituras_disco = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "clave TEXT PRIMARY KEY, creado REAL NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def clave(texto: str, model: str = EMBEDDING_MODEL) -> str:
+        return hashlib.sha1(f"{model}\x00{normalizar_consulta(texto)}".encode("utf-8")).hexdigest()
+
+    def get(self, texto: str, model: str = EMBEDDING_MODEL) -> Optional[np.ndarray]:
+        clave = self.clave(texto, model)
+        ahora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                creado, vector = entrada
+                if ahora - creado <= self.ttl:
+                    self._memoria.move_to_end(clave)
+                    self.hits += 1
+                    return vector
+                del self._memoria[clave]
+
+            if self._db is not None:
+                fila = self._db.execute(
+                    "SELECT creado, vector FROM embeddings WHERE clave = ?", (clave,)
+                ).fetchone()
+                if fila is not None and ahora - fila[0] <= self.ttl:
+                    vector = np.frombuffer(fila[1], dtype=np.float32)
+                    self._guardar_en_memoria(clave, fila[0], vector)
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, texto: str, embedding, model: str = EMBEDDING_MODEL) -> np.ndarray:
+        clave = self.clave(texto, model)
+        vector = np.asarray(embedding, dtype=np.float32)
+        creado = time.time()
+        with self._lock:
+            self._guardar_en_memoria(clave, creado, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (clave, creado, vector) VALUES (?, ?, ?)",
+                    (clave, creado, vector.tobytes()),
+                )
+                self._escrituras_disco += 1
+                if self._escrituras_disco % 500 == 0:
+                    self._podar_disco()
+                self._db.commit()
+        return vector
+
+    def _guardar_en_memoria(self, clave: str, creado: float, vector: np.ndarray) -> None:
+        self._memoria[clave] = (creado, vector)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_items:
+            self._memoria.popitem(last=False)
+            self.evictions += 1
+
+    def _podar_disco(self) -> None:
+        self._db.execute("DELETE FROM embeddings WHERE creado < ?", (time.time() - self.ttl,))
+        self._db.execute(
+            "DELETE FROM embeddings WHERE clave NOT IN "
+            "(SELECT clave FROM embeddings ORDER BY creado DESC LIMIT ?)",
+            (self.max_disk_items,),
+        )
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._memoria),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.disk_hits) / total, 3) if total else 0.0,
+        }
+
+
+embedding_cache = EmbeddingCache(
+    max_items=Config.EMBEDDING_CACHE_SIZE,
+    ttl=Config.EMBEDDING_CACHE_TTL,
+    path=Config.EMBEDDING_CACHE_PATH or None,
+)
+
+_en_vuelo: Dict[str, asyncio.Future] = {}
+
+
+def embed_query(query: str) -> np.ndarray:
+    """Embedding de una consulta, pasando por la caché compartida."""
+    vector = embedding_cache.get(query)
+    if vector is None:
+        response = client.with_options(**_SIN_REINTENTOS).embeddings.create(
+            input=[query], model=EMBEDDING_MODEL, timeout=Config.EMBEDDING_TIMEOUT
+        )
+        vector = embedding_cache.put(query, response.data[0].embedding)
+    return vector
+
+
+async def aembed_query(query: str) -> np.ndarray:
+    """
+    Variante asíncrona de embed_query. Las consultas idénticas que llegan a la
+    vez comparten una sola llamada a la API.
+    """
+    vector = embedding_cache.get(query)
+    if vector is not None:
+        return vector
+
+    clave = EmbeddingCache.clave(query)
+    pendiente = _en_vuelo.get(clave)
+    if pendiente is not None:
+        return await asyncio.shield(pendiente)
+
+    futuro = asyncio.get_running_loop().create_future()
+    _en_vuelo[clave] = futuro
+    try:
+        # El timeout de httpx es por fase (conexión, lectura...); wait_for acota la llamada completa
+        response = await asyncio.wait_for(
+            async_client.with_options(**_SIN_REINTENTOS).embeddings.create(
+                input=[query], model=EMBEDDING_MODEL, timeout=Config.EMBEDDING_TIMEOUT
+            ),
+            Config.EMBEDDING_TIMEOUT,
+        )
+        vector = embedding_cache.put(query, response.data[0].embedding)
+        futuro.set_result(vector)
+        return vector
+    except BaseException as e:
+        if isinstance(e, Exception):
+            futuro.set_exception(e)
+            # Evita el aviso de "exception was never retrieved" si nadie más esperaba
+            futuro.exception()
+        else:
+            futuro.cancel()
+        raise
+    finally:
+        del _en_vuelo[clave]
+
+
+def embed_texts(texts: List[str], batch_size: int = 100) -> List[List[float]]:
+    """Embeddings de un corpus completo en lotes (sin caché, se usa al construir los stores)."""
+    embeddings = []
+    for chunk in range(0, len(texts), batch_size):
+        response = client.embeddings.create(
+            input=texts[chunk:chunk + batch_size],
+            model=EMBEDDING_MODEL
+        )
+        embeddings.extend([e.embedding for e in response.data])
+    return embeddings
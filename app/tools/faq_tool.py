@@ -1,60 +1,63 @@
 import pandas as pd
 from pathlib import Path
-from sklearn.metrics.pairwise import cosine_similarity
-from langchain.tools import tool
-from openai import OpenAI
-from ..config import Config
-import pickle
+from langchain_core.tools import StructuredTool
+from .vector_store import VectorStore
+from .lexical_index import BM25Index
+from .rendering import prerender, render_faq_row
+from .hybrid_search import abuscar, buscar
+from .embeddings import EMBEDDING_MODEL, embed_texts
+from .embedding_artifacts import cargar_o_construir
 
 # Ruta absoluta al archivo CSV
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 FAQ_FILE = BASE_DIR / 'data' / 'faqs.csv'
-EMB_FILE = BASE_DIR / 'data' / 'faq_embeddings.pkl'
-
-client = OpenAI(api_key=Config.OPENAI_API_KEY)
+EMB_DIR = BASE_DIR / 'data'
 
 class FAQStore:
-    _instance = None
+    """
+    Snapshot inmutable de los datos y embeddings. Para actualizarlo se construye
+    uno nuevo con reload_faq_store(); las búsquedas en curso siguen usando el suyo.
+    """
+
+    def __init__(self):
+        self._load_data()
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(FAQStore, cls).__new__(cls)
-            cls._instance._load_data()
-        return cls._instance
-    
     def _load_data(self):
         self.faq_df = pd.read_csv(FAQ_FILE)
-        if EMB_FILE.exists():
-            with open(EMB_FILE, 'rb') as f:
-                self.faq_embeddings = pickle.load(f)
-        else:
-            self.faq_embeddings = self._generate_embeddings()
-            with open(EMB_FILE, 'wb') as f:
-                pickle.dump(self.faq_embeddings, f)
+        # Matriz float32 normalizada en disco (mmap); solo se re-embeben las filas
+        # nuevas o modificadas respecto al manifiesto de hashes
+        matrix, self.version = cargar_o_construir(
+            EMB_DIR, 'faq', self._embedding_texts(), EMBEDDING_MODEL, embed_texts
+        )
+        self.vectors = VectorStore(matrix, normalized=True)
+        self.lexical = BM25Index(
+            (self.faq_df['Pregunta'].fillna('').astype(str) + ' ' +
+             self.faq_df['Respuesta'].fillna('').astype(str)).tolist()
+        )
+        self.rendered = prerender(self.faq_df, render_faq_row)
 
-    def _generate_embeddings(self):
+    def _embedding_texts(self):
         texts = (
             self.faq_df['Categoría'].astype(str) + ' ' +
             self.faq_df['Empresa'].astype(str) + ' ' +
             self.faq_df['Pregunta'].astype(str) + ' ' +
             self.faq_df['Respuesta'].astype(str)
         ).tolist()
-        embeddings = []
-        for chunk in range(0, len(texts), 100):
-            response = client.embeddings.create(
-                input=texts[chunk:chunk+100],
-                model="text-embedding-3-small"
-            )
-            embeddings.extend([e.embedding for e in response.data])
-        return embeddings
+        return texts
 
 faq_store = FAQStore()
 
-@tool
-def search_faq(query: str, top_n: int = 3) -> str:
+def reload_faq_store() -> FAQStore:
+    """Construye un FAQStore nuevo (reutilizando los embeddings sin cambios) y lo publica de forma atómica."""
+    global faq_store
+    nuevo = FAQStore()
+    faq_store = nuevo
+    return nuevo
+
+def _search_faq(query: str, top_n: int = 3) -> str:
     """
-    Busca en las preguntas frecuentes de Bob Subastas usando similitud semántica basada en embeddings.
-    Esta función usa embeddings de OpenAI para encontrar las FAQs más similares
+    Busca en las preguntas frecuentes de Bob Subastas combinando coincidencia de palabras (BM25)
+    y similitud semántica basada en embeddings de OpenAI para encontrar las FAQs más similares
     basándose en la consulta del usuario. Devuelve información detallada sobre las preguntas y respuestas más coincidentes.
     
     Args:
@@ -70,27 +73,22 @@ def search_faq(query: str, top_n: int = 3) -> str:
         - Usa esta herramienta cuando el usuario necesite información general sobre la empresa
         - Usa esta herramienta para resolver dudas frecuentes sobre Bob Subastas
     """
-    q_emb = client.embeddings.create(
-        input=[query],
-        model="text-embedding-3-small"
-    ).data[0].embedding
+    store = faq_store
+    indices = buscar(store.vectors, store.lexical, query, top_n)
+    return _formatear_resultados(store, indices)
 
-    sims = cosine_similarity(
-        [q_emb],
-        faq_store.faq_embeddings
-    ).flatten()
-    top_indices = sims.argsort()[-top_n:][::-1]
+async def _asearch_faq(query: str, top_n: int = 3) -> str:
+    """Variante asíncrona de search_faq: usa el cliente AsyncOpenAI para no bloquear el event loop."""
+    store = faq_store  # snapshot fijo durante toda la llamada
+    indices = await abuscar(store.vectors, store.lexical, query, top_n)
+    return _formatear_resultados(store, indices)
 
-    results = faq_store.faq_df.iloc[top_indices]
-    
-    # Formatear resultados como texto
-    output = []
-    for _, row in results.iterrows():
-        output.append(
-            f"Categoría: {row['Categoría']}\n"
-            f"Empresa: {row['Empresa']}\n"
-            f"Pregunta: {row['Pregunta']}\n"
-            f"Respuesta: {row['Respuesta']}"
-        )
-    
-    return "\n\n".join(output) if output else "No se encontraron FAQs relacionadas."
\ No newline at end of file
+def _formatear_resultados(store: FAQStore, top_indices) -> str:
+    output = [store.rendered[i] for i in top_indices]
+    return "\n\n".join(output) if output else "No se encontraron FAQs relacionadas."
+
+search_faq = StructuredTool.from_function(
+    func=_search_faq,
+    coroutine=_asearch_faq,
+    name="search_faq",
+)
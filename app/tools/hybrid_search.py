@@ -0,0 +1,96 @@
+from collections import Counter, defaultdict
+from typing import Optional
+
+import numpy as np
+
+from ..config import Config
+from .embeddings import EMBEDDING_ERRORS, aembed_query, embed_query
+from .lexical_index import BM25Index
+from .vector_store import VectorStore
+
+# Contadores de qué ruta resolvió cada búsqueda (expuestos en /stats)
+search_stats: Counter = Counter()
+
+RRF_K = 60
+
+
+def es_decisivo(scores: np.ndarray, top_n: int) -> bool:
+    """
+    La coincidencia léxica es decisiva si el mejor puntaje supera el umbral y le
+    saca un margen amplio al siguiente puntaje distinto. Los empates en la cima
+    (p. ej. el mismo lote publicado dos veces) cuentan como un solo ganador,
+    siempre que quepan en top_n.
+    """
+    if len(scores) == 0 or scores[0] < Config.LEXICAL_MIN_SCORE:
+        return False
+    empatados = int(np.count_nonzero(scores >= scores[0] * 0.999))
+    if empatados > top_n:
+        return False
+    if empatados == len(scores):
+        return True
+    return scores[0] >= Config.LEXICAL_DECISIVE_RATIO * scores[empatados]
+
+
+def ruta_lexica(lexical: BM25Index, query: str, top_n: int,
+                candidates: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+    """
+    Ruta rápida sin embeddings: devuelve los índices si el modo es "lexical" o si
+    la coincidencia léxica es decisiva; None si hace falta la búsqueda vectorial.
+    """
+    if Config.SEARCH_MODE == "vector":
+        return None
+    indices, scores = lexical.search(query, top_n + 1, candidates)
+    if Config.SEARCH_MODE == "lexical" or es_decisivo(scores, top_n):
+        search_stats["lexical"] += 1
+        return indices[:top_n]
+    return None
+
+
+def fusionar(vectors: VectorStore, lexical: BM25Index, query: str, q_emb, top_n: int,
+             candidates: Optional[np.ndarray] = None) -> np.ndarray:
+    """Reciprocal Rank Fusion de los rankings vectorial y BM25 (o solo vectorial en modo "vector")."""
+    if Config.SEARCH_MODE == "vector":
+        search_stats["vector"] += 1
+        return vectors.search(q_emb, top_n, candidates)[0]
+
+    pool = max(top_n * 10, 50)
+    fusion = defaultdict(float)
+    for ranking in (vectors.search(q_emb, pool, candidates)[0], lexical.search(query, pool, candidates)[0]):
+        for posicion, i in enumerate(ranking):
+            fusion[int(i)] += 1.0 / (RRF_K + posicion + 1)
+    search_stats["hybrid"] += 1
+    ordenados = sorted(fusion, key=fusion.get, reverse=True)
+    return np.asarray(ordenados[:top_n], dtype=np.intp)
+
+
+def _fallback_lexico(lexical: BM25Index, query: str, top_n: int,
+                     candidates: Optional[np.ndarray], error: Exception) -> np.ndarray:
+    print(f"API de embeddings no disponible ({error!r}), usando solo búsqueda léxica")
+    search_stats["lexical_fallback"] += 1
+    return lexical.search(query, top_n, candidates)[0]
+
+
+def buscar(vectors: VectorStore, lexical: BM25Index, query: str, top_n: int,
+           candidates: Optional[np.ndarray] = None) -> np.ndarray:
+    """Índices de los top_n resultados para la consulta (ruta síncrona)."""
+    indices = ruta_lexica(lexical, query, top_n, candidates)
+    if indices is not None:
+        return indices
+    try:
+        q_emb = embed_query(query)
+    except EMBEDDING_ERRORS as e:
+        return _fallback_lexico(lexical, query, top_n, candidates, e)
+    return fusionar(vectors, lexical, query, q_emb, top_n, candidates)
+
+
+async def abuscar(vectors: VectorStore, lexical: BM25Index, query: str, top_n: int,
+                  candidates: Optional[np.ndarray] = None) -> np.ndarray:
+    """Variante asíncrona de `buscar`."""
+    indices = ruta_lexica(lexical, query, top_n, candidates)
+    if indices is not None:
+        return indices
+    try:
+        q_emb = await aembed_query(query)
+    except EMBEDDING_ERRORS as e:
+        return _fallback_lexico(lexical, query, top_n, candidates, e)
+    return fusionar(vectors, lexical, query, q_emb, top_n, candidates)
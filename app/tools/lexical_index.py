@@ -0,0 +1,90 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .columnar_index import normalizar_valor
+from .vector_store import top_k
+
+STOPWORDS = {
+    "a", "al", "con", "de", "del", "el", "en", "es", "la", "las", "lo", "los",
+    "me", "mi", "o", "para", "por", "que", "se", "su", "un", "una", "y",
+}
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Tokens alfanuméricos sin tildes ni mayúsculas; "BZD672" -> ["bzd672"]."""
+    return [t for t in re.findall(r"[0-9a-z]+", normalizar_valor(texto)) if t not in STOPWORDS]
+
+
+def tokenizar_consulta(texto: str) -> List[str]:
+    """
+    Como `tokenizar`, pero además une pares letras+dígitos consecutivos para que
+    una placa escrita "BZD-672" o "BZD 672" coincida con "BZD672" del catálogo.
+    """
+    tokens = tokenizar(texto)
+    unidos = [
+        a + b for a, b in zip(tokens, tokens[1:])
+        if (a.isalpha() and b.isdigit()) or (a.isdigit() and b.isalpha())
+    ]
+    return tokens + unidos
+
+
+class BM25Index:
+    """
+    Índice invertido con ranking BM25 (Okapi), construido una vez al cargar el store.
+    Resuelve consultas con coincidencias exactas (placas, términos como "oblaje")
+    sin llamar a la API de embeddings.
+    """
+
+    def __init__(self, docs: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.num_docs = len(docs)
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        longitudes = np.zeros(self.num_docs, dtype=np.float32)
+        for doc_id, doc in enumerate(docs):
+            tokens = tokenizar(doc)
+            longitudes[doc_id] = len(tokens)
+            for token, tf in Counter(tokens).items():
+                postings[token].append((doc_id, tf))
+
+        promedio = float(longitudes.mean()) if self.num_docs else 0.0
+        # Denominador de BM25 que no depende de la consulta, precalculado por documento
+        self._norm = k1 * (1 - b + b * longitudes / promedio) if promedio else np.full(self.num_docs, k1)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.idf: Dict[str, float] = {}
+        for token, filas in postings.items():
+            ids = np.fromiter((d for d, _ in filas), dtype=np.intp, count=len(filas))
+            tfs = np.fromiter((tf for _, tf in filas), dtype=np.float32, count=len(filas))
+            self.postings[token] = (ids, tfs)
+            df = len(filas)
+            self.idf[token] = math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def scores(self, query: str) -> np.ndarray:
+        """Puntaje BM25 de la consulta para cada documento (0 si no comparte ningún término)."""
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for token in set(tokenizar_consulta(query)):
+            if token not in self.postings:
+                continue
+            ids, tfs = self.postings[token]
+            scores[ids] += self.idf[token] * tfs * (self.k1 + 1) / (tfs + self._norm[ids])
+        return scores
+
+    def search(self, query: str, top_n: int = 3,
+               candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(índices, puntajes) de los top_n documentos con puntaje > 0, de mayor a menor."""
+        scores = self.scores(query)
+        if candidates is not None:
+            scores = scores[candidates]
+        idx = top_k(scores, top_n)
+        idx = idx[scores[idx] > 0]
+        top_scores = scores[idx]
+        if candidates is not None:
+            idx = np.asarray(candidates)[idx]
+        return idx, top_scores
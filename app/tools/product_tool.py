@@ -1,66 +1,102 @@
 import pandas as pd
 from pathlib import Path
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from langchain.tools import tool
-from openai import OpenAI
-from ..config import Config
-import pickle
+from langchain_core.tools import StructuredTool
+from typing import Optional
+from .vector_store import VectorStore
+from .columnar_index import ColumnarIndex
+from .lexical_index import BM25Index
+from .rendering import prerender, render_product_row
+from .hybrid_search import abuscar, buscar
+from .embeddings import EMBEDDING_MODEL, embed_texts
+from .embedding_artifacts import cargar_o_construir
 
 # Ruta absoluta al archivo CSV
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 PRODUCT_FILE = BASE_DIR / 'data' / 'hackathon_data.csv'
-EMB_FILE = BASE_DIR / 'data' / 'product_embeddings.pkl'
+EMB_DIR = BASE_DIR / 'data'
 
-client = OpenAI(api_key=Config.OPENAI_API_KEY)
+# Columnas indexadas para pre-filtrar antes de puntuar por similitud
+FILTER_COLUMNS = ['marca', 'categoria', 'ubicacion', 'empresa_proveedora', 'tipo_subasta', 'tipo_moneda']
+RANGE_COLUMNS = ['anio', 'precio_base']
+
+SIN_RESULTADOS = "No se encontraron productos relacionados."
 
 class ProductStore:
-    _instance = None
+    """
+    Snapshot inmutable de los datos y embeddings. Para actualizarlo se construye
+    uno nuevo con reload_product_store(); las búsquedas en curso siguen usando el suyo.
+    """
+
+    def __init__(self):
+        self._load_data()
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(ProductStore, cls).__new__(cls)
-            cls._instance._load_data()
-        return cls._instance
-    
     def _load_data(self):
         self.product_df = pd.read_csv(PRODUCT_FILE, encoding='latin-1')
-        if EMB_FILE.exists():
-            with open(EMB_FILE, 'rb') as f:
-                self.product_embeddings = pickle.load(f)
-        else:
-            self.product_embeddings = self._generate_embeddings()
-            with open(EMB_FILE, 'wb') as f:
-                pickle.dump(self.product_embeddings, f)
+        # Matriz float32 normalizada en disco (mmap); solo se re-embeben las filas
+        # nuevas o modificadas respecto al manifiesto de hashes
+        matrix, self.version = cargar_o_construir(
+            EMB_DIR, 'product', self._embedding_texts(), EMBEDDING_MODEL, embed_texts
+        )
+        self.vectors = VectorStore(matrix, normalized=True)
+        self.index = ColumnarIndex(self.product_df, FILTER_COLUMNS, RANGE_COLUMNS)
+        self.lexical = BM25Index(
+            (self.product_df['title'].fillna('').astype(str) + ' ' +
+             self.product_df['placa'].fillna('').astype(str) + ' ' +
+             self.product_df['marca'].fillna('').astype(str) + ' ' +
+             self.product_df['modelo'].fillna('').astype(str)).tolist()
+        )
+        self.rendered = prerender(self.product_df, render_product_row)
 
-    def _generate_embeddings(self):
+    def _embedding_texts(self):
         texts = (
-            self.product_df['title'].astype(str) + ' ' +
-            self.product_df['marca'].astype(str) + ' ' +
-            self.product_df['modelo'].astype(str) + ' ' +
-            self.product_df['categoria'].astype(str) + ' ' +
-            self.product_df['ubicacion'].astype(str)
+            self.product_df['title'].fillna('').astype(str) + ' ' +
+            self.product_df['marca'].fillna('').astype(str) + ' ' +
+            self.product_df['modelo'].fillna('').astype(str) + ' ' +
+            self.product_df['categoria'].fillna('').astype(str) + ' ' +
+            self.product_df['ubicacion'].fillna('').astype(str)
         ).tolist()
-        embeddings = []
-        for chunk in range(0, len(texts), 100):
-            response = client.embeddings.create(
-                input=texts[chunk:chunk+100],
-                model="text-embedding-3-small"
-            )
-            embeddings.extend([e.embedding for e in response.data])
-        return embeddings
+        return texts
 
 product_store = ProductStore()
 
-@tool
-def search_product(query: str, top_n: int = 3) -> str:
+def reload_product_store() -> ProductStore:
+    """Construye un ProductStore nuevo (reutilizando los embeddings sin cambios) y lo publica de forma atómica."""
+    global product_store
+    nuevo = ProductStore()
+    product_store = nuevo
+    return nuevo
+
+def _search_product(
+    query: str,
+    top_n: int = 3,
+    marca: Optional[str] = None,
+    categoria: Optional[str] = None,
+    ubicacion: Optional[str] = None,
+    empresa_proveedora: Optional[str] = None,
+    tipo_subasta: Optional[str] = None,
+    tipo_moneda: Optional[str] = None,
+    anio_min: Optional[int] = None,
+    anio_max: Optional[int] = None,
+    precio_min: Optional[float] = None,
+    precio_max: Optional[float] = None,
+) -> str:
     """
-    Busca productos usando similitud semántica basada en una cadena de consulta.
-    Esta función usa embeddings para encontrar los productos más similares en la tienda
+    Busca productos usando similitud semántica y coincidencia de palabras (placa, marca, modelo).
+    Esta función usa embeddings y un índice BM25 para encontrar los productos más similares en la tienda
     basándose en la consulta del usuario. Devuelve información detallada sobre los productos más coincidentes.
     Args:
         query (str): La consulta de búsqueda que describe el/los producto(s) que el usuario está buscando.
         top_n (int, opcional): Número de productos similares a devolver. Por defecto es 3.
+        marca (str, opcional): Filtra por marca, por ejemplo "toyota".
+        categoria (str, opcional): Filtra por categoría, por ejemplo "Vehículos livianos" o "Maquinaria pesada".
+        ubicacion (str, opcional): Filtra por ubicación; acepta parte del nombre, por ejemplo "Lima" o "Trujillo".
+        empresa_proveedora (str, opcional): Filtra por empresa que vende el lote, por ejemplo "PACIFICO SEGUROS".
+        tipo_subasta (str, opcional): "En vivo", "Venta directa", "Sobre cerrado" o "Dinámica".
+        tipo_moneda (str, opcional): Moneda del precio base, "USD" o "PEN".
+        anio_min (int, opcional): Año mínimo del vehículo.
+        anio_max (int, opcional): Año máximo del vehículo.
+        precio_min (float, opcional): Precio base mínimo, en la moneda del lote.
+        precio_max (float, opcional): Precio base máximo, en la moneda del lote.
     Returns:
         str: Una cadena formateada que contiene detalles de los productos más coincidentes incluyendo
             ID, título, precio, ubicación, marca, modelo, placa, kilometraje, año, origen,
@@ -70,35 +106,81 @@ def search_product(query: str, top_n: int = 3) -> str:
         - Usa esta herramienta cuando el usuario quiera buscar vehículos o productos
         - Usa esta herramienta cuando el usuario pregunte sobre disponibilidad de artículos específicos
         - Usa esta herramienta cuando el usuario quiera comparar productos similares
+        - Usa los filtros cuando el usuario mencione marca, lugar, presupuesto o año
     """
-    q_emb = client.embeddings.create(
-        input=[query],
-        model="text-embedding-3-small"
-    ).data[0].embedding
+    store = product_store
+    candidates = _candidatos(
+        store, marca=marca, categoria=categoria, ubicacion=ubicacion,
+        empresa_proveedora=empresa_proveedora, tipo_subasta=tipo_subasta, tipo_moneda=tipo_moneda,
+        anio_min=anio_min, anio_max=anio_max, precio_min=precio_min, precio_max=precio_max,
+    )
+    if candidates is not None and len(candidates) == 0:
+        return SIN_RESULTADOS
+    indices = buscar(store.vectors, store.lexical, query, top_n, candidates)
+    return _formatear_resultados(store, indices)
 
-    sims = cosine_similarity(
-        [q_emb],
-        product_store.product_embeddings
-    ).flatten()
-    top_indices = sims.argsort()[-top_n:][::-1]
+async def _asearch_product(
+    query: str,
+    top_n: int = 3,
+    marca: Optional[str] = None,
+    categoria: Optional[str] = None,
+    ubicacion: Optional[str] = None,
+    empresa_proveedora: Optional[str] = None,
+    tipo_subasta: Optional[str] = None,
+    tipo_moneda: Optional[str] = None,
+    anio_min: Optional[int] = None,
+    anio_max: Optional[int] = None,
+    precio_min: Optional[float] = None,
+    precio_max: Optional[float] = None,
+) -> str:
+    """Variante asíncrona de search_product: usa el cliente AsyncOpenAI para no bloquear el event loop."""
+    store = product_store  # snapshot fijo durante toda la llamada
+    candidates = _candidatos(
+        store, marca=marca, categoria=categoria, ubicacion=ubicacion,
+        empresa_proveedora=empresa_proveedora, tipo_subasta=tipo_subasta, tipo_moneda=tipo_moneda,
+        anio_min=anio_min, anio_max=anio_max, precio_min=precio_min, precio_max=precio_max,
+    )
+    if candidates is not None and len(candidates) == 0:
+        return SIN_RESULTADOS
+    indices = await abuscar(store.vectors, store.lexical, query, top_n, candidates)
+    return _formatear_resultados(store, indices)
 
-    results = product_store.product_df.iloc[top_indices]
-    output = []
-    for _, row in results.iterrows():
-        output.append(
-            f"Title: {row['title']}\n"
-            f"Price: {row['precio_base']} {row['tipo_moneda']}\n"
-            f"Location: {row['ubicacion']}\n"
-            f"Brand: {row['marca']}\n"
-            f"Model: {row['modelo']}\n"
-            f"Plate: {row['placa']}\n"
-            f"Mileage: {row['kilometraje']} km\n"
-            f"Year: {row['anio']}\n"
-            f"Origin: {row['procedencia']}\n"
-            f"Warranty: {row['con_garantia']}\n"
-            f"Category: {row['categoria']}\n"
-            f"Auction Type: {row['tipo_subasta']}\n"
-            f"Provider: {row['empresa_proveedora']}"
-        )
+def _candidatos(
+    store: ProductStore,
+    *,
+    marca: Optional[str] = None,
+    categoria: Optional[str] = None,
+    ubicacion: Optional[str] = None,
+    empresa_proveedora: Optional[str] = None,
+    tipo_subasta: Optional[str] = None,
+    tipo_moneda: Optional[str] = None,
+    anio_min: Optional[int] = None,
+    anio_max: Optional[int] = None,
+    precio_min: Optional[float] = None,
+    precio_max: Optional[float] = None,
+):
+    """Filas que cumplen los filtros estructurados (None si no se pidió ninguno)."""
+    return store.index.candidatos(
+        categorias={
+            'marca': marca,
+            'categoria': categoria,
+            'ubicacion': ubicacion,
+            'empresa_proveedora': empresa_proveedora,
+            'tipo_subasta': tipo_subasta,
+            'tipo_moneda': tipo_moneda,
+        },
+        rangos={
+            'anio': (anio_min, anio_max),
+            'precio_base': (precio_min, precio_max),
+        },
+    )
+
+def _formatear_resultados(store: ProductStore, top_indices) -> str:
+    output = [store.rendered[i] for i in top_indices]
+    return "\n\n".join(output) if output else SIN_RESULTADOS
 
-    return "\n\n".join(output) if output else "No se encontraron productos relacionados."
+search_product = StructuredTool.from_function(
+    func=_search_product,
+    coroutine=_asearch_product,
+    name="search_product",
+)
@@ -0,0 +1,39 @@
+from typing import List
+
+import pandas as pd
+
+# Texto que ve el agente por cada fila. Se genera una sola vez al cargar el
+# store (y en cada recarga); las búsquedas solo unen los textos ya armados.
+
+
+def render_faq_row(row) -> str:
+    return (
+        f"Categoría: {row['Categoría']}\n"
+        f"Empresa: {row['Empresa']}\n"
+        f"Pregunta: {row['Pregunta']}\n"
+        f"Respuesta: {row['Respuesta']}"
+    )
+
+
+def render_product_row(row) -> str:
+    return (
+        f"Title: {row['title']}\n"
+        f"Price: {row['precio_base']} {row['tipo_moneda']}\n"
+        f"Location: {row['ubicacion']}\n"
+        f"Brand: {row['marca']}\n"
+        f"Model: {row['modelo']}\n"
+        f"Plate: {row['placa']}\n"
+        f"Mileage: {row['kilometraje']} km\n"
+        f"Year: {row['anio']}\n"
+        f"Origin: {row['procedencia']}\n"
+        f"Warranty: {row['con_garantia']}\n"
+        f"Category: {row['categoria']}\n"
+        f"Auction Type: {row['tipo_subasta']}\n"
+        f"Provider: {row['empresa_proveedora']}"
+    )
+
+
+def prerender(df: pd.DataFrame, render) -> List[str]:
+    # Se recorre con iterrows igual que antes para que el texto sea idéntico
+    # (mismos tipos por celda que veía el formateo por consulta).
+    return [render(row) for _, row in df.iterrows()]
@@ -0,0 +1,79 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def normalizar_filas(matrix: np.ndarray) -> np.ndarray:
+    """Devuelve una copia float32 contigua con cada fila de norma 1 (las filas nulas quedan en cero)."""
+    matrix = np.array(matrix, dtype=np.float32, copy=True, order="C")
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Índices de los k mayores valores de cada fila, ordenados de mayor a menor.
+    Usa argpartition (O(n)) y solo ordena los k seleccionados.
+    """
+    n = scores.shape[-1]
+    k = max(0, min(k, n))
+    if k == 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    if k < n:
+        idx = np.argpartition(scores, n - k, axis=-1)[..., n - k:]
+    else:
+        idx = np.broadcast_to(np.arange(n), scores.shape).copy()
+    orden = np.argsort(-np.take_along_axis(scores, idx, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(idx, orden, axis=-1)
+
+
+class VectorStore:
+    """
+    Índice vectorial en memoria: una matriz float32 contigua con las filas ya
+    normalizadas, de modo que la similitud coseno de una consulta es un único
+    producto punto contra todo el corpus.
+    """
+
+    def __init__(self, embeddings, normalized: bool = False):
+        if normalized:
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            if matrix.ndim == 1:
+                matrix = matrix.reshape(1, -1)
+        else:
+            matrix = normalizar_filas(embeddings)
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def scores(self, queries, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """Similitud coseno de una o varias consultas contra el corpus (o solo las filas `candidates`)."""
+        matrix = self.matrix if candidates is None else self.matrix[candidates]
+        return normalizar_filas(queries) @ matrix.T
+
+    def search(self, query, top_n: int = 3,
+               candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Devuelve (índices, similitudes) de las top_n filas más cercanas a la consulta.
+        Con `candidates` solo se puntúan esas filas; los índices siguen siendo del corpus completo.
+        """
+        indices, sims = self.search_batch([query], top_n, candidates)
+        return indices[0], sims[0]
+
+    def search_batch(self, queries, top_n: int = 3,
+                     candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Igual que `search` pero para un lote de consultas de una sola vez (una fila por consulta)."""
+        sims = self.scores(queries, candidates)
+        idx = top_k(sims, top_n)
+        top_sims = np.take_along_axis(sims, idx, axis=-1)
+        if candidates is not None:
+            idx = np.asarray(candidates)[idx]
+        return idx, top_sims
@@ -0,0 +1,113 @@
+"""
+Benchmark de la featurización de mensajes: funciones por mensaje de
+data/test_message.py (≈50 búsquedas `in` por texto, aplicadas con `apply`)
+contra `featurizar` (un solo regex compilado + operaciones vectorizadas).
+Comprueba además que ambas salidas sean idénticas.
+
+Uso:
+    python benchmarks/bench_features.py [n_mensajes]   # por defecto 1.000.000
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.ml.features import PALABRAS_CLAVE, PALABRAS_NEGATIVAS, PALABRAS_POSITIVAS, featurizar  # noqa: E402
+
+DATA = Path(__file__).resolve().parent.parent / "data"
+MUESTRA_REFERENCIA = 100_000
+VERIFICAR = 20_000
+
+
+# Implementación anterior (data/test_message.py), copiada tal cual como referencia
+def calcular_sentimiento_anterior(texto):
+    texto_clean = texto.lower()
+    count_pos = sum(1 for palabra in PALABRAS_POSITIVAS if palabra in texto_clean)
+    count_neg = sum(1 for palabra in PALABRAS_NEGATIVAS if palabra in texto_clean)
+    if count_pos > count_neg and count_pos > 0:
+        return "positivo"
+    elif count_neg > count_pos and count_neg > 0:
+        return "negativo"
+    elif "?" in texto:
+        return "neutro"
+    elif any(palabra in texto_clean for palabra in ["solo", "tal vez", "aún", "todavía"]):
+        return "negativo"
+    elif any(palabra in texto_clean for palabra in ["confirmar", "listo", "completado", "participar"]):
+        return "positivo"
+    else:
+        return "neutro"
+
+
+def extraer_palabras_clave_anterior(texto):
+    texto_lower = texto.lower()
+    return [p for p in PALABRAS_CLAVE if p in texto_lower]
+
+
+def featurizar_anterior(serie: pd.Series) -> pd.DataFrame:
+    sent_map = {"positivo": 1, "neutro": 0, "negativo": -1}
+    df = pd.DataFrame({"mensaje": serie})
+    df["sentimiento"] = df["mensaje"].apply(calcular_sentimiento_anterior)
+    df["palabras_clave"] = df["mensaje"].apply(extraer_palabras_clave_anterior)
+    df["num_palabras"] = df["mensaje"].apply(lambda m: len(m.split()))
+    df["num_preguntas"] = df["mensaje"].apply(lambda m: m.count("?"))
+    df["longitud"] = df["mensaje"].apply(len)
+    df["sentimiento_num"] = df["sentimiento"].map(sent_map)
+    df["num_keywords"] = df["palabras_clave"].apply(len)
+    return df.drop(columns="mensaje")
+
+
+def mensajes_sinteticos(n: int, rng: np.random.Generator) -> pd.Series:
+    """Mensajes reales del dataset mezclados con frases de las listas y relleno."""
+    reales = [m["mensaje"] for m in json.loads((DATA / "dataset_mensajes.json").read_text(encoding="utf-8"))]
+    piezas = np.array(reales + PALABRAS_POSITIVAS + PALABRAS_NEGATIVAS + PALABRAS_CLAVE
+                      + ["hola", "buenas tardes", "¿", "?", "gracias", "el", "de", "Aún", "SOLO"], dtype=object)
+    largos = rng.integers(1, 6, size=n)
+    indices = rng.integers(0, len(piezas), size=int(largos.sum()))
+    cortes = np.cumsum(largos)[:-1]
+    return pd.Series([" ".join(p) for p in np.split(piezas[indices], cortes)])
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(42)
+    serie = mensajes_sinteticos(n, rng)
+    print(f"{n:,} mensajes sintéticos (largo medio {serie.str.len().mean():.0f} caracteres)")
+
+    columnas = ["num_palabras", "num_preguntas", "longitud", "sentimiento_num", "num_keywords",
+                "sentimiento", "palabras_clave"]
+    muestra = serie.iloc[:VERIFICAR]
+    esperado = featurizar_anterior(muestra)[columnas]
+    obtenido = featurizar(muestra)[columnas]
+    for c in columnas:
+        assert esperado[c].tolist() == obtenido[c].tolist(), f"difiere la columna {c}"
+    print(f"salida idéntica en {VERIFICAR:,} mensajes")
+
+    # La ruta anterior se mide sobre una muestra y se extrapola: con 1M tarda minutos
+    referencia = serie.iloc[:min(n, MUESTRA_REFERENCIA)]
+    inicio = time.perf_counter()
+    featurizar_anterior(referencia)
+    anterior = (time.perf_counter() - inicio) / len(referencia) * n
+
+    inicio = time.perf_counter()
+    featurizar(serie)
+    nuevo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    featurizar(serie, listas=False)
+    numericas = time.perf_counter() - inicio
+
+    print(f"{'ruta':>28} | {'total (s)':>9} | {'µs/msg':>7}")
+    print("-" * 52)
+    print(f"{'apply por mensaje (estim.)':>28} | {anterior:>9.2f} | {anterior / n * 1e6:>7.2f}")
+    print(f"{'featurizar':>28} | {nuevo:>9.2f} | {nuevo / n * 1e6:>7.2f}")
+    print(f"{'featurizar(listas=False)':>28} | {numericas:>9.2f} | {numericas / n * 1e6:>7.2f}")
+    print(f"aceleración: x{anterior / nuevo:.1f} (x{anterior / numericas:.1f} solo numéricas)")
+
+
+if __name__ == "__main__":
+    main()
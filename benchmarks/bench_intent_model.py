@@ -0,0 +1,104 @@
+"""
+Benchmark del modelo de intención: XGBClassifier cargado con joblib contra
+`TreeEnsemble` (árboles exportados a data/models/modelo_mensajes.npz,
+evaluados con NumPy). Mide el tiempo y la memoria de carga (import +
+modelo, cada uno en un proceso nuevo; la memoria se lee de /proc, Linux),
+la latencia por lote y comprueba que las probabilidades coincidan con las
+de xgboost.
+
+Uso:
+    python benchmarks/bench_intent_model.py
+"""
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(RAIZ / "benchmarks"))
+
+from app.ml.features import features_numericas  # noqa: E402
+from app.ml.tree_ensemble import ARCHIVO, MODELS_DIR, TreeEnsemble  # noqa: E402
+from bench_features import mensajes_sinteticos  # noqa: E402
+
+LOTES = [1, 16, 256, 4096, 50_000]
+TOLERANCIA = 1e-5
+
+# numpy ya está cargado en la API (pandas): se importa antes de medir en ambos casos.
+# Memoria: RSS actual (/proc/self/statm, Linux) antes y después de cargar.
+CARGA = """
+import json, os, sys, time
+import numpy
+sys.path.insert(0, {raiz!r})
+rss = lambda: int(open("/proc/self/statm").read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+antes = rss()
+inicio = time.perf_counter()
+{codigo}
+print(json.dumps({{"segundos": time.perf_counter() - inicio, "mib": (rss() - antes) / 2 ** 20}}))
+"""
+CARGA_XGBOOST = f"""
+import joblib
+joblib.load({str(MODELS_DIR / "modelo_mensajes.joblib")!r})
+joblib.load({str(MODELS_DIR / "scaler_msg.joblib")!r})
+joblib.load({str(MODELS_DIR / "label_encoder_msg.joblib")!r})
+"""
+CARGA_NUMPY = f"""
+from app.ml.tree_ensemble import TreeEnsemble
+TreeEnsemble.load({str(MODELS_DIR / ARCHIVO)!r})
+"""
+
+
+def medir_carga(codigo: str, repeticiones: int = 3) -> dict:
+    """Mejor de varias cargas en procesos nuevos (la primera paga el disco frío)."""
+    resultados = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-W", "ignore", "-c", CARGA.format(raiz=str(RAIZ), codigo=codigo)],
+                                capture_output=True, text=True, check=True).stdout
+        resultados.append(json.loads(salida.strip().splitlines()[-1]))
+    return min(resultados, key=lambda r: r["segundos"])
+
+
+def latencia(predict_proba, X: np.ndarray) -> float:
+    predict_proba(X)
+    repeticiones = max(3, 2000 // len(X)) if len(X) < 4096 else 3
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        predict_proba(X)
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def main():
+    import joblib
+
+    carga_xgb = medir_carga(CARGA_XGBOOST)
+    carga_np = medir_carga(CARGA_NUMPY)
+    print(f"{'carga (import + modelo)':>24} | {'tiempo (ms)':>11} | {'memoria (MiB)':>13}")
+    print("-" * 56)
+    print(f"{'joblib + xgboost':>24} | {carga_xgb['segundos'] * 1e3:>11.1f} | {carga_xgb['mib']:>13.1f}")
+    print(f"{'TreeEnsemble (.npz)':>24} | {carga_np['segundos'] * 1e3:>11.1f} | {carga_np['mib']:>13.1f}")
+
+    modelo = joblib.load(MODELS_DIR / "modelo_mensajes.joblib")
+    ensamble = TreeEnsemble.load(MODELS_DIR / ARCHIVO)
+    textos = mensajes_sinteticos(max(LOTES), np.random.default_rng(3)).tolist()
+    X = (features_numericas(textos) - ensamble.media) / ensamble.escala
+
+    esperado, obtenido = modelo.predict_proba(X), ensamble.predict_proba(X)
+    diferencia = np.abs(esperado - obtenido).max()
+    assert diferencia < TOLERANCIA, f"las probabilidades difieren en {diferencia:.2e}"
+    assert (esperado.argmax(axis=1) == obtenido.argmax(axis=1)).all()
+    print(f"\nprobabilidades iguales en {len(X):,} mensajes (diferencia máxima {diferencia:.1e}), mismas etiquetas")
+
+    print(f"\n{'filas por lote':>14} | {'xgboost (ms)':>12} | {'numpy (ms)':>10} | {'µs/fila numpy':>13}")
+    print("-" * 60)
+    for n in LOTES:
+        t_xgb = latencia(modelo.predict_proba, X[:n])
+        t_np = latencia(ensamble.predict_proba, X[:n])
+        print(f"{n:>14,} | {t_xgb * 1e3:>12.3f} | {t_np * 1e3:>10.3f} | {t_np / n * 1e6:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark del puntaje de leads en lote: carga completa (toda la tabla en
+un DataFrame, como hacía data/train_lead_score.py) contra
+`pipeline_scoring` (páginas por keyset + sumas parciales + upserts masivos)
+sobre una tabla local de mensajes sintéticos (del cliente y del asistente).
+Mide tiempo y pico de memoria (tracemalloc) de cada ruta, comprueba que los
+puntajes sean iguales y que el modo --since recalcule solo los leads con
+mensajes nuevos.
+
+Uso:
+    python benchmarks/bench_lead_pipeline.py [n_mensajes] [n_leads]   # por defecto 300.000 y 20.000
+"""
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app.ml.lead_pipeline import COL_LEAD, EMISOR_LEAD, TablaLocal, pipeline_scoring, preparar_mensajes  # noqa: E402
+from app.ml.lead_scoring import construir_dataset_leads, puntuar_leads  # noqa: E402
+from bench_features import mensajes_sinteticos  # noqa: E402
+
+COLUMNAS = ["lead_id", "num_mensajes_total", "num_preguntas_total", "mencion_presupuesto",
+            "score_promedio_msg", "sentimiento_promedio", "score_total", "label_pred"]
+TOLERANCIA = 0.001  # sumas en otro orden pueden mover el redondeo de score_total (como en LeadScorer.reconciliar)
+
+
+def tabla_sintetica(n: int, n_leads: int, rng: np.random.Generator) -> list:
+    """Filas de `mensajes` (dos de cada tres del cliente), un mensaje por minuto."""
+    textos = mensajes_sinteticos(n, rng).tolist()
+    leads = rng.integers(0, n_leads, size=n)
+    emisores = rng.choice(np.array(["user", "user", "assistant"]), size=n)
+    inicio = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [{
+        "id": i + 1,
+        "numero_whatsapp": f"5215500{int(leads[i]):06d}",
+        "tipo_emisor": str(emisores[i]),
+        "contenido": textos[i],
+        "fecha_creacion": (inicio + timedelta(minutes=i)).isoformat(),
+    } for i in range(n)]
+
+
+def carga_completa(filas: list) -> pd.DataFrame:
+    return puntuar_leads(construir_dataset_leads(preparar_mensajes([r for r in filas if r["tipo_emisor"] == EMISOR_LEAD])))
+
+
+def medir(funcion, *args, **kwargs):
+    """Tiempo y pico de memoria en dos ejecuciones (tracemalloc hace más lento el código con muchos objetos)."""
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    segundos = time.perf_counter() - inicio
+    tracemalloc.start()
+    funcion(*args, **kwargs)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return resultado, segundos, pico / 2 ** 20
+
+
+def ordenar(df: pd.DataFrame) -> pd.DataFrame:
+    return df[COLUMNAS].sort_values("lead_id").reset_index(drop=True)
+
+
+def comparar(esperado: pd.DataFrame, obtenido: pd.DataFrame) -> None:
+    esperado, obtenido = ordenar(esperado), ordenar(obtenido)
+    puntaje = ["score_total", "label_pred"]
+    pd.testing.assert_frame_equal(esperado.drop(columns=puntaje), obtenido.drop(columns=puntaje), check_exact=False)
+    diferencia = (esperado["score_total"] - obtenido["score_total"]).abs()
+    assert diferencia.max() <= TOLERANCIA + 1e-9, f"score_total difiere en {diferencia.max()}"
+    mismo = diferencia == 0
+    assert (esperado["label_pred"] == obtenido["label_pred"])[mismo].all()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    n_leads = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    filas = tabla_sintetica(n, n_leads, np.random.default_rng(7))
+    print(f"{n:,} mensajes sintéticos de {n_leads:,} leads")
+
+    esperado, t_completa, m_completa = medir(carga_completa, filas)
+    resultados = [("carga completa", t_completa, m_completa)]
+    for pagina in (1000, 5000):
+        tabla = TablaLocal(filas)
+        obtenido, segundos, pico = medir(pipeline_scoring, tabla, pagina=pagina)
+        comparar(esperado, obtenido)
+        assert len(tabla.leads_scores) == len(esperado)
+        resultados.append((f"por páginas de {pagina}", segundos, pico))
+    print(f"mismos puntajes, ±{TOLERANCIA} ({len(esperado):,} leads, escritos en upserts de hasta 500 filas)")
+
+    # --since: solo los leads con mensajes en el último 2 % de la tabla, con todo su historial
+    desde = filas[int(n * 0.98)]["fecha_creacion"]
+    tabla = TablaLocal(filas)
+    incremental, t_inc, m_inc = medir(pipeline_scoring, tabla, desde=desde)
+    nuevos = sorted({r[COL_LEAD] for r in filas if r["tipo_emisor"] == EMISOR_LEAD and r["fecha_creacion"] > desde})
+    assert sorted(incremental["lead_id"]) == nuevos == sorted(tabla.leads_scores)
+    comparar(esperado[esperado["lead_id"].isin(nuevos)], incremental)
+    resultados.append((f"--since ({len(nuevos):,} leads)", t_inc, m_inc))
+    print("--since: mismos puntajes que la carga completa para los leads con mensajes nuevos")
+
+    print(f"{'ruta':>28} | {'tiempo (s)':>10} | {'pico (MiB)':>10}")
+    print("-" * 56)
+    for nombre, segundos, pico in resultados:
+        print(f"{nombre:>28} | {segundos:>10.2f} | {pico:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
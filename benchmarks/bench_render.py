@@ -0,0 +1,67 @@
+"""
+Micro-benchmark del formateo de resultados: ruta anterior (iloc + iterrows +
+f-string por consulta) contra el texto pre-renderizado al cargar el store.
+Comprueba además que ambas salidas sean idénticas byte a byte.
+
+Uso:
+    python benchmarks/bench_render.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.tools.rendering import prerender, render_faq_row, render_product_row  # noqa: E402
+
+DATA = Path(__file__).resolve().parent.parent / "data"
+TOP_N = 3
+CONSULTAS = 2000
+
+
+def formatear_anterior(df: pd.DataFrame, render, indices) -> str:
+    output = []
+    for _, row in df.iloc[indices].iterrows():
+        output.append(render(row))
+    return "\n\n".join(output)
+
+
+def formatear_prerenderizado(rendered, indices) -> str:
+    return "\n\n".join([rendered[i] for i in indices])
+
+
+def medir(fn, lotes) -> float:
+    fn(lotes[0])  # calentamiento
+    inicio = time.perf_counter()
+    for indices in lotes:
+        fn(indices)
+    return (time.perf_counter() - inicio) / len(lotes) * 1e6
+
+
+def main():
+    rng = np.random.default_rng(42)
+    catalogos = [
+        ("faq", pd.read_csv(DATA / "faqs.csv"), render_faq_row),
+        ("product", pd.read_csv(DATA / "hackathon_data.csv", encoding="latin-1"), render_product_row),
+    ]
+    print(f"{'store':>8} | {'filas':>6} | {'carga (ms)':>10} | {'anterior (µs)':>13} | {'pre-render (µs)':>15} | {'x':>6}")
+    print("-" * 74)
+    for nombre, df, render in catalogos:
+        inicio = time.perf_counter()
+        rendered = prerender(df, render)
+        carga = (time.perf_counter() - inicio) * 1000
+
+        lotes = [rng.choice(len(df), TOP_N, replace=False) for _ in range(CONSULTAS)]
+        for indices in lotes[:200]:
+            assert formatear_anterior(df, render, indices) == formatear_prerenderizado(rendered, indices)
+
+        anterior = medir(lambda i: formatear_anterior(df, render, i), lotes)
+        nuevo = medir(lambda i: formatear_prerenderizado(rendered, i), lotes)
+        print(f"{nombre:>8} | {len(df):>6} | {carga:>10.1f} | {anterior:>13.1f} | {nuevo:>15.2f} | {anterior / nuevo:>6.0f}")
+
+
+if __name__ == "__main__":
+    main()
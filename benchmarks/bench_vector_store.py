@@ -0,0 +1,65 @@
+"""
+Micro-benchmark de la búsqueda vectorial: ruta anterior (lista de listas +
+cosine_similarity de sklearn + argsort completo) contra VectorStore (matriz
+float32 pre-normalizada + producto punto + argpartition).
+
+Uso:
+    python benchmarks/bench_vector_store.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.tools.vector_store import VectorStore  # noqa: E402
+
+DIM = 1536  # text-embedding-3-small
+TOP_N = 3
+TAMANOS = [300, 10_000, 100_000]
+BATCH = 32
+
+
+def medir(fn, repeticiones: int) -> float:
+    fn()  # calentamiento
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        fn()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"{'filas':>8} | {'anterior (ms)':>13} | {'VectorStore (ms)':>16} | {'x':>6} | {'lote de ' + str(BATCH) + ' (ms/consulta)':>26}")
+    print("-" * 82)
+    for n in TAMANOS:
+        corpus = rng.standard_normal((n, DIM), dtype=np.float32)
+        # Formato del pickle actual. A 100k filas la lista de listas ocupa varios GB,
+        # así que ahí la ruta anterior recibe un ndarray (sigue renormalizando todo el corpus).
+        corpus_listas = corpus.tolist() if n <= 10_000 else corpus.astype(np.float64)
+        consultas = rng.standard_normal((BATCH, DIM), dtype=np.float32)
+        q = consultas[0].tolist()
+        repeticiones = 20 if n <= 10_000 else 3
+
+        def anterior():
+            sims = cosine_similarity([q], corpus_listas).flatten()
+            return sims.argsort()[-TOP_N:][::-1]
+
+        store = VectorStore(corpus)
+
+        def nuevo():
+            return store.search(q, TOP_N)[0]
+
+        assert list(anterior()) == list(nuevo()), "los resultados no coinciden"
+
+        t_ant = medir(anterior, repeticiones)
+        t_new = medir(nuevo, repeticiones * 5)
+        t_lote = medir(lambda: store.search_batch(consultas, TOP_N), repeticiones) / BATCH
+        print(f"{n:>8} | {t_ant:>13.2f} | {t_new:>16.3f} | {t_ant / t_new:>6.0f} | {t_lote:>26.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,11 @@
-import json
-import pandas as pd
 import joblib
 import os
 import sys
 
-def calcular_sentimiento(texto):
-    texto_clean = texto.lower()
-    
-    palabras_positivas = ["confirmar", "confirmen", "listo", "completado", "realizado", "realicé", 
-                         "deseo", "quiero", "interesado", "participar", "ofertar", "he completado",
-                         "he realizado", "ya pagué", "ya hice", "ya envié", "ya completé",
-                         "estoy listo", "necesito confirmar", "deseo participar"]
-    
-    palabras_negativas = ["aún no", "todavía no", "no estoy", "no tengo", "no puedo", 
-                         "no quiero", "no me interesa", "cancelar", "desistir", "no estoy seguro",
-                         "no he decidido", "no tengo claro", "tal vez", "solo estoy", "solo quería"]
-    
-    count_pos = sum(1 for palabra in palabras_positivas if palabra in texto_clean)
-    count_neg = sum(1 for palabra in palabras_negativas if palabra in texto_clean)
-    
-    if count_pos > count_neg and count_pos > 0:
-        return "positivo"
-    elif count_neg > count_pos and count_neg > 0:
-        return "negativo"
-    elif "?" in texto:
-        return "neutro"
-    elif any(palabra in texto_clean for palabra in ["solo", "tal vez", "aún", "todavía"]):
-        return "negativo"
-    elif any(palabra in texto_clean for palabra in ["confirmar", "listo", "completado", "participar"]):
-        return "positivo"
-    else:
-        return "neutro"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
-def extraer_palabras_clave(texto):
-    """Extrae palabras clave del texto"""
-    PALABRAS_CLAVE = [
-        "pago", "garantía", "voucher", "transferencia", "depósito", "confirmar",
-        "subasta", "lote", "ofertar", "participar", "registro", "financiamiento",
-        "plataforma", "asesor", "precio", "resultado", "comprobante", "visita"
-    ]
-    
-    texto_lower = texto.lower()
-    palabras_encontradas = [p for p in PALABRAS_CLAVE if p in texto_lower]
-    return palabras_encontradas
-
-def preprocesar_mensaje(mensaje):
-    """Preprocesa un mensaje para el modelo"""
-    sent_map = {'positivo': 1, 'neutro': 0, 'negativo': -1}
-    
-    sentimiento = calcular_sentimiento(mensaje)
-    num_palabras = len(mensaje.split())
-    num_preguntas = mensaje.count("?")
-    longitud = len(mensaje)
-    palabras_clave = extraer_palabras_clave(mensaje)
-    num_keywords = len(palabras_clave)
-    sentimiento_num = sent_map.get(sentimiento, 0)
-    
-    return {
-        'num_palabras': num_palabras,
-        'num_preguntas': num_preguntas,
-        'longitud': longitud,
-        'sentimiento_num': sentimiento_num,
-        'num_keywords': num_keywords,
-        'sentimiento': sentimiento,
-        'palabras_clave': palabras_clave
-    }
+# Mismas features que usa la API (app/ml/features.py)
+from app.ml.features import preprocesar_mensaje  # noqa: E402
 
 def predecir_intencion(mensaje, model_path='models/modelo_mensajes.joblib', 
                        scaler_path='models/scaler_msg.joblib',
@@ -9,6 +9,11 @@ import xgboost as xgb
 from xgboost import XGBClassifier
 import joblib
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.ml.features import SENT_MAP, completar_features  # noqa: E402
+from app.ml.tree_ensemble import ARCHIVO, exportar_xgboost  # noqa: E402
 
 print("=" * 60)
 print("🚀 ENTRENAMIENTO DEL MODELO DE CLASIFICACIÓN DE INTENCIÓN")
@@ -35,12 +40,18 @@ print(f"✓ DataFrame creado: {df_msg.shape[0]} filas x {df_msg.shape[1]} column
 # 3. Preprocesamiento
 print("\n🔧 Preprocesando datos...")
 
+# Features que el dataset no trae anotadas: se calculan en bloque, igual que en la API
+anotadas = set(df_msg.columns)
+df_msg = completar_features(df_msg)
+calculadas = [c for c in ('sentimiento', 'num_palabras', 'num_preguntas', 'longitud', 'palabras_clave') if c not in anotadas]
+if calculadas:
+    print(f"✓ Features calculadas desde el texto: {calculadas}")
+
 # Convertir sentimiento a valor numérico
-sent_map = {'positivo': 1, 'neutro': 0, 'negativo': -1}
-df_msg['sentimiento_num'] = df_msg['sentimiento'].map(sent_map)
+df_msg['sentimiento_num'] = df_msg['sentimiento'].map(SENT_MAP)
 
 # Contar número de palabras clave
-df_msg['num_keywords'] = df_msg['palabras_clave'].apply(len)
+df_msg['num_keywords'] = df_msg['palabras_clave'].str.len()
 
 print(f"✓ Sentimiento convertido a numérico")
 print(f"✓ Número de palabras clave calculado")
@@ -186,6 +197,11 @@ print(f"✓ Modelo guardado en: {model_path}")
 print(f"✓ LabelEncoder guardado en: {le_path}")
 print(f"✓ StandardScaler guardado en: {scaler_path}")
 
+# Versión en arreglos de NumPy que carga la API (sin xgboost)
+npz_path = os.path.join(models_dir, ARCHIVO)
+exportar_xgboost(model, scaler, le, features).save(npz_path)
+print(f"✓ Árboles exportados para la API en: {npz_path}")
+
 # 14. Guardar información adicional
 info = {
     'features': features,
@@ -0,0 +1,62 @@
+-- Puntaje de leads actualizado con cada mensaje entrante.
+--
+-- `leads_scores` ya la escribía data/train_lead_score.py; aquí se crea si no
+-- existe y se le agregan las sumas corrientes con las que la API actualiza
+-- el puntaje de un lead en O(1) por mensaje (app/services/lead_scorer.py).
+--
+-- lead_id es el numero_whatsapp del lead. Si la tabla tiene puntajes del
+-- script en lote anterior (por mensajes.lead_id y con las etiquetas guardadas
+-- en `mensajes`), aplicar también sql/migracion_leads_scores_wa_id.sql.
+--
+-- Aplicar una vez en el SQL editor de Supabase y luego calcular las sumas
+-- de los leads existentes con:  python -m app.reconciliar_leads --aplicar
+
+create table if not exists public.leads_scores (
+    lead_id               text primary key,  -- numero_whatsapp (wa_id) del lead
+    score_total           double precision,
+    categoria             text,
+    score_promedio_msg    double precision,
+    sentimiento_promedio  double precision
+);
+
+alter table public.leads_scores
+    add column if not exists num_mensajes_total    integer,
+    add column if not exists num_preguntas_total   integer,
+    add column if not exists mencion_presupuesto   integer,
+    add column if not exists suma_score_ponderado  double precision,
+    add column if not exists suma_sentimiento      double precision,
+    add column if not exists fecha_actualizacion   timestamptz;
+
+
+-- Suma atómica de un mensaje a los agregados del lead ------------------------
+-- La API llama a esta función por cada mensaje entrante (POST /rest/v1/rpc/...).
+-- El incremento se hace en la base, así dos workers que puntúan al mismo lead
+-- a la vez no se pisan. Devuelve la fila con las sumas nuevas; score_total y
+-- categoria siguen siendo los anteriores (los calcula la API con la fórmula
+-- de app/ml/lead_scoring.py y los guarda solo si nadie sumó otro mensaje entre
+-- medio).
+
+create or replace function public.sumar_mensaje_lead(
+    p_lead_id          text,
+    p_num_preguntas    integer,
+    p_score_ponderado  double precision,
+    p_sentimiento      double precision,
+    p_presupuesto      integer
+)
+returns setof public.leads_scores
+language sql
+as $$
+    insert into public.leads_scores as l
+        (lead_id, num_mensajes_total, num_preguntas_total, suma_score_ponderado,
+         suma_sentimiento, mencion_presupuesto, fecha_actualizacion)
+    values
+        (p_lead_id, 1, p_num_preguntas, p_score_ponderado, p_sentimiento, p_presupuesto, now())
+    on conflict (lead_id) do update set
+        num_mensajes_total   = coalesce(l.num_mensajes_total, 0) + 1,
+        num_preguntas_total  = coalesce(l.num_preguntas_total, 0) + excluded.num_preguntas_total,
+        suma_score_ponderado = coalesce(l.suma_score_ponderado, 0) + excluded.suma_score_ponderado,
+        suma_sentimiento     = coalesce(l.suma_sentimiento, 0) + excluded.suma_sentimiento,
+        mencion_presupuesto  = greatest(coalesce(l.mencion_presupuesto, 0), excluded.mencion_presupuesto),
+        fecha_actualizacion  = now()
+    returning l.*;
+$$;
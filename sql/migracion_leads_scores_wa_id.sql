@@ -0,0 +1,30 @@
+-- Migración de leads_scores: lead_id pasa a ser el numero_whatsapp (wa_id).
+--
+-- Antes, data/train_lead_score.py agrupaba por mensajes.lead_id, contaba
+-- todas las filas de `mensajes` y usaba las columnas label_intencion /
+-- score_msg guardadas en la tabla. Ahora el script en lote, la
+-- reconciliación y el scorer en tiempo real cuentan igual: solo los mensajes
+-- del cliente (tipo_emisor = 'user'), agrupados por numero_whatsapp y con la
+-- intención que el clasificador (data/models) calcula sobre el texto. Así las
+-- sumas que escribe el lote son las mismas que el scorer sigue incrementando.
+--
+-- Las filas con la clave anterior no corresponden a ningún wa_id: se copian a
+-- leads_scores_clave_anterior y se borran de leads_scores. Aplicar una vez,
+-- después de sql/leads_scores.sql, y luego recalcular todos los puntajes con
+-- la nueva definición:  python -m app.reconciliar_leads --aplicar
+
+create table if not exists public.leads_scores_clave_anterior
+    (like public.leads_scores including all);
+
+with anteriores as (
+    delete from public.leads_scores s
+     where not exists (
+            select 1
+              from public.mensajes m
+             where m.numero_whatsapp = s.lead_id
+           )
+ returning s.*
+)
+insert into public.leads_scores_clave_anterior
+select * from anteriores
+on conflict (lead_id) do nothing;
@@ -0,0 +1,141 @@
+-- Resumen por conversación para /frontend/conversaciones.
+--
+-- Una fila por número de WhatsApp, mantenida por triggers al insertar en
+-- `mensajes` (incluye los inserts en lote) y al crear/editar un lead en
+-- `clientes_potenciales`. El endpoint la lee directamente, sin agrupar
+-- mensajes en Python.
+--
+-- Aplicar una vez en el SQL editor de Supabase y luego cargar los datos
+-- existentes con:  python -m app.backfill_resumen
+
+create table if not exists public.resumen_conversaciones (
+    numero_whatsapp       text primary key,
+    ultimo_mensaje        text,
+    tipo_emisor_ultimo    text,
+    fecha_ultimo_mensaje  timestamptz not null,
+    total_mensajes        integer not null default 0,
+    no_leidos             integer not null default 0,
+    fecha_ultima_lectura  timestamptz,
+    nombre_lead           text,
+    nivel_interes         text
+);
+
+create index if not exists resumen_conversaciones_fecha_idx
+    on public.resumen_conversaciones (fecha_ultimo_mensaje desc, numero_whatsapp desc);
+
+create index if not exists clientes_potenciales_telefono_idx
+    on public.clientes_potenciales (telefono);
+
+
+-- Cada mensaje nuevo actualiza el resumen de su conversación --------------
+
+create or replace function public.actualizar_resumen_conversacion()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.resumen_conversaciones as r (
+        numero_whatsapp, ultimo_mensaje, tipo_emisor_ultimo,
+        fecha_ultimo_mensaje, total_mensajes, no_leidos
+    )
+    values (
+        new.numero_whatsapp, new.contenido, new.tipo_emisor,
+        coalesce(new.fecha_creacion, now()), 1,
+        case when new.tipo_emisor = 'user' then 1 else 0 end
+    )
+    on conflict (numero_whatsapp) do update set
+        -- un insert en lote puede traer filas fuera de orden
+        ultimo_mensaje = case when excluded.fecha_ultimo_mensaje >= r.fecha_ultimo_mensaje
+                              then excluded.ultimo_mensaje else r.ultimo_mensaje end,
+        tipo_emisor_ultimo = case when excluded.fecha_ultimo_mensaje >= r.fecha_ultimo_mensaje
+                                  then excluded.tipo_emisor_ultimo else r.tipo_emisor_ultimo end,
+        fecha_ultimo_mensaje = greatest(r.fecha_ultimo_mensaje, excluded.fecha_ultimo_mensaje),
+        total_mensajes = r.total_mensajes + 1,
+        no_leidos = r.no_leidos + excluded.no_leidos;
+
+    -- Nombre del lead: solo mientras la conversación todavía no lo tenga
+    update public.resumen_conversaciones r
+       set nombre_lead = c.nombre_completo,
+           nivel_interes = c.nivel_interes
+      from public.clientes_potenciales c
+     where r.numero_whatsapp = new.numero_whatsapp
+       and r.nombre_lead is null
+       and c.telefono in (new.numero_whatsapp, '+' || new.numero_whatsapp);
+
+    return new;
+end;
+$$;
+
+drop trigger if exists mensajes_resumen_conversacion on public.mensajes;
+create trigger mensajes_resumen_conversacion
+    after insert on public.mensajes
+    for each row execute function public.actualizar_resumen_conversacion();
+
+
+-- Cambios en el lead se reflejan en el resumen ----------------------------
+
+create or replace function public.actualizar_resumen_lead()
+returns trigger
+language plpgsql
+as $$
+begin
+    update public.resumen_conversaciones
+       set nombre_lead = new.nombre_completo,
+           nivel_interes = new.nivel_interes
+     where numero_whatsapp = ltrim(new.telefono, '+');
+    return new;
+end;
+$$;
+
+drop trigger if exists clientes_potenciales_resumen on public.clientes_potenciales;
+create trigger clientes_potenciales_resumen
+    after insert or update of nombre_completo, nivel_interes, telefono on public.clientes_potenciales
+    for each row execute function public.actualizar_resumen_lead();
+
+
+-- Backfill: reconstruye el resumen a partir de `mensajes` -----------------
+-- Conserva no_leidos y fecha_ultima_lectura de las filas que ya existían.
+
+create or replace function public.reconstruir_resumen_conversaciones()
+returns integer
+language sql
+as $$
+    with ultimos as (
+        select distinct on (numero_whatsapp)
+               numero_whatsapp, contenido, tipo_emisor, fecha_creacion
+          from public.mensajes
+         order by numero_whatsapp, fecha_creacion desc, id desc
+    ),
+    totales as (
+        select numero_whatsapp, count(*)::integer as total
+          from public.mensajes
+         group by numero_whatsapp
+    ),
+    escritos as (
+        insert into public.resumen_conversaciones as r (
+            numero_whatsapp, ultimo_mensaje, tipo_emisor_ultimo,
+            fecha_ultimo_mensaje, total_mensajes, no_leidos,
+            nombre_lead, nivel_interes
+        )
+        select u.numero_whatsapp, u.contenido, u.tipo_emisor,
+               coalesce(u.fecha_creacion, now()), t.total, 0,
+               c.nombre_completo, c.nivel_interes
+          from ultimos u
+          join totales t using (numero_whatsapp)
+          left join lateral (
+                select nombre_completo, nivel_interes
+                  from public.clientes_potenciales
+                 where telefono in (u.numero_whatsapp, '+' || u.numero_whatsapp)
+                 limit 1
+          ) c on true
+        on conflict (numero_whatsapp) do update set
+            ultimo_mensaje = excluded.ultimo_mensaje,
+            tipo_emisor_ultimo = excluded.tipo_emisor_ultimo,
+            fecha_ultimo_mensaje = excluded.fecha_ultimo_mensaje,
+            total_mensajes = excluded.total_mensajes,
+            nombre_lead = coalesce(excluded.nombre_lead, r.nombre_lead),
+            nivel_interes = coalesce(excluded.nivel_interes, r.nivel_interes)
+        returning 1
+    )
+    select count(*)::integer from escritos;
+$$;
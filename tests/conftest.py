@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Config exige estas variables; en las pruebas nada llega a los servicios reales
+for nombre in ("VERSION", "PHONE_NUMBER_ID", "RECIPIENT_PHONE_NUMBER", "ACCESS_TOKEN",
+               "OPENAI_API_KEY", "SUPABASE_SERVICE_ROLE"):
+    os.environ.setdefault(nombre, "test")
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
@@ -0,0 +1,44 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import Config
+from app.routers import admin
+
+app = FastAPI()
+app.include_router(admin.router, prefix="/admin")
+cliente = TestClient(app)
+
+
+def recargas(monkeypatch):
+    llamadas = []
+
+    async def reload_all():
+        llamadas.append("all")
+        return {"faq": "ok", "product": "ok"}
+
+    monkeypatch.setattr(admin.catalog_reloader, "reload_all", reload_all)
+    return llamadas
+
+
+def test_sin_admin_token_todo_cerrado(monkeypatch):
+    llamadas = recargas(monkeypatch)
+    monkeypatch.setattr(Config, "ADMIN_TOKEN", "")
+    assert cliente.post("/admin/reload").status_code == 503
+    assert cliente.post("/admin/reload", headers={"X-Admin-Token": ""}).status_code == 503
+    assert cliente.post("/admin/leads/reconciliar?aplicar=true").status_code == 503
+    assert llamadas == []
+
+
+def test_token_incorrecto_o_ausente(monkeypatch):
+    llamadas = recargas(monkeypatch)
+    monkeypatch.setattr(Config, "ADMIN_TOKEN", "secreto")
+    assert cliente.post("/admin/reload").status_code == 401
+    assert cliente.post("/admin/reload", headers={"X-Admin-Token": "otro"}).status_code == 401
+    assert llamadas == []
+
+
+def test_token_correcto(monkeypatch):
+    llamadas = recargas(monkeypatch)
+    monkeypatch.setattr(Config, "ADMIN_TOKEN", "secreto")
+    respuesta = cliente.post("/admin/reload", headers={"X-Admin-Token": "secreto"})
+    assert respuesta.status_code == 200 and llamadas == ["all"]
@@ -0,0 +1,57 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.services import message_handler as mh
+
+LATENCIA_LLM = 0.5
+
+
+class AgenteLento:
+    """Agente falso: cada turno tarda LATENCIA_LLM sin bloquear el event loop."""
+
+    def __init__(self):
+        self.turnos = []
+
+    async def ainvoke(self, entrada):
+        inicio = time.perf_counter()
+        await asyncio.sleep(LATENCIA_LLM)
+        self.turnos.append((inicio, time.perf_counter()))
+        return {"messages": entrada["messages"] + [SimpleNamespace(content="respuesta")]}
+
+
+class ConversacionesFalsas:
+    async def save_message(self, wa_id, role, content, extra=None):
+        return [{"numero_whatsapp": wa_id, "tipo_emisor": role, "contenido": content}]
+
+    async def get_conversation_history(self, wa_id, limit=10):
+        return []
+
+
+class WhatsAppFalso:
+    async def send_message(self, to, message):
+        return SimpleNamespace(json=lambda: {"messages": [{"id": "wamid.test"}]})
+
+
+def test_dos_turnos_se_solapan(monkeypatch):
+    agente = AgenteLento()
+    monkeypatch.setattr(mh, "agent", agente)
+    monkeypatch.setattr(mh, "es_cacheable", lambda burst, text: False)
+    handler = mh.MessageHandler()
+    handler.conversation_service = ConversacionesFalsas()
+    handler.whatsapp_service = WhatsAppFalso()
+
+    async def dos_turnos():
+        inicio = time.perf_counter()
+        await asyncio.gather(
+            handler._handle_incoming_message("5215500000001", [{"name": "Ana", "text": "hola"}]),
+            handler._handle_incoming_message("5215500000002", [{"name": "Luis", "text": "precio?"}]),
+        )
+        return time.perf_counter() - inicio
+
+    duracion = asyncio.run(dos_turnos())
+
+    assert len(agente.turnos) == 2
+    (inicio_a, fin_a), (inicio_b, fin_b) = sorted(agente.turnos)
+    assert inicio_b < fin_a  # el segundo turno empezó antes de que terminara el primero
+    assert duracion < 2 * LATENCIA_LLM
@@ -0,0 +1,59 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+from openai import AsyncOpenAI, OpenAI
+
+from app.config import Config
+from app.tools import embeddings
+
+
+@pytest.fixture
+def api_muda():
+    """Servidor que acepta conexiones y nunca responde; cuenta las conexiones."""
+    servidor = socket.socket()
+    servidor.bind(("127.0.0.1", 0))
+    servidor.listen(16)
+    conexiones = []
+
+    def aceptar():
+        while True:
+            try:
+                conexiones.append(servidor.accept()[0])
+            except OSError:
+                return
+
+    threading.Thread(target=aceptar, daemon=True).start()
+    yield f"http://127.0.0.1:{servidor.getsockname()[1]}/v1", conexiones
+    servidor.close()
+    for c in conexiones:
+        c.close()
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia(monkeypatch):
+    monkeypatch.setattr(embeddings, "embedding_cache", embeddings.EmbeddingCache(max_items=10))
+    monkeypatch.setattr(Config, "EMBEDDING_TIMEOUT", 0.3)
+
+
+def test_aembed_query_falla_dentro_del_timeout(monkeypatch, api_muda):
+    url, conexiones = api_muda
+    # Cliente con los reintentos por defecto del SDK: aembed_query debe desactivarlos
+    monkeypatch.setattr(embeddings, "async_client", AsyncOpenAI(api_key="test", base_url=url))
+    inicio = time.perf_counter()
+    with pytest.raises(embeddings.EMBEDDING_ERRORS):
+        asyncio.run(embeddings.aembed_query("¿tienen financiamiento?"))
+    assert time.perf_counter() - inicio < 2 * Config.EMBEDDING_TIMEOUT
+    assert len(conexiones) == 1
+
+
+def test_embed_query_sin_reintentos(monkeypatch, api_muda):
+    url, conexiones = api_muda
+    monkeypatch.setattr(embeddings, "client", OpenAI(api_key="test", base_url=url))
+    inicio = time.perf_counter()
+    with pytest.raises(embeddings.EMBEDDING_ERRORS):
+        embeddings.embed_query("¿tienen financiamiento?")
+    assert time.perf_counter() - inicio < 2 * Config.EMBEDDING_TIMEOUT
+    assert len(conexiones) == 1
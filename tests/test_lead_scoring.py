@@ -0,0 +1,279 @@
+import asyncio
+import gc
+import time
+
+import pytest
+
+from app.ml.intent_classifier import intent_classifier
+from app.ml.lead_pipeline import TablaLocal, pipeline_scoring
+from app.ml.lead_scoring import NIVEL_INTERES
+from app.services.lead_scorer import LeadScorer
+
+CONVERSACIONES = {
+    "5215500000001": ["hola", "¿cuánto cuesta el furgón?", "tengo presupuesto para pagar al contado",
+                      "¿lo puedo ver mañana?"],
+    "5215500000002": ["buenas tardes", "solo estoy mirando, gracias"],
+    "5215500000003": ["quiero comprar hoy mismo, ¿precio final?", "excelente, me encanta"],
+}
+COMPARADAS = ("score_total", "categoria", "num_mensajes_total", "num_preguntas_total", "mencion_presupuesto",
+              "suma_score_ponderado", "suma_sentimiento", "score_promedio_msg", "sentimiento_promedio")
+
+
+def tabla_mensajes():
+    """Mensajes del cliente intercalados con respuestas del asistente (que no cuentan para el puntaje)."""
+    filas = []
+    for wa_id, textos in CONVERSACIONES.items():
+        for texto in textos:
+            for emisor, contenido in (("user", texto), ("assistant", "¿En qué más te ayudo? precio especial")):
+                filas.append({"id": len(filas) + 1, "numero_whatsapp": wa_id, "tipo_emisor": emisor,
+                              "contenido": contenido, "fecha_creacion": f"2025-01-01T00:{len(filas):02d}:00+00:00",
+                              # Columnas viejas de la tabla: el puntaje no debe usarlas
+                              "label_intencion": "alta", "score_msg": 1.0})
+    return filas
+
+
+class SupabaseEnMemoria:
+    """
+    Cliente asíncrono falso con los filtros eq./gt./in. de PostgREST y la
+    función sumar_mensaje_lead de sql/leads_scores.sql. Cada llamada cede el
+    event loop antes de tocar las tablas, como una ida y vuelta por la red.
+    """
+
+    def __init__(self, mensajes):
+        self.tablas = {"mensajes": [dict(r) for r in mensajes], "leads_scores": []}
+
+    @staticmethod
+    def _filtrar(filas, filters):
+        for columna, condicion in (filters or {}).items():
+            operador, valor = condicion.split(".", 1)
+            if operador == "eq":
+                filas = [r for r in filas if str(r.get(columna)) == valor]
+            elif operador == "in":
+                valores = valor.strip("()").split(",")
+                filas = [r for r in filas if str(r.get(columna)) in valores]
+            else:
+                filas = [r for r in filas if r.get(columna) is not None and r[columna] > type(r[columna])(valor)]
+        return filas
+
+    async def select(self, table, columns="*", *, filters=None, order=None, limit=None):
+        await asyncio.sleep(0)
+        filas = self._filtrar(self.tablas[table], filters)
+        if order:
+            filas = sorted(filas, key=lambda r: r[order.split(".")[0]])
+        return [dict(r) for r in filas[:limit]]
+
+    async def upsert(self, table, rows, on_conflict=None):
+        await asyncio.sleep(0)
+        for fila in rows if isinstance(rows, list) else [rows]:
+            existente = next((r for r in self.tablas[table] if r[on_conflict] == fila[on_conflict]), None)
+            if existente is None:
+                self.tablas[table].append(dict(fila))
+            else:
+                existente.update(fila)
+        return []
+
+    async def update(self, table, values, filters):
+        await asyncio.sleep(0)
+        filas = self._filtrar(self.tablas.setdefault(table, []), filters)
+        for fila in filas:
+            fila.update(values)
+        return [dict(f) for f in filas]
+
+    async def rpc(self, function, params=None):
+        assert function == "sumar_mensaje_lead"
+        await asyncio.sleep(0)
+        # insert ... on conflict do update, en un solo paso
+        fila = next((r for r in self.tablas["leads_scores"] if r["lead_id"] == params["p_lead_id"]), None)
+        if fila is None:
+            fila = {"lead_id": params["p_lead_id"]}
+            self.tablas["leads_scores"].append(fila)
+        fila["num_mensajes_total"] = (fila.get("num_mensajes_total") or 0) + 1
+        fila["num_preguntas_total"] = (fila.get("num_preguntas_total") or 0) + params["p_num_preguntas"]
+        fila["suma_score_ponderado"] = (fila.get("suma_score_ponderado") or 0) + params["p_score_ponderado"]
+        fila["suma_sentimiento"] = (fila.get("suma_sentimiento") or 0) + params["p_sentimiento"]
+        fila["mencion_presupuesto"] = max(fila.get("mencion_presupuesto") or 0, params["p_presupuesto"])
+        fila["fecha_actualizacion"] = "2025-01-02T00:00:00+00:00"
+        return [dict(fila)]
+
+
+def scorer_en_memoria(mensajes):
+    scorer = LeadScorer(sync_interes=False)
+    scorer.db = SupabaseEnMemoria(mensajes)
+    return scorer
+
+
+def registrar_todos(scorer, mensajes):
+    """Lo que hace process_webhook_event con cada mensaje entrante del cliente."""
+    async def registrar():
+        for r in mensajes:
+            if r["tipo_emisor"] == "user":
+                await scorer.registrar(r["numero_whatsapp"], r["contenido"],
+                                       intent_classifier.classify([r["contenido"]])[0])
+    asyncio.run(registrar())
+
+
+def comparar(lote, tiempo_real):
+    assert set(lote) == set(tiempo_real)
+    for wa_id, fila in lote.items():
+        for columna in COMPARADAS:
+            assert fila[columna] == pytest.approx(tiempo_real[wa_id][columna]), (wa_id, columna)
+
+
+@pytest.mark.skipif(intent_classifier is None, reason="sin modelo de intención en data/models")
+def test_lote_y_scorer_escriben_las_mismas_sumas():
+    mensajes = tabla_mensajes()
+    tabla = TablaLocal(mensajes)
+    pipeline_scoring(tabla, pagina=3)
+    scorer = scorer_en_memoria(mensajes)
+    registrar_todos(scorer, mensajes)
+
+    comparar(tabla.leads_scores, {r["lead_id"]: r for r in scorer.db.tablas["leads_scores"]})
+    assert tabla.leads_scores["5215500000001"]["num_mensajes_total"] == 4
+
+
+@pytest.mark.skipif(intent_classifier is None, reason="sin modelo de intención en data/models")
+def test_scorer_sigue_sumando_sobre_el_lote():
+    mensajes = tabla_mensajes()
+    # El lote puntúa los primeros mensajes y el scorer suma los que llegan después
+    corte = len(mensajes) // 2
+    tabla = TablaLocal(mensajes[:corte])
+    pipeline_scoring(tabla)
+    scorer = scorer_en_memoria(mensajes[:corte])
+    scorer.db.tablas["leads_scores"] = [dict(f) for f in tabla.leads_scores.values()]
+    registrar_todos(scorer, mensajes[corte:])
+
+    completa = TablaLocal(mensajes)
+    pipeline_scoring(completa)
+    comparar(completa.leads_scores, {r["lead_id"]: r for r in scorer.db.tablas["leads_scores"]})
+
+
+@pytest.mark.skipif(intent_classifier is None, reason="sin modelo de intención en data/models")
+def test_reconciliar_coincide_con_lo_acumulado():
+    mensajes = tabla_mensajes()
+    scorer = scorer_en_memoria(mensajes)
+    registrar_todos(scorer, mensajes)
+
+    reporte = asyncio.run(scorer.reconciliar())
+
+    assert reporte["mensajes"] == sum(len(t) for t in CONVERSACIONES.values())
+    assert (reporte["coinciden"], reporte["difieren"], reporte["solo_en_lote"], reporte["solo_en_tabla"]) == (3, 0, 0, 0)
+
+
+@pytest.mark.skipif(intent_classifier is None, reason="sin modelo de intención en data/models")
+def test_reconciliar_aplicado_escribe_las_sumas_del_lote():
+    mensajes = tabla_mensajes()
+    scorer = scorer_en_memoria(mensajes)
+
+    async def aplicar_y_comparar():
+        primero = await scorer.reconciliar(aplicar=True)
+        return primero, await scorer.reconciliar()
+
+    primero, segundo = asyncio.run(aplicar_y_comparar())
+
+    assert (primero["solo_en_lote"], primero["aplicado"]) == (3, True)
+    assert (segundo["coinciden"], segundo["difieren"]) == (3, 0)
+    tabla = TablaLocal(mensajes)
+    pipeline_scoring(tabla)
+    comparar(tabla.leads_scores, {r["lead_id"]: r for r in scorer.db.tablas["leads_scores"]})
+
+
+@pytest.mark.skipif(intent_classifier is None, reason="sin modelo de intención en data/models")
+def test_dos_workers_no_pierden_mensajes():
+    mensajes = tabla_mensajes()
+    db = SupabaseEnMemoria(mensajes)
+    workers = [scorer_en_memoria(mensajes), scorer_en_memoria(mensajes)]
+    for worker in workers:
+        worker.db = db
+    entrantes = [r for r in mensajes if r["tipo_emisor"] == "user"]
+
+    async def a_la_vez():
+        # Cada mensaje lo atiende un worker distinto, todos en paralelo
+        await asyncio.gather(*(
+            workers[i % 2].registrar(r["numero_whatsapp"], r["contenido"],
+                                     intent_classifier.classify([r["contenido"]])[0])
+            for i, r in enumerate(entrantes)
+        ))
+
+    asyncio.run(a_la_vez())
+
+    tabla = TablaLocal(mensajes)
+    pipeline_scoring(tabla)
+    comparar(tabla.leads_scores, {r["lead_id"]: r for r in db.tablas["leads_scores"]})
+    assert sum(w.updates + w.stale for w in workers) == len(entrantes)
+
+
+@pytest.mark.skipif(intent_classifier is None, reason="sin modelo de intención en data/models")
+def test_scorer_suma_sobre_la_fila_reescrita_por_el_lote():
+    mensajes = tabla_mensajes()
+    wa_id = "5215500000001"
+    scorer = scorer_en_memoria(mensajes)
+    registrar_todos(scorer, mensajes[:2])
+    # El script en lote reescribe la fila mientras la API sigue atendiendo al lead
+    tabla = TablaLocal(mensajes[:4])
+    pipeline_scoring(tabla)
+    fila = next(r for r in scorer.db.tablas["leads_scores"] if r["lead_id"] == wa_id)
+    fila.update(tabla.leads_scores[wa_id])
+    registrar_todos(scorer, mensajes[4:6])
+
+    completa = TablaLocal(mensajes[:6])
+    pipeline_scoring(completa)
+    comparar(completa.leads_scores, {r["lead_id"]: r for r in scorer.db.tablas["leads_scores"]})
+
+
+@pytest.mark.skipif(intent_classifier is None, reason="sin modelo de intención en data/models")
+def test_reconciliar_reduce_por_bloques_fuera_del_event_loop(monkeypatch):
+    from app.services import lead_scorer as modulo
+
+    mensajes = tabla_mensajes()
+    scorer = scorer_en_memoria(mensajes)
+    registrar_todos(scorer, mensajes)
+    monkeypatch.setattr(modulo, "PAGINA", 2)
+    monkeypatch.setattr(modulo, "BLOQUE", 3)
+    bloques, sumar_bloque = [], modulo.sumar_bloque
+
+    def sumar_bloque_lento(acumulado, filas):
+        bloques.append(len(filas))
+        time.sleep(0.1)  # CPU de pandas + clasificador, bloqueante
+        return sumar_bloque(acumulado, filas)
+
+    monkeypatch.setattr(modulo, "sumar_bloque", sumar_bloque_lento)
+
+    async def reconciliar_midiendo_el_loop():
+        huecos, ultimo = [], time.perf_counter()
+        tarea = asyncio.create_task(scorer.reconciliar())
+        while not tarea.done():
+            await asyncio.sleep(0.01)
+            ahora = time.perf_counter()
+            huecos.append(ahora - ultimo)
+            ultimo = ahora
+        return await tarea, max(huecos)
+
+    # Una pasada completa del GC con el heap de toda la suite también frena el loop; no es lo que se mide
+    gc.collect()
+    gc.disable()
+    try:
+        reporte, hueco_maximo = asyncio.run(reconciliar_midiendo_el_loop())
+    finally:
+        gc.enable()
+
+    assert (reporte["coinciden"], reporte["difieren"]) == (3, 0)
+    assert bloques == [4, 4]  # 8 mensajes del cliente en páginas de 2, reducidos cada 3 o más
+    assert hueco_maximo < 0.08
+
+
+@pytest.mark.skipif(intent_classifier is None, reason="sin modelo de intención en data/models")
+def test_nivel_interes_se_sincroniza_con_y_sin_mas():
+    mensajes = tabla_mensajes()
+    scorer = scorer_en_memoria(mensajes)
+    scorer.sync_interes = True
+    scorer.db.tablas["clientes_potenciales"] = [
+        {"telefono": "+5215500000001", "nivel_interes": None},
+        {"telefono": "5215500000002", "nivel_interes": None},
+    ]
+    registrar_todos(scorer, mensajes)
+
+    categorias = {r["lead_id"]: r["categoria"] for r in scorer.db.tablas["leads_scores"]}
+    assert [c["nivel_interes"] for c in scorer.db.tablas["clientes_potenciales"]] == [
+        NIVEL_INTERES[categorias["5215500000001"]],
+        NIVEL_INTERES[categorias["5215500000002"]],
+    ]
@@ -0,0 +1,147 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services import message_handler as mh
+
+WA_ID = "5215500000001"
+
+
+class AgenteEco:
+    """Agente falso que guarda los mensajes con los que se lo invocó."""
+
+    def __init__(self):
+        self.entradas = []
+
+    async def ainvoke(self, entrada):
+        self.entradas.append(entrada["messages"])
+        return {"messages": entrada["messages"] + [SimpleNamespace(content="respuesta")]}
+
+
+class ConversacionesEnMemoria:
+    def __init__(self):
+        self.filas = []
+
+    async def save_message(self, wa_id, role, content, extra=None):
+        fila = {"numero_whatsapp": wa_id, "tipo_emisor": role, "contenido": content}
+        self.filas.append(fila)
+        return [fila]
+
+    async def get_conversation_history(self, wa_id, limit=10):
+        return list(reversed([f for f in self.filas if f["numero_whatsapp"] == wa_id]))[:limit]
+
+
+class WhatsAppFalso:
+    def __init__(self):
+        self.enviados = []
+
+    async def send_message(self, to, message):
+        self.enviados.append(message)
+        return SimpleNamespace(json=lambda: {"messages": [{"id": "wamid.test"}]})
+
+
+def preparar(monkeypatch):
+    agente = AgenteEco()
+    monkeypatch.setattr(mh, "agent", agente)
+    monkeypatch.setattr(mh, "es_cacheable", lambda burst, text: False)
+    handler = mh.MessageHandler()
+    handler.conversation_service = ConversacionesEnMemoria()
+    handler.whatsapp_service = WhatsAppFalso()
+    return handler, agente
+
+
+def test_rafaga_llega_una_sola_vez_al_agente(monkeypatch):
+    handler, agente = preparar(monkeypatch)
+    conversaciones = handler.conversation_service
+
+    async def turno():
+        await conversaciones.save_message(WA_ID, "user", "hola")
+        await conversaciones.save_message(WA_ID, "assistant", "¡Hola! ¿En qué te ayudo?")
+        rafaga = ["vi un furgón", "precio?"]
+        for texto in rafaga:
+            # process_webhook_event guarda cada mensaje antes de agruparlo
+            await conversaciones.save_message(WA_ID, "user", texto)
+        await handler._handle_incoming_message(WA_ID, [{"name": "Ana", "text": t} for t in rafaga])
+
+    asyncio.run(turno())
+
+    assert agente.entradas == [[
+        {"role": "user", "content": "hola"},
+        {"role": "assistant", "content": "¡Hola! ¿En qué te ayudo?"},
+        {"role": "user", "content": "vi un furgón\nprecio?"},
+    ]]
+
+
+def test_sin_rafaga_respeta_mensajes_repetidos_anteriores():
+    historial = [
+        {"tipo_emisor": "user", "contenido": "precio?"},
+        {"tipo_emisor": "assistant", "contenido": "¿De qué modelo?"},
+        {"tipo_emisor": "user", "contenido": "precio?"},
+    ]
+    assert mh._sin_rafaga(historial, [{"text": "precio?"}]) == historial[:2]
+
+
+class CacheFalsa:
+    def __init__(self, respuesta=None):
+        self.respuesta = respuesta
+        self.consultas = 0
+        self.guardadas = []
+
+    def lookup(self, pregunta, embedding):
+        self.consultas += 1
+        return self.respuesta
+
+    def store(self, pregunta, embedding, respuesta):
+        self.guardadas.append((pregunta, respuesta))
+
+
+def turno_faq(monkeypatch, anteriores, en_cache=None):
+    """Un turno cacheable en el que el agente solo consulta search_faq. Devuelve la caché y lo enviado."""
+    handler, agente = preparar(monkeypatch)
+    cache = CacheFalsa(en_cache)
+    monkeypatch.setattr(mh, "es_cacheable", lambda burst, text: True)
+    monkeypatch.setattr(mh, "answer_cache", cache)
+
+    async def embedding(texto):
+        return [1.0, 0.0]
+
+    async def ainvoke(entrada):
+        llamada = SimpleNamespace(content="", tool_calls=[{"name": "search_faq"}])
+        return {"messages": entrada["messages"] + [llamada, SimpleNamespace(content="De 9 a 18 h")]}
+
+    monkeypatch.setattr(mh, "aembed_query", embedding)
+    monkeypatch.setattr(agente, "ainvoke", ainvoke)
+    pregunta = "¿cuál es el horario de atención?"
+
+    async def turno():
+        for rol, texto in anteriores:
+            await handler.conversation_service.save_message(WA_ID, rol, texto)
+        await handler.conversation_service.save_message(WA_ID, "user", pregunta)
+        await handler._handle_incoming_message(WA_ID, [{"name": "Ana", "text": pregunta}])
+
+    asyncio.run(turno())
+    return cache, handler.whatsapp_service.enviados
+
+
+ANTERIORES = [("user", "busco un furgón para Temuco"), ("assistant", "Tenemos el modelo X")]
+
+
+def test_respuesta_sin_historial_se_guarda_en_cache(monkeypatch):
+    cache, _ = turno_faq(monkeypatch, [])
+    assert cache.guardadas == [("¿cuál es el horario de atención?", "De 9 a 18 h")]
+
+
+def test_respuesta_con_historial_no_se_guarda_en_cache(monkeypatch):
+    cache, _ = turno_faq(monkeypatch, ANTERIORES)
+    assert cache.guardadas == []
+
+
+def test_sin_historial_se_responde_desde_la_cache(monkeypatch):
+    cache, enviados = turno_faq(monkeypatch, [], en_cache="Atendemos de 9 a 18 h")
+    assert enviados == ["Atendemos de 9 a 18 h"]
+
+
+def test_con_historial_no_se_usa_la_cache(monkeypatch):
+    # "¿cuánto sale?" después de hablar de un modelo: la respuesta guardada no sirve
+    cache, enviados = turno_faq(monkeypatch, ANTERIORES, en_cache="Atendemos de 9 a 18 h")
+    assert cache.consultas == 0
+    assert enviados == ["De 9 a 18 h"]
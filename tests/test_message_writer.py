@@ -0,0 +1,93 @@
+import asyncio
+
+from app.services.message_writer import MessageWriter
+
+LATENCIA_INSERT = 0.5
+
+
+class SupabaseLento:
+    """Cliente falso: cada insert tarda LATENCIA_INSERT y guarda las filas."""
+
+    def __init__(self):
+        self.filas = []
+
+    async def insert(self, table, rows, returning=True, columns=None):
+        await asyncio.sleep(LATENCIA_INSERT)
+        self.filas.extend(rows)
+
+
+def filas(n):
+    return [{"numero_whatsapp": "5215500000001", "tipo_emisor": "user", "contenido": f"m{i}"} for i in range(n)]
+
+
+def nuevo_writer():
+    writer = MessageWriter(batch_size=5, flush_interval=0.05, retry_backoff=0.01)
+    writer.db = SupabaseLento()
+    return writer
+
+
+def test_stop_espera_el_lote_en_vuelo():
+    writer = nuevo_writer()
+
+    async def escenario():
+        await writer.start()
+        for fila in filas(15):
+            writer.enqueue(fila)
+        await asyncio.sleep(0.1)  # la tarea de fondo está a mitad del primer insert
+        assert writer._en_vuelo
+        await writer.stop(timeout=5)
+
+    asyncio.run(escenario())
+
+    assert [f["contenido"] for f in writer.db.filas] == [f"m{i}" for i in range(15)]
+    assert writer.stats()["buffered"] == 0
+
+
+def test_flush_cancelado_devuelve_el_lote_al_buffer():
+    writer = nuevo_writer()
+
+    async def escenario():
+        for fila in filas(7):
+            writer.enqueue(fila)
+        tarea = asyncio.create_task(writer.flush())
+        await asyncio.sleep(0.1)
+        tarea.cancel()
+        await asyncio.gather(tarea, return_exceptions=True)
+
+    asyncio.run(escenario())
+
+    assert writer.db.filas == []
+    assert writer._en_vuelo == []
+    assert [f["contenido"] for f in writer._buffer] == [f"m{i}" for i in range(7)]
+
+
+class SupabaseQueFallaUnaVez(SupabaseLento):
+    """El primer insert lanza un error que no es de httpx (p. ej. al serializar el lote)."""
+
+    def __init__(self):
+        super().__init__()
+        self.fallos = 0
+
+    async def insert(self, table, rows, returning=True, columns=None):
+        if not self.fallos:
+            self.fallos += 1
+            raise TypeError("Object of type datetime is not JSON serializable")
+        self.filas.extend(rows)
+
+
+def test_error_inesperado_no_detiene_la_tarea_de_fondo():
+    writer = nuevo_writer()
+    writer.db = SupabaseQueFallaUnaVez()
+
+    async def escenario():
+        await writer.start()
+        for fila in filas(7):
+            writer.enqueue(fila)
+        await asyncio.sleep(0.3)  # varios ciclos de flush_interval
+        vivas = not writer._tarea.done()
+        await writer.stop(timeout=5)
+        return vivas
+
+    assert asyncio.run(escenario())
+    assert [f["contenido"] for f in writer.db.filas] == [f"m{i}" for i in range(7)]
+    assert writer.stats()["failed_batches"] == 1
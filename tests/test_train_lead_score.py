@@ -0,0 +1,33 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+from app.ml.intent_classifier import intent_classifier
+from app.ml.lead_pipeline import pipeline_scoring
+
+DATA = Path(__file__).resolve().parent.parent / "data"
+
+spec = importlib.util.spec_from_file_location("train_lead_score", DATA / "train_lead_score.py")
+train_lead_score = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(train_lead_score)
+
+
+@pytest.mark.skipif(intent_classifier is None, reason="sin modelo de intención en data/models")
+def test_local_acepta_la_exportacion_anterior():
+    exportacion = json.loads((DATA / "dataset_mensajes.json").read_text(encoding="utf-8"))
+    tabla = train_lead_score.cargar_local(DATA / "dataset_mensajes.json")
+
+    df_leads = pipeline_scoring(tabla)
+
+    assert sorted(df_leads["lead_id"]) == sorted({r["lead_id"] for r in exportacion})
+    assert df_leads["num_mensajes_total"].sum() == len(exportacion)
+
+
+def test_local_sin_columnas_falla_nombrandolas(tmp_path):
+    archivo = tmp_path / "mensajes.json"
+    archivo.write_text(json.dumps([{"id": 1, "contenido": "hola"}]), encoding="utf-8")
+
+    with pytest.raises(ValueError, match="numero_whatsapp, tipo_emisor"):
+        train_lead_score.cargar_local(archivo)
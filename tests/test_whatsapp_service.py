@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import Config
+from app.services.whatsapp_service import WhatsAppService
+
+
+def servicio(responder):
+    """WhatsAppService contra una Graph API falsa (httpx.MockTransport)."""
+    svc = WhatsAppService()
+    svc._init_state()
+    svc._client = httpx.AsyncClient(base_url="https://graph.test", transport=httpx.MockTransport(responder))
+    return svc
+
+
+@pytest.fixture(autouse=True)
+def sin_espera(monkeypatch):
+    monkeypatch.setattr(Config, "WHATSAPP_RETRY_BACKOFF", 0.0)
+
+
+def test_reintenta_si_no_pudo_conectar():
+    intentos = []
+
+    def responder(request):
+        intentos.append(request)
+        if len(intentos) == 1:
+            raise httpx.ConnectError("conexión rechazada", request=request)
+        return httpx.Response(200, json={"messages": [{"id": "wamid.1"}]})
+
+    svc = servicio(responder)
+    respuesta = asyncio.run(svc.send_message("+5215500000001", "hola"))
+    assert respuesta.status_code == 200
+    assert len(intentos) == 2 and svc.retries == 1
+
+
+def test_reintenta_429_y_5xx():
+    codigos = iter([429, 503, 200])
+    svc = servicio(lambda request: httpx.Response(next(codigos), json={}))
+    assert asyncio.run(svc.send_message("+5215500000001", "hola")).status_code == 200
+    assert svc.retries == 2
+
+
+@pytest.mark.parametrize("error", [httpx.ReadTimeout, httpx.RemoteProtocolError])
+def test_no_reenvia_si_el_post_pudo_llegar(error):
+    intentos = []
+
+    def responder(request):
+        intentos.append(request)
+        raise error("sin respuesta", request=request)
+
+    svc = servicio(responder)
+    with pytest.raises(error):
+        asyncio.run(svc.send_message("+5215500000001", "hola"))
+    assert len(intentos) == 1  # un reintento podría duplicar el mensaje al cliente
+    assert svc.errors == 1 and svc.retries == 0